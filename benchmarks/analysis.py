@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wepycon.AnalysisPool import AnalysisPool
+from wepycon.DebugCamera import DebugCamera
+from wepycon.SliceAnalysis import SliceAnalysis
+
+# slice analysis throughput on the analysis thread versus an AnalysisPool of worker processes
+
+def parse_resolution(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+def thread_fps(frames, method, fit):
+    analysis = SliceAnalysis(method, fit)
+    analysis(frames[0])
+    t0 = time.perf_counter()
+    for img in frames:
+        analysis(img)
+    return len(frames) / (time.perf_counter() - t0)
+
+def pool_fps(frames, method, fit, processes):
+    pool = AnalysisPool(SliceAnalysis(method, fit), processes)
+    try:
+        # starts the workers and lets them build their buffers
+        list(pool.map(frames[:2 * processes]))
+        t0 = time.perf_counter()
+        for _ in pool.map(frames):
+            pass
+        return len(frames) / (time.perf_counter() - t0), pool.report()
+    finally:
+        pool.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="wepycon analysis pool benchmark")
+    parser.add_argument("--resolutions", default="1920x1080,5472x3648")
+    parser.add_argument("--bits", type=int, default=16)
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--slices", default="COG")
+    parser.add_argument("--fit", action="store_true")
+    parser.add_argument("--processes", default="1,2,4")
+    args = parser.parse_args(argv)
+
+    for resolution in args.resolutions.split(","):
+        width, height = parse_resolution(resolution)
+        camera = DebugCamera(width=width, height=height, adc_bits=args.bits, fps=None)
+        frames = [camera.get_image().copy() for _ in range(min(args.frames, 10))]
+        frames = [frames[i % len(frames)] for i in range(args.frames)]
+        print("{0:5d}x{1:<5d} {2:2d} bit  thread       {3:8.1f} fps".format(width, height, args.bits,
+                thread_fps(frames, args.slices, args.fit)))
+        for processes in [int(p) for p in args.processes.split(",")]:
+            fps, report = pool_fps(frames, args.slices, args.fit, processes)
+            print("{0:18s}  {1:d} processes  {2:8.1f} fps  (submit {3:.2f} ms per frame)".format("", processes, fps, report["submit_ms"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import re
+import subprocess
+import sys
+
+# cumulative import time of wepycon and of every registered backend, measured with -X importtime
+STATEMENTS = [
+    ("import wepycon", "import wepycon"),
+    ("list camera types", "import wepycon; list(wepycon.camera_types)"),
+    ("load all backends", "import wepycon; [wepycon.camera_types[name] for name in wepycon.camera_types]"),
+]
+
+def cumulative_import_time(statement, repeat=5):
+    times = []
+    for i in range(repeat):
+        out = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, universal_newlines=True).stderr
+        total = 0
+        for line in out.splitlines():
+            match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\S+)$", line)
+            # only top level imports, nested ones are contained in their parents
+            if match and not line.rstrip().split("|")[-1].startswith("  "):
+                total += int(match.group(1))
+        times.append(total / 1e3)
+    return min(times)
+
+def main():
+    for name, statement in STATEMENTS:
+        print("{0:20s} {1:8.1f} ms".format(name, cumulative_import_time(statement)))
+
+if __name__ == "__main__":
+    main()
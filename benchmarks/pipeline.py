@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wepycon.DebugCamera import DebugCamera
+from wepycon.ReplayCamera import ReplayCamera
+from wepycon.gui import QApplication
+
+STAGES = ["capture", "buffer", "analysis", "plots", "colormap", "render", "total"]
+
+# headless run of the full frame pipeline of a CameraWidget against DebugCamera:
+#   capture   DebugCamera.get_image incl. background subtraction
+#   buffer    publishing into and reading from the acquisition ring buffer
+#   analysis  slice analysis (BeamWorker.analyse)
+#   plots     profile plots (DisplayWorker.plot)
+#   colormap  downsampling to the display size and lookup table (DisplayWorker.downsample, .colorize)
+#   render    QImage wrapping, scaling and overlays incl. the slice crosshair (BeamWidget.update_image)
+# the stages run one after the other here, in the GUI they overlap on their own threads
+
+def parse_resolution(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+def git_version():
+    try:
+        return subprocess.check_output(["git", "describe", "--always", "--dirty"],
+                cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL,
+                universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def make_widget(camera, slice_method, colormap):
+    from wepycon.gui.CameraWidget import CameraWidget
+    camera.background = np.random.uniform(0, 10, (camera.height, camera.width)).astype(np.float32)
+
+    widget = CameraWidget(camera)
+    widget.resize(1200, 700)
+    if slice_method is not None:
+        widget.slices_checkbox.setChecked(True)
+        widget.slice_method_box.setCurrentText(slice_method)
+    if colormap is not None:
+        widget.colormap_box.setCurrentText(colormap)
+    widget.show()
+    # run_frames drives the stages itself, the widget's own threads would compete for the buffer and the
+    # analysis and hand their results to the same widgets
+    widget.stats_timer.stop()
+    widget.worker.stop()
+    widget.display_worker.stop()
+    return widget
+
+def run_frames(widget, frames, app):
+    camera = widget.camera
+    worker = widget.worker
+    display = widget.display_worker
+    buffer = widget.engine.buffer
+    reader = buffer.reader()
+    timings = {stage: np.empty(frames) for stage in STAGES}
+    for i in range(frames):
+        t0 = time.perf_counter()
+        img = camera.get_image()
+        t1 = time.perf_counter()
+        buffer.put(img)
+        sequence, img = reader.latest()
+        t2 = time.perf_counter()
+        worker.analyse(img)
+        t3 = time.perf_counter()
+        display.plot(worker.result)
+        t4 = time.perf_counter()
+        view = widget.beam_widget.view
+        img = display.colorize(display.downsample(img, view))
+        t5 = time.perf_counter()
+        display.render(img, view, worker.result)
+        t6 = time.perf_counter()
+        for stage, dt in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t6 - t5, t6 - t0)):
+            timings[stage][i] = dt
+        app.processEvents()
+    reader.close()
+    return timings
+
+def benchmark(app, camera, frames, slice_method, colormap):
+    widget = make_widget(camera, slice_method, colormap)
+    try:
+        run_frames(widget, min(frames, 5), app)
+        timings = run_frames(widget, frames, app)
+
+        tracemalloc.start()
+        run_frames(widget, min(frames, 20), app)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        widget.stop()
+        widget.close()
+
+    result = {
+        "resolution": [camera.width, camera.height],
+        "adc_bits": camera.adc_bits,
+        "frames": frames,
+        "fps": frames / float(np.sum(timings["total"])),
+        "peak_memory_mb": peak / 2**20,
+        "stages": {},
+    }
+    for stage in STAGES:
+        p50, p90, p99 = np.percentile(timings[stage] * 1e3, [50, 90, 99])
+        result["stages"][stage] = {"p50_ms": p50, "p90_ms": p90, "p99_ms": p99}
+    return result
+
+def print_result(result, reference=None):
+    w, h = result["resolution"]
+    line = "{0:5d}x{1:<5d} {2:2d} bit {3:8.1f} fps {4:8.1f} MB".format(w, h, result["adc_bits"], result["fps"], result["peak_memory_mb"])
+    if reference is not None:
+        line += "   ({0:+.0%} fps vs reference)".format(result["fps"] / reference["fps"] - 1)
+    print(line)
+    for stage in STAGES:
+        t = result["stages"][stage]
+        print("    {0:10s} p50 {1:8.2f} ms  p90 {2:8.2f} ms  p99 {3:8.2f} ms".format(stage, t["p50_ms"], t["p90_ms"], t["p99_ms"]))
+
+def find_reference(reference, result):
+    if reference is None:
+        return None
+    for other in reference["results"]:
+        if other["resolution"] == result["resolution"] and other["adc_bits"] == result["adc_bits"]:
+            return other
+    return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="headless wepycon pipeline benchmark")
+    parser.add_argument("--resolutions", default="640x480,1280x1024,1920x1080")
+    parser.add_argument("--bits", default="8,16")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--slices", default="COG", help="slice method or 'none'")
+    parser.add_argument("--colormap", default="jet", help="colormap or 'none'")
+    parser.add_argument("--output", default=None, help="json file, defaults to benchmarks/results/")
+    parser.add_argument("--compare", default=None, help="json file of an earlier run")
+    parser.add_argument("--replay", default=None, help="recorded stack replayed instead of synthetic frames")
+    args = parser.parse_args(argv)
+
+    slice_method = None if args.slices.lower() == "none" else args.slices
+    colormap = None if args.colormap.lower() == "none" else args.colormap
+
+    reference = None
+    if args.compare is not None:
+        with open(args.compare, "r") as fh:
+            reference = json.load(fh)
+
+    app = QApplication.instance() or QApplication([])
+    version = git_version()
+    report = {
+        "version": version,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "slices": args.slices,
+        "colormap": args.colormap,
+        "replay": args.replay,
+        "results": [],
+    }
+    cameras = []
+    if args.replay is not None:
+        cameras.append(lambda: ReplayCamera(args.replay, playback="Fast"))
+    else:
+        for resolution in args.resolutions.split(","):
+            width, height = parse_resolution(resolution)
+            for bits in args.bits.split(","):
+                cameras.append(lambda width=width, height=height, bits=int(bits): DebugCamera(width=width, height=height, adc_bits=bits, fps=None))
+    for make_camera in cameras:
+        result = benchmark(app, make_camera(), args.frames, slice_method, colormap)
+        report["results"].append(result)
+        print_result(result, find_reference(reference, result))
+
+    output = args.output
+    if output is None:
+        directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+        os.makedirs(directory, exist_ok=True)
+        output = os.path.join(directory, "pipeline-{0:s}-{1:s}.json".format(version, time.strftime("%Y%m%d-%H%M%S")))
+    with open(output, "w") as fh:
+        json.dump(report, fh, indent=1)
+    print("results written to", output)
+
+if __name__ == "__main__":
+    main()
@@ -27,7 +27,7 @@ setuptools.setup(
         "zwoasi@git+https://github.com/python-zwoasi/python-zwoasi.git#egg=zwoasi",
     ],
     entry_points={
-        "console_scripts":[ "wePycon = wepycon.main:main" ]
+        "console_scripts":[ "wePycon = wepycon.main:main", "wepycon-headless = wepycon.headless:main" ]
     },
 
     python_requires='>=3.6',
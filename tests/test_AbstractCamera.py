@@ -0,0 +1,167 @@
+import numpy as np
+
+from wepycon.AbstractCamera import AbstractCamera
+
+class PlainCamera(AbstractCamera):
+    def __init__(self, width=16, height=12, adc_bits=8):
+        super(PlainCamera, self).__init__()
+        self.width = width
+        self.height = height
+        self.adc_bits = adc_bits
+        self.px_size = 1.0
+
+def test_dtype_is_preserved():
+    camera = PlainCamera(adc_bits=12)
+    img = np.full((12, 16), 1000, dtype=np.uint16)
+    out = camera.preprocess(img)
+    assert out is img
+    camera.background = np.full((12, 16), 100.4, dtype=np.float32)
+    out = camera.preprocess(img)
+    assert out.dtype == np.uint16
+    np.testing.assert_array_equal(out, 900)
+
+def test_foreign_dtype_is_clipped_to_the_adc_range():
+    camera = PlainCamera(adc_bits=8)
+    img = np.array([[-5.0, 12.6, 300.0]])
+    out = camera.preprocess(img)
+    assert out.dtype == np.uint8
+    np.testing.assert_array_equal(out, [[0, 12, 255]])
+
+def test_subtraction_saturates_at_zero():
+    camera = PlainCamera(adc_bits=8)
+    camera.background = np.full((12, 16), 50, dtype=np.float32)
+    img = np.zeros((12, 16), dtype=np.uint8)
+    img[0, :4] = [10, 50, 51, 255]
+    out = camera.preprocess(img)
+    np.testing.assert_array_equal(out[0, :4], [0, 0, 1, 205])
+    assert out[1:].max() == 0
+
+def test_background_is_rounded():
+    camera = PlainCamera(adc_bits=8)
+    camera.background = np.full((12, 16), 9.6, dtype=np.float32)
+    out = camera.preprocess(np.full((12, 16), 20, dtype=np.uint8))
+    np.testing.assert_array_equal(out, 10)
+
+def test_without_subtraction():
+    camera = PlainCamera(adc_bits=8)
+    camera.background = np.full((12, 16), 50, dtype=np.float32)
+    img = np.full((12, 16), 60, dtype=np.uint8)
+    assert camera.preprocess(img, substract_background=False) is img
+
+def test_output_buffer_is_reused():
+    camera = PlainCamera(adc_bits=8)
+    camera.background = np.full((12, 16), 1, dtype=np.float32)
+    first = camera.preprocess(np.full((12, 16), 5, dtype=np.uint8))
+    second = camera.preprocess(np.full((12, 16), 7, dtype=np.uint8))
+    assert first is second
+    np.testing.assert_array_equal(second, 6)
+
+def test_new_background_replaces_the_cached_one():
+    camera = PlainCamera(adc_bits=8)
+    img = np.full((12, 16), 100, dtype=np.uint8)
+    camera.background = np.full((12, 16), 10, dtype=np.float32)
+    np.testing.assert_array_equal(camera.preprocess(img), 90)
+    camera.background = np.full((12, 16), 30, dtype=np.float32)
+    np.testing.assert_array_equal(camera.preprocess(img), 70)
+
+def ramp_background(width=16, height=12):
+    # every pixel holds its own x + 100 * y
+    return (np.arange(width)[np.newaxis, :] + 100 * np.arange(height)[:, np.newaxis]).astype(np.float32)
+
+def test_full_frame_background_under_a_hardware_roi():
+    camera = PlainCamera(adc_bits=16)
+    camera.background = ramp_background()
+    camera.roi = (3, 2, 8, 6)
+    img = np.full((6, 8), 5000, dtype=np.uint16)
+    out = camera.preprocess(img)
+    np.testing.assert_array_equal(out, 5000 - ramp_background()[2:8, 3:11])
+
+def test_background_taken_under_a_roi():
+    camera = PlainCamera(adc_bits=16)
+    camera.roi = (4, 2, 10, 8)
+    camera.background = ramp_background()[2:10, 4:14]
+    # a smaller ROI inside the calibrated one uses the matching part
+    camera.roi = (6, 5, 4, 3)
+    out = camera.preprocess(np.full((3, 4), 5000, dtype=np.uint16))
+    np.testing.assert_array_equal(out, 5000 - ramp_background()[5:8, 6:10])
+    assert camera.background is not None
+
+def test_background_outside_of_the_roi_is_dropped():
+    camera = PlainCamera(adc_bits=16)
+    camera.roi = (4, 2, 10, 8)
+    camera.background = ramp_background()[2:10, 4:14]
+    # the same shape, but at another place on the sensor
+    camera.roi = (0, 0, 10, 8)
+    img = np.full((8, 10), 5000, dtype=np.uint16)
+    assert camera.preprocess(img) is img
+    assert camera.background is None
+
+def test_background_of_another_binning_is_dropped():
+    camera = PlainCamera(adc_bits=8)
+    camera.background = np.full((6, 8), 10, dtype=np.float32)
+    # a background of the binned frame size, but taken without binning
+    camera.binning = 2
+    img = np.full((6, 8), 50, dtype=np.uint8)
+    assert camera.preprocess(img) is img
+    assert camera.background is None
+
+class HardwareBinningCamera(PlainCamera):
+    # bins 2x2 on the sensor, everything else in software
+    def __init__(self, *args, **kwargs):
+        super(HardwareBinningCamera, self).__init__(*args, **kwargs)
+        self.hardware_binning = 1
+
+    def _set_hardware_binning(self, binning):
+        if not binning in [1, 2]:
+            return False
+        self.hardware_binning = binning
+        return True
+
+def test_software_bin():
+    camera = PlainCamera()
+    img = np.arange(7 * 9, dtype=np.uint16).reshape(7, 9)
+    assert camera.software_bin(img, 1) is img
+    out = camera.software_bin(img, 2)
+    assert out.dtype == np.uint16
+    # the incomplete last row and column are left out
+    expected = img[:6, :8].reshape(3, 2, 4, 2).sum(axis=(1, 3)) // 4
+    np.testing.assert_array_equal(out, expected)
+    out = camera.software_bin(np.full((6, 6), 255, dtype=np.uint8), 3)
+    np.testing.assert_array_equal(out, 255)
+
+def test_software_binning_geometry():
+    camera = PlainCamera(width=16, height=12)
+    camera.set_binning(4)
+    assert (camera.width, camera.height, camera.px_size) == (4, 3, 4.0)
+    assert (camera.sensor_width, camera.sensor_height) == (16, 12)
+    out = camera.preprocess(np.full((12, 16), 8, dtype=np.uint8))
+    assert out.shape == (3, 4)
+    camera.set_binning(1)
+    assert camera.preprocess(np.zeros((12, 16), dtype=np.uint8)).shape == (12, 16)
+
+def test_hardware_and_software_binning():
+    camera = HardwareBinningCamera()
+    camera.set_binning(2)
+    assert camera.hardware_binning == 2
+    assert camera._software_binning == 1
+    # an unsupported factor goes back to the full sensor resolution and bins in software
+    camera.set_binning(3)
+    assert camera.hardware_binning == 1
+    assert camera._software_binning == 3
+    assert camera.binning == 3
+
+def test_background_follows_software_binning():
+    camera = PlainCamera(adc_bits=8)
+    frame = (np.arange(16)[np.newaxis, :] + 10 * np.arange(12)[:, np.newaxis]).astype(np.uint8)
+    camera.background = frame.astype(np.float32)
+    camera.set_binning(2)
+    assert camera.background.shape == (6, 8)
+    out = camera.preprocess(frame)
+    assert out.shape == (6, 8)
+    assert out.max() == 0
+
+def test_background_is_dropped_with_hardware_binning():
+    camera = HardwareBinningCamera(adc_bits=8)
+    camera.background = np.full((12, 16), 10, dtype=np.float32)
+    camera.set_binning(2)
+    assert camera.background is None
@@ -0,0 +1,102 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from wepycon.AnalysisPool import AnalysisPool
+from wepycon.DebugCamera import DebugCamera
+from wepycon.SliceAnalysis import SliceAnalysis
+
+class Mean(object):
+    # picklable analysis, optionally slow
+    def __init__(self, scale=1.0, delay=0.0):
+        self.scale = scale
+        self.delay = delay
+
+    def __call__(self, img):
+        time.sleep(self.delay)
+        return float(img.mean()) * self.scale
+
+class Fails(object):
+    def __call__(self, img):
+        raise ValueError("no beam")
+
+def frames(n, shape=(48, 64)):
+    return [np.full(shape, i, dtype=np.uint16) for i in range(n)]
+
+def test_results_in_frame_order():
+    pool = AnalysisPool(Mean(), processes=2)
+    try:
+        for i, img in enumerate(frames(12)):
+            assert pool.submit(img, tag=i)
+        results = pool.wait_all()
+        assert [tag for tag, _ in results] == list(range(12))
+        assert [record for _, record in results] == [float(i) for i in range(12)]
+        assert len(pool) == 0
+        report = pool.report()
+        assert (report["submitted"], report["completed"], report["dropped"]) == (12, 12, 0)
+        assert len(pool.pids) == 2
+        assert not os.getpid() in pool.pids
+    finally:
+        pool.close()
+    assert len(pool.pids) == 2
+
+def test_same_records_as_in_process():
+    camera = DebugCamera(width=160, height=120, adc_bits=12, fps=None, jitter=2.0, seed=1)
+    images = [camera.get_image().copy() for _ in range(4)]
+    analysis = SliceAnalysis("COG", True)
+    expected = [analysis(img) for img in images]
+    pool = AnalysisPool(SliceAnalysis("COG", True), processes=1)
+    try:
+        records = list(pool.map(images))
+    finally:
+        pool.close()
+    assert len(records) == len(expected)
+    for record, reference in zip(records, expected):
+        assert record[3] == pytest.approx(reference[3])
+        np.testing.assert_allclose(record[1], reference[1])
+        np.testing.assert_allclose(record[2], reference[2])
+
+def test_frames_are_dropped_without_blocking():
+    pool = AnalysisPool(Mean(delay=0.3), processes=1, slots=1)
+    try:
+        assert pool.submit(frames(1)[0], block=False)
+        assert not pool.submit(frames(1)[0], block=False)
+        assert pool.dropped == 1
+        assert len(pool.wait_all()) == 1
+        # the slot is free again
+        assert pool.submit(frames(1)[0], block=False)
+        pool.wait_all()
+    finally:
+        pool.close()
+
+def test_larger_frames_and_new_analysis():
+    pool = AnalysisPool(Mean(), processes=1)
+    try:
+        pool.submit(np.full((8, 8), 3, dtype=np.uint8), tag="small")
+        pool.submit(np.full((100, 120), 5, dtype=np.uint16), tag="large")
+        pool.set_analysis(Mean(scale=10.0))
+        pool.submit(np.full((100, 120), 5, dtype=np.uint16), tag="scaled")
+        assert pool.wait_all() == [("small", 3.0), ("large", 5.0), ("scaled", 50.0)]
+    finally:
+        pool.close()
+
+def test_failing_analysis():
+    pool = AnalysisPool(Fails(), processes=1)
+    try:
+        pool.submit(frames(1)[0], tag=0)
+        assert pool.wait_all() == [(0, None)]
+        assert isinstance(pool.error, ValueError)
+    finally:
+        pool.close()
+
+def test_results_do_not_wait_by_default():
+    pool = AnalysisPool(Mean(delay=0.3), processes=1)
+    try:
+        pool.submit(frames(1)[0])
+        assert pool.results() == []
+        assert len(pool) == 1
+        assert len(pool.results(timeout=5)) == 1
+    finally:
+        pool.close()
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from wepycon.AbstractCamera import AbstractCamera
+from wepycon.BackgroundEstimator import BackgroundEstimator
+
+class StackCamera(AbstractCamera):
+    # hands out the frames of a stack, one per get_image call
+    def __init__(self, frames, adc_bits=8):
+        super(StackCamera, self).__init__()
+        self.frames = frames
+        self.adc_bits = adc_bits
+        self.width = frames.shape[2]
+        self.height = frames.shape[1]
+        self.px_size = 1.0
+        self.delivered = 0
+
+    def get_image(self, substract_background=True):
+        img = self.frames[self.delivered % len(self.frames)]
+        self.delivered += 1
+        return self.preprocess(img, substract_background)
+
+def noise_stack(n=30, shape=(12, 16), level=20.0, sigma=3.0, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.clip(np.rint(rng.normal(level, sigma, (n,) + shape)), 0, 255).astype(np.uint8)
+
+def test_running_mean_and_variance():
+    frames = noise_stack()
+    estimator = BackgroundEstimator()
+    for img in frames:
+        estimator.add(img)
+    assert estimator.n == len(frames)
+    np.testing.assert_allclose(estimator.mean, frames.mean(axis=0), atol=1e-4)
+    # residual_std is the pooled population standard deviation of the frames around the per pixel mean
+    assert estimator.residual_std == pytest.approx(np.sqrt(frames.var(axis=0).mean()), rel=1e-4)
+    assert estimator.residual_mean == pytest.approx(0.0, abs=1e-4)
+
+def test_geometry_change_starts_over():
+    estimator = BackgroundEstimator()
+    for img in noise_stack(5):
+        estimator.add(img)
+    estimator.add(np.full((4, 4), 7, dtype=np.uint8))
+    assert estimator.n == 1
+    np.testing.assert_array_equal(estimator.mean, 7)
+    assert estimator.residual_std == 0.0
+
+def test_empty_estimator():
+    estimator = BackgroundEstimator()
+    assert estimator.residual_mean == np.inf
+    assert estimator.residual_std == np.inf
+
+def test_ultracal_runs_until_max_iterations():
+    frames = noise_stack()
+    camera = StackCamera(frames)
+    calls = []
+    assert camera.ultracal(max_iterations=8, initial_frames=5, progress=lambda *args: calls.append(args))
+    assert [c[0] for c in calls] == list(range(1, 9))
+    # initial frames plus one frame per further iteration
+    assert camera.delivered == 5 + 7
+    np.testing.assert_allclose(camera.background, frames[:12].mean(axis=0), atol=1e-4)
+
+def test_ultracal_stops_at_the_target():
+    # the loop ends as soon as either residual reaches its target
+    camera = StackCamera(noise_stack())
+    assert camera.ultracal(max_iterations=20, target_std=100.0, initial_frames=4)
+    assert camera.delivered == 4
+    camera = StackCamera(noise_stack())
+    assert camera.ultracal(max_iterations=20, target_mean=100.0, initial_frames=4)
+    assert camera.delivered == 4
+
+def test_ultracal_abort_keeps_the_old_background():
+    camera = StackCamera(noise_stack())
+    background = np.zeros((12, 16), dtype=np.float32)
+    camera.background = background
+    def progress(iteration, max_iterations, mean, std):
+        return iteration < 3
+    assert not camera.ultracal(max_iterations=10, initial_frames=2, progress=progress)
+    assert camera.background is background
+    assert camera.delivered == 2 + 2
+
+def test_ultracal_ignores_the_current_background():
+    frames = noise_stack()
+    camera = StackCamera(frames)
+    camera.background = np.full((12, 16), 200, dtype=np.float32)
+    assert camera.ultracal(max_iterations=1, initial_frames=10)
+    np.testing.assert_allclose(camera.background, frames[:10].mean(axis=0), atol=1e-4)
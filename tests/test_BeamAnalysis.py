@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from wepycon.BeamAnalysis import BeamAnalysis
+
+def gaussian_beam(shape, cx, cy, wx, wy, angle=0.0, amplitude=200.0, offset=0.0, dtype=np.float64):
+    # 1/e^2 radii wx, wy along the axes of the ellipse, rotated by angle against x
+    y, x = np.mgrid[:shape[0], :shape[1]]
+    u = (x - cx) * np.cos(angle) + (y - cy) * np.sin(angle)
+    v = -(x - cx) * np.sin(angle) + (y - cy) * np.cos(angle)
+    img = amplitude * np.exp(-2 * u**2 / wx**2 - 2 * v**2 / wy**2) + offset
+    if np.issubdtype(dtype, np.integer):
+        img = np.rint(img)
+    return img.astype(dtype)
+
+def test_d4sigma_of_a_gaussian():
+    # the D4sigma diameter of a Gaussian beam is twice its 1/e^2 radius
+    img = gaussian_beam((300, 400), 210.3, 140.7, 40.0, 25.0)
+    beam = BeamAnalysis(baseline=None).analyse(img)
+    assert beam.x == pytest.approx(210.3, abs=0.05)
+    assert beam.y == pytest.approx(140.7, abs=0.05)
+    assert beam.d_x == pytest.approx(80.0, rel=0.01)
+    assert beam.d_y == pytest.approx(50.0, rel=0.01)
+    assert beam.d_major == pytest.approx(80.0, rel=0.01)
+    assert beam.d_minor == pytest.approx(50.0, rel=0.01)
+    assert beam.ellipticity == pytest.approx(50.0 / 80.0, rel=0.02)
+    assert (beam.peak_x, beam.peak_y) == (210, 141)
+
+def test_corner_baseline_removes_an_offset():
+    img = gaussian_beam((300, 400), 200.0, 150.0, 30.0, 30.0, amplitude=4000.0, offset=20.0, dtype=np.uint16)
+    beam = BeamAnalysis().analyse(img)
+    assert beam.x == pytest.approx(200.0, abs=0.1)
+    assert beam.y == pytest.approx(150.0, abs=0.1)
+    assert beam.d_x == pytest.approx(60.0, rel=0.02)
+    assert beam.d_y == pytest.approx(60.0, rel=0.02)
+    # without the correction the offset widens the beam
+    assert BeamAnalysis(baseline=None).analyse(img).d_x > 1.2 * beam.d_x
+
+def test_rotated_ellipse():
+    angle = np.radians(30)
+    img = gaussian_beam((400, 400), 200.0, 200.0, 50.0, 20.0, angle)
+    beam = BeamAnalysis(baseline=None).analyse(img)
+    assert beam.d_major == pytest.approx(100.0, rel=0.01)
+    assert beam.d_minor == pytest.approx(40.0, rel=0.01)
+    assert beam.angle == pytest.approx(angle, abs=0.01)
+
+def test_offset_is_added_to_positions():
+    img = gaussian_beam((100, 120), 60.0, 50.0, 10.0, 10.0)
+    analysis = BeamAnalysis(baseline=None)
+    beam = analysis.analyse(img)
+    shifted = analysis.analyse(img, offset=(100, 40))
+    assert shifted.x == pytest.approx(beam.x + 100)
+    assert shifted.y == pytest.approx(beam.y + 40)
+    assert (shifted.peak_x, shifted.peak_y) == (beam.peak_x + 100, beam.peak_y + 40)
+    assert shifted.d_x == pytest.approx(beam.d_x)
+
+def test_dark_frame():
+    assert BeamAnalysis(baseline=None).analyse(np.zeros((50, 60), dtype=np.uint8)) is None
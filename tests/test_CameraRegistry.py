@@ -0,0 +1,97 @@
+import sys
+
+import pytest
+
+import wepycon
+from wepycon.CameraRegistry import CameraRegistry
+from wepycon.DebugCamera import DebugCamera
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    # an importable backend module that records when it is imported
+    (tmp_path / "fake_backend.py").write_text("imported = True\nclass FakeCamera(object):\n    pass\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    sys.modules.pop("fake_backend", None)
+    yield "fake_backend"
+    sys.modules.pop("fake_backend", None)
+
+def test_backend_is_imported_on_first_access(backend):
+    registry = CameraRegistry()
+    registry.register("Fake", backend + ":FakeCamera")
+    assert "Fake" in registry
+    assert list(registry) == ["Fake"]
+    assert not backend in sys.modules
+    assert not registry.is_loaded("Fake")
+    cls = registry["Fake"]
+    assert cls.__name__ == "FakeCamera"
+    assert registry.is_loaded("Fake")
+    assert registry["Fake"] is cls
+
+def test_missing_requirements_hide_a_backend(backend):
+    registry = CameraRegistry()
+    registry.register("Fake", backend + ":FakeCamera", requires=("wepycon_no_such_module",))
+    registry.register("Debug", DebugCamera, requires=("numpy",))
+    assert not "Fake" in registry
+    assert list(registry) == ["Debug"]
+    assert len(registry) == 1
+    assert not registry.is_available("Fake")
+    assert not backend in sys.modules
+
+def test_failing_import_is_a_key_error():
+    registry = CameraRegistry()
+    registry.register("Broken", "wepycon_no_such_module:Camera")
+    with pytest.raises(KeyError):
+        registry["Broken"]
+    with pytest.raises(KeyError):
+        registry["Unknown"]
+
+def test_mapping_interface():
+    registry = CameraRegistry()
+    registry["Debug"] = DebugCamera
+    assert registry["Debug"] is DebugCamera
+    # registering again replaces the loaded class
+    registry.register("Debug", "wepycon.DebugCamera:DebugCamera")
+    assert not registry.is_loaded("Debug")
+    assert registry["Debug"] is DebugCamera
+    del registry["Debug"]
+    assert not "Debug" in registry
+    assert len(registry) == 0
+
+class EntryPoint(object):
+    def __init__(self, name, cls):
+        self.name = name
+        self.cls = cls
+        self.loaded = 0
+
+    def load(self):
+        self.loaded += 1
+        return self.cls
+
+def test_entry_points_are_scanned_lazily(monkeypatch):
+    import importlib.metadata
+    plugin = EntryPoint("Plugin", DebugCamera)
+    shadowed = EntryPoint("Debug", object)
+    scanned = []
+    def entry_points(group=None):
+        scanned.append(group)
+        return [plugin, shadowed]
+    monkeypatch.setattr(importlib.metadata, "entry_points", entry_points)
+    registry = CameraRegistry()
+    registry.register("Debug", DebugCamera)
+    registry.load_entry_points("test.cameras")
+    assert scanned == []
+    assert sorted(registry) == ["Debug", "Plugin"]
+    assert scanned == ["test.cameras"]
+    assert plugin.loaded == 0
+    assert registry["Plugin"] is DebugCamera
+    assert plugin.loaded == 1
+    # built in names are not replaced by plugins
+    assert registry["Debug"] is DebugCamera
+    assert shadowed.loaded == 0
+    list(registry)
+    assert scanned == ["test.cameras"]
+
+def test_default_registry():
+    assert wepycon.camera_types["DebugCamera"] is DebugCamera
+    for name in ["LogitechC500Camera", "OpenCVCamera", "ZwoAsiCamera", "DebugCamera", "ReplayCamera"]:
+        assert (name in wepycon.camera_types) == wepycon.camera_types.is_available(name)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from wepycon.Colormap import Colormap, lookup_table, palette
+
+def test_gray_lut():
+    lut = Colormap(None, adc_bits=8).lut(np.uint8)
+    assert lut.shape == (256, 4) and lut.dtype == np.uint8
+    np.testing.assert_array_equal(lut[:, 0], np.arange(256))
+    np.testing.assert_array_equal(lut[:, 0], lut[:, 2])
+    np.testing.assert_array_equal(lut[:, 3], 255)
+    assert not lut.flags.writeable
+
+def test_12_bit_frames_in_uint16():
+    lut = Colormap(None, adc_bits=12).lut(np.uint16)
+    assert lut.shape == (2**16, 4)
+    assert lut[0, 0] == 0
+    assert lut[2048, 0] == 128
+    # values above the adc range saturate
+    assert lut[4095, 0] == 255
+    assert lut[60000, 0] == 255
+
+def test_window_and_level():
+    colormap = Colormap(None, adc_bits=8, window=100, level=100)
+    assert colormap.limits == (50, 150)
+    lut = colormap.lut(np.uint8)
+    assert lut[50, 0] == 0 and lut[0, 0] == 0
+    assert lut[100, 0] == 128
+    assert lut[150, 0] == 255 and lut[255, 0] == 255
+    assert not colormap.is_identity
+
+def test_gamma():
+    lut = Colormap(None, adc_bits=8, gamma=2.0).lut(np.uint8)
+    assert lut[64, 0] == int(round(np.sqrt(64 / 255) * 255))
+
+def test_identity():
+    assert Colormap().is_identity
+    assert not Colormap("viridis").is_identity
+    assert not Colormap(gamma=0.5).is_identity
+
+def test_named_palette():
+    from matplotlib import colormaps
+    expected = colormaps["viridis"](np.linspace(0, 1, 256), bytes=True)
+    np.testing.assert_array_equal(palette("viridis"), expected)
+
+def test_tables_are_cached():
+    a = Colormap("jet", adc_bits=10).lut(np.uint16)
+    b = Colormap("jet", adc_bits=10).lut(np.dtype(np.uint16))
+    assert a is b
+    assert lookup_table("jet", np.dtype(np.uint16), 12, 0, 4095, 1.0) is not a
+
+def test_apply():
+    colormap = Colormap("viridis", adc_bits=8)
+    img = np.array([[0, 128], [255, 7]], dtype=np.uint8)
+    out = colormap.apply(img)
+    assert out.shape == (2, 2, 4) and out.dtype == np.uint8
+    np.testing.assert_array_equal(out[1, 0], palette("viridis")[255])
+    np.testing.assert_array_equal(out[0, 1], palette("viridis")[128])
+    # the output buffer is reused for frames of the same size
+    assert colormap.apply(img) is out
+    assert colormap.apply(np.zeros((3, 3), dtype=np.uint8)).shape == (3, 3, 4)
+    given = np.empty((2, 2, 4), dtype=np.uint8)
+    assert colormap.apply(img, out=given) is given
+
+@pytest.mark.parametrize("dtype, adc_bits", [(np.uint8, 8), (np.uint16, 12), (np.uint16, 16)])
+def test_apply_matches_the_lut(dtype, adc_bits):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 2**adc_bits, (20, 30)).astype(dtype)
+    colormap = Colormap("cividis", adc_bits=adc_bits, window=2**adc_bits // 2, level=2**adc_bits // 3, gamma=1.5)
+    np.testing.assert_array_equal(colormap.apply(img), colormap.lut(dtype)[img])
+
+def test_adc_bits_of_the_frame():
+    # the display stage passes the bit depth of the camera, the shared colormap stays as it is
+    colormap = Colormap(None, adc_bits=8)
+    img = np.array([[4095, 2048]], dtype=np.uint16)
+    out = colormap.apply(img, adc_bits=12)
+    assert list(out[0, :, 0]) == [255, 128]
+    assert colormap.adc_bits == 8
+    assert colormap.lut(np.uint16, 12) is Colormap(None, adc_bits=12).lut(np.uint16)
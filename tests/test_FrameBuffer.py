@@ -0,0 +1,112 @@
+import threading
+
+import numpy as np
+
+from wepycon.FrameBuffer import FrameBuffer
+from wepycon.FrameInfo import FrameInfo
+
+def frame(value, shape=(4, 6), dtype=np.uint8):
+    return np.full(shape, value, dtype=dtype)
+
+def test_latest_wins():
+    buf = FrameBuffer(4)
+    reader = buf.reader()
+    for i in range(6):
+        buf.put(frame(i), FrameInfo(i, float(i), None, None, None))
+    sequence, img = reader.latest(timeout=0)
+    assert sequence == 5
+    assert np.all(img == 5)
+    assert reader.info.sequence == 5
+    # nothing new since
+    assert reader.latest(timeout=0) == (None, None)
+    buf.put(frame(6))
+    assert reader.latest(timeout=0)[0] == 6
+
+def test_lossless_back_pressure():
+    buf = FrameBuffer(4)
+    reader = buf.reader(lossless=True)
+    for i in range(4):
+        assert buf.put(frame(i), timeout=0)
+    # the ring is full of unread frames, the producer has to wait
+    assert not buf.put(frame(4), timeout=0.01)
+    assert reader.read(timeout=0)[0] == 0
+    assert buf.put(frame(4), timeout=0)
+    assert [reader.read(timeout=0)[0] for _ in range(4)] == [1, 2, 3, 4]
+    assert reader.dropped == 0
+
+def test_lossless_reader_gets_every_frame():
+    buf = FrameBuffer(2)
+    reader = buf.reader(lossless=True)
+    n = 50
+    def produce():
+        for i in range(n):
+            buf.put(frame(i))
+    producer = threading.Thread(target=produce)
+    producer.start()
+    received = []
+    for _ in range(n):
+        sequence, img = reader.read(timeout=5)
+        assert int(img[0, 0]) == sequence
+        received.append(sequence)
+    producer.join()
+    assert received == list(range(n))
+    assert reader.dropped == 0
+
+def test_overrun_is_counted_as_dropped():
+    buf = FrameBuffer(4)
+    reader = buf.reader()
+    for i in range(10):
+        buf.put(frame(i))
+    # only the last 4 frames are left in the ring
+    sequence, img = reader.read(timeout=0)
+    assert sequence == 6
+    assert np.all(img == 6)
+    assert reader.dropped == 6
+    assert [reader.read(timeout=0)[0] for _ in range(3)] == [7, 8, 9]
+    assert reader.dropped == 6
+
+def test_geometry_change():
+    buf = FrameBuffer(4)
+    lossless = buf.reader(lossless=True)
+    reader = buf.reader()
+    buf.put(frame(0))
+    buf.put(frame(1))
+    buf.put(frame(2, shape=(8, 8), dtype=np.uint16))
+    # the frames of the old geometry are gone, the lossless reader accounts for them
+    assert lossless.dropped == 2
+    sequence, img = lossless.read(timeout=0)
+    assert sequence == 2
+    assert img.shape == (8, 8) and img.dtype == np.uint16
+    sequence, img = reader.read(timeout=0)
+    assert sequence == 2
+    assert img.shape == (8, 8) and img.dtype == np.uint16
+
+def test_reset_with_existing_readers():
+    buf = FrameBuffer(4)
+    lossless = buf.reader(lossless=True)
+    reader = buf.reader()
+    for i in range(3):
+        buf.put(frame(i))
+    assert [lossless.read(timeout=0)[0] for _ in range(3)] == [0, 1, 2]
+    assert reader.latest(timeout=0)[0] == 2
+    # as on a restart of the AcquisitionEngine
+    buf.close()
+    buf.reset()
+    assert buf.frames_written == 0
+    assert buf.put(frame(10), timeout=0)
+    sequence, img = lossless.read(timeout=0)
+    assert sequence == 0 and np.all(img == 10)
+    sequence, img = reader.latest(timeout=0)
+    assert sequence == 0 and np.all(img == 10)
+
+def test_close_releases_readers():
+    buf = FrameBuffer(4)
+    reader = buf.reader()
+    result = []
+    waiting = threading.Thread(target=lambda: result.append(reader.latest(timeout=5)))
+    waiting.start()
+    buf.close()
+    waiting.join(1)
+    assert not waiting.is_alive()
+    assert result == [(None, None)]
+    assert not buf.put(frame(0))
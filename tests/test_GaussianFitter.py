@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from wepycon.GaussianFitter import GaussianFitter
+from wepycon.GaussianProfile import GaussianProfile
+
+def test_recovers_center_and_radius():
+    profiles = [GaussianProfile(180.0, 62.4, 21.0, 12.0), GaussianProfile(90.0, 151.8, 48.5, 3.0)]
+    data = [GaussianFitter.evaluate(profiles[0], 128), GaussianFitter.evaluate(profiles[1], 300)]
+    fits = GaussianFitter().fit(data)
+    for fit, profile in zip(fits, profiles):
+        assert fit.center == pytest.approx(profile.center, abs=0.01)
+        assert fit.radius == pytest.approx(profile.radius, rel=0.005)
+        assert fit.amplitude == pytest.approx(profile.amplitude, rel=0.01)
+        assert fit.offset == pytest.approx(profile.offset, abs=0.5)
+
+def test_block_averaged_profiles():
+    # longer than max_samples, the fit runs on block averages and is corrected for their width
+    profile = GaussianProfile(1000.0, 2300.0, 400.0, 50.0)
+    fit, = GaussianFitter(max_samples=256).fit([GaussianFitter.evaluate(profile, 5472)])
+    assert fit.center == pytest.approx(profile.center, abs=1.0)
+    assert fit.radius == pytest.approx(profile.radius, rel=0.01)
+
+def test_noisy_profile():
+    rng = np.random.default_rng(1)
+    profile = GaussianProfile(200.0, 320.0, 60.0, 10.0)
+    data = GaussianFitter.evaluate(profile, 640) + rng.normal(0, 4, 640)
+    fit, = GaussianFitter().fit([data])
+    assert fit.center == pytest.approx(profile.center, abs=0.5)
+    assert fit.radius == pytest.approx(profile.radius, rel=0.02)
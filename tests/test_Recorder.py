@@ -0,0 +1,120 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from wepycon.DebugCamera import DebugCamera
+from wepycon.FrameInfo import FrameInfo
+from wepycon.Recorder import Recorder
+
+class BlockingRecorder(Recorder):
+    # the writer stops at its first frame until release() is called, the queue backs up meanwhile
+    def __init__(self, *args, **kwargs):
+        super(BlockingRecorder, self).__init__(*args, **kwargs)
+        self.writing = threading.Event()
+        self._release = threading.Event()
+
+    def _write(self, idx):
+        self.writing.set()
+        self._release.wait(5)
+        super(BlockingRecorder, self)._write(idx)
+
+    def release(self):
+        self._release.set()
+
+def frame(value, shape=(6, 8)):
+    return np.full(shape, value, dtype=np.uint16)
+
+def info(sequence):
+    return FrameInfo(sequence, 100.0 + sequence, 2.5, None, None)
+
+def test_lossless_write_and_readback(tmp_path):
+    camera = DebugCamera(width=8, height=6, adc_bits=12)
+    recorder = Recorder(str(tmp_path / "rec.npy"), max_frames=20)
+    recorder.start(camera)
+    for i in range(10):
+        assert recorder.push(frame(i), info(i))
+    report = recorder.stop()
+    assert report["frames"] == 10
+    assert report["dropped"] == 0
+    frames = np.load(recorder.frames_path)
+    assert frames.shape == (10, 6, 8)
+    assert frames.dtype == np.uint16
+    np.testing.assert_array_equal(frames[:, 0, 0], np.arange(10))
+    timestamps = np.load(recorder.timestamps_path)
+    np.testing.assert_array_equal(timestamps["sequence"], np.arange(10))
+    np.testing.assert_array_equal(timestamps["timestamp"], 100.0 + np.arange(10))
+    np.testing.assert_array_equal(timestamps["exposure"], 2.5)
+    assert np.all(np.isnan(timestamps["gain"]))
+    with open(recorder.metadata_path) as fh:
+        metadata = json.load(fh)
+    assert metadata["camera"] == "DebugCamera"
+    assert (metadata["width"], metadata["height"], metadata["adc_bits"]) == (8, 6, 12)
+    assert metadata["settings"] == json.loads(json.dumps(camera.settings))
+    assert metadata["frames_file"] == "rec.npy"
+    assert metadata["report"]["frames"] == 10
+
+def test_unfinished_budget_is_truncated(tmp_path):
+    recorder = Recorder(str(tmp_path / "rec"), max_frames=100)
+    recorder.start()
+    for i in range(3):
+        recorder.push(frame(i))
+    recorder.stop()
+    assert np.load(recorder.frames_path).shape == (3, 6, 8)
+    timestamps = np.load(recorder.timestamps_path)
+    assert timestamps.shape == (3,)
+    np.testing.assert_array_equal(timestamps["sequence"], np.arange(3))
+
+def test_budget(tmp_path):
+    recorder = Recorder(str(tmp_path / "rec"), max_frames=3)
+    recorder.start()
+    assert [recorder.push(frame(i)) for i in range(5)] == [True, True, True, False, False]
+    assert recorder.is_full
+    recorder.stop()
+    np.testing.assert_array_equal(np.load(recorder.frames_path)[:, 0, 0], [0, 1, 2])
+
+@pytest.mark.parametrize("policy, accepted, written", [
+    ("newest", [True, True, True, True, False], [0, 1, 2, 3]),
+    ("oldest", [True, True, True, True, True], [0, 2, 3, 4]),
+    ])
+def test_drop_policies(tmp_path, policy, accepted, written):
+    recorder = BlockingRecorder(str(tmp_path / "rec"), max_frames=10, queue_size=4, drop_policy=policy)
+    recorder.start()
+    results = [recorder.push(frame(0))]
+    # frame 0 occupies its slot in the writer, the other three slots queue up
+    assert recorder.writing.wait(5)
+    results += [recorder.push(frame(i)) for i in range(1, 5)]
+    assert results == accepted
+    assert recorder.dropped == 1
+    recorder.release()
+    report = recorder.stop()
+    assert report["frames"] == 4
+    assert report["max_queued"] == 3
+    np.testing.assert_array_equal(np.load(recorder.frames_path)[:, 0, 0], written)
+
+def test_unknown_drop_policy():
+    with pytest.raises(ValueError):
+        Recorder("rec", drop_policy="random")
+
+def test_geometry_change_stops_the_recording(tmp_path):
+    recorder = Recorder(str(tmp_path / "rec"), max_frames=10)
+    recorder.start()
+    assert recorder.push(frame(0))
+    assert recorder.push(frame(1))
+    assert not recorder.push(frame(2, shape=(12, 16)))
+    assert recorder.is_full
+    assert not recorder.push(frame(3))
+    recorder.stop()
+    frames = np.load(recorder.frames_path)
+    assert frames.shape == (2, 6, 8)
+
+def test_push_before_start_and_after_stop(tmp_path):
+    recorder = Recorder(str(tmp_path / "rec"), max_frames=10)
+    assert not recorder.push(frame(0))
+    recorder.start()
+    assert recorder(frame(1))
+    recorder.stop()
+    assert not recorder.is_recording
+    assert not recorder.push(frame(2))
+    assert recorder.frames == 1
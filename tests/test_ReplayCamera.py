@@ -0,0 +1,96 @@
+import json
+
+import numpy as np
+import pytest
+
+from wepycon.FrameInfo import FrameInfo
+from wepycon.Recorder import Recorder
+from wepycon.ReplayCamera import ReplayCamera
+
+@pytest.fixture
+def recording(tmp_path):
+    # a 5 frame 12 bit recording with timestamps 10 ms apart and the Recorder sidecar
+    recorder = Recorder(str(tmp_path / "rec"), max_frames=5)
+    recorder._metadata = {"camera": "Test", "px_size": 2.4e-6, "px_size_unit": 1.0, "adc_bits": 12}
+    recorder.start()
+    for i in range(5):
+        recorder.push(np.full((6, 8), 100 * i, dtype=np.uint16), FrameInfo(i, 50.0 + 0.01 * i, 1.5 + i, 3.0, None))
+    recorder.stop()
+    return recorder.frames_path
+
+def test_replays_a_recording(recording):
+    camera = ReplayCamera(recording, playback="Fast", loop=False)
+    assert (camera.width, camera.height, camera.adc_bits) == (8, 6, 12)
+    assert camera.px_size_um == pytest.approx(2.4)
+    assert str(camera) == "rec.npy"
+    values = []
+    for i in range(5):
+        img = camera.get_image()
+        assert img.dtype == np.uint16 and img.shape == (6, 8)
+        values.append(int(img[0, 0]))
+        assert camera.frame_info() == (1.5 + i, 3.0, None)
+    assert values == [0, 100, 200, 300, 400]
+    camera.close()
+
+def test_end_of_stream_without_loop(recording):
+    camera = ReplayCamera(recording, playback="Fast", loop=False)
+    for i in range(5):
+        camera.get_image()
+    assert camera.get_image() is None
+    # the background calibration stops instead of running into the end of the recording
+    assert not camera.ultracal(max_iterations=3, initial_frames=2)
+    assert camera.background is None
+    camera.close()
+
+def test_loop_and_seek(recording):
+    camera = ReplayCamera(recording, playback="Fast", loop=True)
+    values = [int(camera.get_image()[0, 0]) for _ in range(7)]
+    assert values == [0, 100, 200, 300, 400, 0, 100]
+    camera.seek(13)
+    assert int(camera.get_image()[0, 0]) == 300
+    camera.close()
+
+def test_ultracal_on_a_replay(recording):
+    camera = ReplayCamera(recording, playback="Fast", loop=True)
+    assert camera.ultracal(max_iterations=1, initial_frames=5)
+    np.testing.assert_allclose(camera.background, 200.0)
+    camera.close()
+
+def test_settings_round_trip(recording):
+    camera = ReplayCamera(recording, playback="Fast")
+    settings = dict(camera.settings)
+    settings["Binning"] = 1
+    camera.settings = settings
+    assert camera.binning == 2
+    assert camera.get_image().shape == (3, 4)
+    camera.settings = json.loads(json.dumps(camera.settings))
+    assert camera.binning == 2
+    assert camera.playback == "Fast"
+    camera.close()
+
+def test_fixed_rate_playback(recording):
+    camera = ReplayCamera(recording, playback="Fixed", fps=1000, loop=False)
+    for _ in range(5):
+        camera.get_image()
+    assert camera._frame_time(4) == pytest.approx(0.004)
+    camera.settings = {"Playback": 0}
+    # the recorded timestamps set the pace of the original playback
+    assert camera._frame_time(4) == pytest.approx(0.04)
+    camera.close()
+
+def test_plain_npy_without_sidecar(tmp_path):
+    path = str(tmp_path / "plain.npy")
+    np.save(path, np.zeros((3, 4, 5), dtype=np.uint8))
+    camera = ReplayCamera(path, playback="Fast")
+    assert (camera.width, camera.height, camera.adc_bits) == (5, 4, 8)
+    assert camera.px_size_um is None
+    assert camera.timestamps is None
+    assert camera.frame_info() == (None, None, None)
+    camera.close()
+
+def test_list_devices(recording, tmp_path, monkeypatch):
+    monkeypatch.setenv("WEPYCON_REPLAY_PATH", str(tmp_path))
+    assert ReplayCamera.list_devices() == [(0, "rec.npy")]
+    camera = ReplayCamera.from_device_number(0)
+    assert camera.path == recording
+    camera.close()
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from wepycon.StageQueue import StageQueue
+
+def test_fifo():
+    queue = StageQueue(3)
+    for i in range(3):
+        assert queue.put(i) is None
+    assert len(queue) == 3
+    assert [queue.get(timeout=0) for _ in range(3)] == [0, 1, 2]
+    assert queue.get(timeout=0) is None
+
+def test_full_queue_drops_the_oldest():
+    queue = StageQueue(2)
+    queue.put("a")
+    queue.put("b")
+    # the dropped item goes back to the producer
+    assert queue.put("c") == "a"
+    assert queue.dropped == 1
+    assert [queue.get(timeout=0), queue.get(timeout=0)] == ["b", "c"]
+
+def test_get_waits_for_an_item():
+    queue = StageQueue()
+    threading.Timer(0.05, queue.put, args=("late",)).start()
+    assert queue.get(timeout=5) == "late"
+
+def test_get_times_out():
+    queue = StageQueue()
+    t0 = time.monotonic()
+    assert queue.get(timeout=0.05) is None
+    assert time.monotonic() - t0 >= 0.04
+
+def test_close_wakes_up_a_consumer_and_keeps_the_items():
+    queue = StageQueue()
+    result = []
+    consumer = threading.Thread(target=lambda: result.append(queue.get(timeout=5)))
+    consumer.start()
+    time.sleep(0.02)
+    queue.close()
+    consumer.join(1)
+    assert not consumer.is_alive()
+    assert result == [None]
+    assert queue.closed
+    queue.put(1)
+    # items put before or after closing are still handed out
+    assert queue.get(timeout=0) == 1
+    assert queue.get(timeout=5) is None
+
+def test_wait_open():
+    queue = StageQueue()
+    assert queue.wait_open(timeout=0)
+    queue.close()
+    assert not queue.wait_open(timeout=0.01)
+    threading.Timer(0.05, queue.open).start()
+    assert queue.wait_open(timeout=5)
+    assert not queue.closed
@@ -0,0 +1,80 @@
+import importlib
+import json
+import sys
+import types
+
+import numpy as np
+import pytest
+
+class FakeDevice(object):
+    def __init__(self, camera_id):
+        self.image_type = 0
+        self.roi = (0, 0, 5496, 3672)
+        self.bins = 1
+        self.controls = {}
+
+    def get_controls(self):
+        return {"Gain": {"IsWritable": True, "MinValue": 0, "MaxValue": 570, "DefaultValue": 200, "ControlType": 5}}
+
+    def set_control_value(self, control, value, auto=False):
+        self.controls[control] = value
+
+    def set_image_type(self, image_type):
+        self.image_type = image_type
+
+    def get_camera_property(self):
+        return {"PixelSize": 2.4, "MaxWidth": 5496, "MaxHeight": 3672, "Name": "fake",
+                "SupportedBins": [1, 2, 0], "IsUSB3Host": True}
+
+    def start_video_capture(self):
+        pass
+
+    def stop_video_capture(self):
+        pass
+
+    def set_roi(self, start_x, start_y, width, height, bins=None):
+        self.roi = (start_x, start_y, width, height)
+        self.bins = bins
+
+    def capture_video_frame(self, timeout=0):
+        return np.zeros((self.roi[3], self.roi[2]), dtype=np.uint16 if self.image_type else np.uint8)
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def camera(monkeypatch):
+    # stands in for the SDK bindings, the ZwoAsiCamera module is imported against it
+    asi = types.ModuleType("zwoasi")
+    asi.ASI_BANDWIDTHOVERLOAD, asi.ASI_IMG_RAW8, asi.ASI_IMG_RAW16, asi.ASI_HIGH_SPEED_MODE = 6, 0, 2, 14
+    asi.ASI_EXPOSURE, asi.ASI_GAIN = 1, 0
+    asi.init = lambda filename: None
+    asi.list_cameras = lambda: ["fake"]
+    asi.Camera = FakeDevice
+    monkeypatch.setitem(sys.modules, "zwoasi", asi)
+    monkeypatch.delitem(sys.modules, "wepycon.ZwoAsiCamera", raising=False)
+    module = importlib.import_module("wepycon.ZwoAsiCamera")
+    yield module.ZwoAsiCamera(0)
+    sys.modules.pop("wepycon.ZwoAsiCamera", None)
+
+def test_list_settings_are_indices(camera):
+    names, index = camera.controls_available["ADCbits"][1]
+    assert camera.settings["ADCbits"] == index == names.index("8")
+    names, index = camera.controls_available["Binning"][1]
+    assert camera.settings["Binning"] == index == names.index("1x1")
+
+def test_settings_round_trip(camera):
+    settings = dict(camera.settings)
+    settings["ADCbits"] = 1
+    settings["Binning"] = camera.supported_bins.index(2)
+    settings["Gain"] = 300
+    camera.settings = json.loads(json.dumps(settings))
+    assert camera.adc_bits == 16
+    assert camera.binning == 2
+    assert camera.device.controls[camera.controls_available["Gain"][2]] == 300
+    # the settings read back apply unchanged, as a recording's sidecar does
+    saved = json.loads(json.dumps(camera.settings))
+    assert saved == settings
+    camera.settings = saved
+    assert camera.adc_bits == 16 and camera.binning == 2
+    assert camera.get_image().shape == (camera.height, camera.width) == (3672 // 2, 5496 // 2 // 8 * 8)
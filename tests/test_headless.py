@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from wepycon import headless
+
+def records(path):
+    with open(path) as fh:
+        return [json.loads(line) for line in fh]
+
+def test_list(tmp_path):
+    output = tmp_path / "list.jsonl"
+    assert headless.main(["--list", "--output", str(output)]) == 0
+    cameras = dict((record["camera"], record["devices"]) for record in records(output))
+    assert "DebugCamera" in cameras
+
+def test_settings_round_trip(tmp_path):
+    dumped = tmp_path / "settings.json"
+    assert headless.main(["DebugCamera", "--dump-settings", "--output", str(dumped)]) == 0
+    settings = records(dumped)[0]
+    output = tmp_path / "again.json"
+    assert headless.main(["DebugCamera", "--settings", str(dumped), "--dump-settings", "--output", str(output)]) == 0
+    assert records(output)[0] == settings
+
+@pytest.mark.parametrize("processes", [0, 1])
+def test_frames(tmp_path, processes):
+    output = tmp_path / "beam.jsonl"
+    basename = str(tmp_path / "recording")
+    assert headless.main(["DebugCamera", "--frames", "3", "--rate", "0", "--processes", str(processes),
+            "--record", basename, "--output", str(output)]) == 0
+    lines = records(output)
+    assert lines[0]["event"] == "start"
+    beams = [line for line in lines if not "event" in line]
+    assert len(beams) >= 3
+    assert (tmp_path / "recording.json").exists()
+
+def test_ultracal_interval_needs_block_command(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        headless.main(["DebugCamera", "--ultracal-interval", "1", "--output", str(tmp_path / "beam.jsonl")])
+    assert "--block-command" in capsys.readouterr().err
+
+def test_block_command(tmp_path):
+    blocked = tmp_path / "blocked"
+    output = tmp_path / "beam.jsonl"
+    assert headless.main(["DebugCamera", "--ultracal", "--ultracal-iterations", "2",
+            "--block-command", "touch " + str(blocked), "--unblock-command", "rm " + str(blocked),
+            "--frames", "1", "--rate", "0", "--output", str(output)]) == 0
+    # unblocked again after the calibration
+    assert not blocked.exists()
+    events = [line for line in records(output) if line.get("event") == "ultracal"]
+    assert len(events) == 1 and events[0]["success"]
+
+def test_failing_block_command_skips_ultracal(tmp_path):
+    output = tmp_path / "beam.jsonl"
+    assert headless.main(["DebugCamera", "--ultracal-interval", "0.01", "--block-command", "false",
+            "--frames", "5", "--rate", "0", "--output", str(output)]) == 0
+    events = [line for line in records(output) if line.get("event") == "ultracal"]
+    assert events and not any(event["success"] for event in events)
+
+def test_failing_block_command_before_measuring(tmp_path):
+    output = tmp_path / "beam.jsonl"
+    assert headless.main(["DebugCamera", "--ultracal", "--block-command", "false",
+            "--frames", "1", "--rate", "0", "--output", str(output)]) == 0
+    lines = records(output)
+    assert lines[0] == dict(lines[0], event="ultracal", success=False)
+    assert lines[1]["background_subtracted"] is False
@@ -1,32 +1,238 @@
 from abc import ABC
 import numpy as np
 
+from .BackgroundEstimator import BackgroundEstimator
+from .BlockAverage import BlockAverage
+
 class AbstractCamera(ABC):
+    decode_off_thread = False
+    supports_hardware_roi = False
+    supported_bins = [1, 2, 3, 4]
+    # length of the unit of px_size in metres, None if px_size is only a relative scale
+    px_size_unit = None
+
     def __init__(self, *args):
+        # (x, y, width, height) programmed into the sensor, None for the full frame
+        self.roi = None
+        self.binning = 1
+        self._software_binning = 1
         self.background = None
+        self._preprocess_buffer = None
+        self._binner = BlockAverage()
+
+    # subclasses assign the unbinned sensor geometry, reading it yields the geometry of the delivered frames
+    @property
+    def width(self):
+        return self.sensor_width // self.binning
+
+    @width.setter
+    def width(self, value):
+        self.sensor_width = value
+
+    @property
+    def height(self):
+        return self.sensor_height // self.binning
+
+    @height.setter
+    def height(self, value):
+        self.sensor_height = value
+
+    @property
+    def px_size(self):
+        return self.sensor_px_size * self.binning
+
+    @px_size.setter
+    def px_size(self, value):
+        self.sensor_px_size = value
+
+    @property
+    def px_size_um(self):
+        # size of a delivered pixel in micrometres, None if unknown
+        if self.px_size_unit is None:
+            return None
+        return self.px_size * self.px_size_unit * 1e6
+
+    def _add_binning_control(self):
+        names = ["{0:d}x{0:d}".format(b) for b in self.supported_bins]
+        self.controls_available["Binning"] = [list, (names, self.supported_bins.index(self.binning)), None]
+
+    def set_binning(self, binning):
+        if binning == self.binning:
+            return
+        background, geometry = self._background, self._background_geometry
+        if self._set_hardware_binning(binning):
+            self._software_binning = 1
+        else:
+            # the sensor goes back to full resolution, the whole factor is binned in software
+            self._set_hardware_binning(1)
+            self._software_binning = binning
+        self.binning = binning
+        if background is None:
+            return
+        if geometry == (None, 1) and self.roi is None and self._software_binning == binning:
+            # the frames are binned in software from the full resolution, the background is binned alike
+            self.background = self._bin_background(background, binning)
+        else:
+            print( "[AbstractCamera] binning changed, the background is dropped, run ultracal again" )
+            self.background = None
+
+    @staticmethod
+    def _bin_background(background, binning):
+        h, w = background.shape[0] // binning, background.shape[1] // binning
+        blocks = background[:h*binning, :w*binning].reshape(h, binning, w, binning)
+        return blocks.mean(axis=(1, 3), dtype=np.float64).astype(np.float32)
+
+    def _set_hardware_binning(self, binning):
+        # returns True if the camera bins on the sensor
+        return False
+
+    def software_bin(self, img, binning):
+        # block average of binning x binning pixels, the result keeps the dtype of img
+        return self._binner(img, binning)
+
+    @property
+    def background(self):
+        return self._background
+
+    @background.setter
+    def background(self, value):
+        # the background belongs to the ROI and binning it was taken with
+        self._background = value
+        self._background_geometry = (self.roi, self.binning)
+        self._native_background = None
+        self._native_background_key = None
+
+    def _background_for(self, shape):
+        # the part of the background under the current ROI, None if it was taken with a geometry that does not cover it
+        roi, binning = self._background_geometry
+        if binning != self.binning:
+            return None
+        x, y = self.roi_offset
+        if roi is not None:
+            x, y = x - roi[0], y - roi[1]
+        if x < 0 or y < 0:
+            return None
+        background = self._background[y:y+shape[0], x:x+shape[1]]
+        if background.shape != shape:
+            return None
+        return background
+
+    @property
+    def roi_offset(self):
+        if self.roi is None:
+            return 0, 0
+        return self.roi[0], self.roi[1]
+
+    def set_roi(self, roi):
+        raise NotImplementedError("set_roi")
+
+    def close(self):
+        # releases the device, the camera is not used afterwards
+        pass
+
+    @property
+    def native_dtype(self):
+        return np.uint8 if self.adc_bits <= 8 else np.uint16
+
+    def preprocess(self, img, substract_background=True):
+        # returns frames in the native dtype of the camera; the background corrected
+        # frame lives in a buffer that is reused by the next call
+        dtype = self.native_dtype
+        max_value = 2**self.adc_bits - 1
+        if img.dtype != dtype:
+            img = np.clip(img, 0, max_value).astype(dtype)
+        if self._software_binning > 1:
+            img = self.software_bin(img, self._software_binning)
+
+        if not substract_background or self._background is None:
+            return img
+
+        background = self._native_background
+        key = (dtype, img.shape, self.roi, self.binning)
+        if background is None or self._native_background_key != key:
+            background = self._background_for(img.shape)
+            if background is None:
+                print( "[AbstractCamera] the background was taken with ROI {0} at {1:d}x binning and does not cover ROI {2} at {3:d}x, "
+                    "it is dropped, run ultracal again".format(self._background_geometry[0], self._background_geometry[1], self.roi, self.binning) )
+                self.background = None
+                return img
+            background = np.clip(np.rint(background), 0, max_value).astype(dtype)
+            self._native_background = background
+            self._native_background_key = key
+
+        out = self._preprocess_buffer
+        if out is None or out.shape != img.shape or out.dtype != dtype:
+            out = np.empty(img.shape, dtype=dtype)
+            self._preprocess_buffer = out
+
+        # saturating subtraction: max(img, bg) - bg never wraps around
+        np.maximum(img, background, out=out)
+        out -= background
+        if max_value < np.iinfo(dtype).max:
+            np.minimum(out, max_value, out=out)
+        return out
 
     def get_image(self, *args):
         raise NotImplementedError("get_image")
 
+    def frame_info(self):
+        # exposure, gain and dropped frame count at capture time
+        settings = getattr(self, "_settings", {})
+        return settings.get("Exposure"), settings.get("Gain"), None
+
+    def read_raw(self):
+        raise NotImplementedError("read_raw")
+
+    def decode_raw(self, img):
+        return img
+
     @classmethod
     def from_device_dialog(cls):
         raise NotImplementedError("from_device_dialog")
 
+    @classmethod
+    def list_devices(cls):
+        raise NotImplementedError("list_devices")
+
+    @classmethod
+    def scan_devices(cls, callback=None):
+        # like list_devices, but reports every device through callback as soon as it is found
+        devices = cls.list_devices()
+        if callback is not None:
+            for device in devices:
+                callback(device)
+        return devices
+
     @property
     def settings(self):
         raise NotImplementedError("settings")
 
-    def ultracal(self, max_iterations=20, target_mean=-1, target_std=-1):
+    def ultracal(self, max_iterations=20, target_mean=-1, target_std=-1, initial_frames=10, progress=None):
         #CCD Camera Instrumental Background Estimation Algorithm, Sankowski and Fabijanska
-        imgs = np.array([self.get_image(substract_background=False) for i in range(10)])
-        background = np.mean(imgs, axis=0)
-        mean = abs(np.mean(imgs - background[np.newaxis,:,:]))
-        std = np.std(imgs - background[np.newaxis,:,:])
+        # progress(iteration, max_iterations, mean, std) may return False to abort
+        # get_image returns None when a camera has no more frames, e.g. a replay at its end
+        estimator = BackgroundEstimator()
+        for i in range(initial_frames):
+            img = self.get_image(substract_background=False)
+            if img is None:
+                print( "[AbstractCamera] ultracal: the camera delivers no more frames" )
+                return False
+            estimator.add(img)
+        mean = estimator.residual_mean
+        std = estimator.residual_std
         iterations = 1
+        if progress is not None and progress(iterations, max_iterations, mean, std) is False:
+            return False
         while (mean > target_mean) and (std > target_std) and iterations < max_iterations:
             iterations += 1
-            imgs = np.append(imgs, self.get_image(substract_background=False)[np.newaxis,:,:], axis=0)
-            background = np.mean(imgs, axis=0)
-            mean = abs(np.mean(imgs - background[np.newaxis,:,:]))
-            std = np.std(imgs - background[np.newaxis,:,:])
-        self.background = background
+            img = self.get_image(substract_background=False)
+            if img is None:
+                print( "[AbstractCamera] ultracal: the camera delivers no more frames" )
+                return False
+            estimator.add(img)
+            mean = estimator.residual_mean
+            std = estimator.residual_std
+            if progress is not None and progress(iterations, max_iterations, mean, std) is False:
+                return False
+        self.background = estimator.mean
+        return True
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from .FrameBuffer import FrameBuffer
+from .FrameInfo import FrameInfo
+
+class AcquisitionEngine(object):
+    def __init__(self, camera, buffer_size=8, decode_threads=2):
+        self.camera = camera
+        self.buffer = FrameBuffer(buffer_size)
+        self.frames = 0
+        self.captured = 0
+        # frames lost by the camera or driver, as reported by the SDK
+        self.dropped = 0
+        self.decode_threads = decode_threads
+        self._decoder = None
+        self._pending = deque()
+        # callables fed with (img, info) of every published frame on the acquisition thread
+        self._sinks = []
+        self._thread = None
+        self._cond = threading.Condition()
+        self._alive = False
+        self._paused = True
+        self._capturing = False
+
+    @property
+    def is_running(self):
+        return self._alive and not self._paused
+
+    @property
+    def native_id(self):
+        # os thread id of the acquisition thread, None while it is not running
+        thread = self._thread
+        return thread.native_id if thread is not None and thread.is_alive() else None
+
+    def start(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self.buffer.reset()
+                self._alive = True
+                self._thread = threading.Thread(target=self._run, name="AcquisitionEngine-{}".format(self.camera), daemon=True)
+                self._thread.start()
+            self._paused = False
+            self._cond.notify_all()
+
+    def resume(self):
+        self.start()
+
+    def pause(self):
+        # returns once the camera is no longer in use by the acquisition thread
+        with self._cond:
+            self._paused = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: not self._capturing)
+
+    def stop(self):
+        with self._cond:
+            self._alive = False
+            self._paused = True
+            self._cond.notify_all()
+        self.buffer.close()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        if self._decoder is not None:
+            self._decoder.shutdown()
+            self._decoder = None
+
+    def add_sink(self, sink):
+        # sinks must not block, img is only valid for the duration of the call
+        self._sinks = self._sinks + [sink]
+
+    def remove_sink(self, sink):
+        self._sinks = [s for s in self._sinks if s is not sink]
+
+    @contextmanager
+    def paused(self):
+        was_running = self.is_running
+        self.pause()
+        try:
+            yield
+        finally:
+            if was_running:
+                self.resume()
+
+    def _run(self):
+        while True:
+            if self._paused:
+                self._flush(block=True)
+            with self._cond:
+                self._cond.wait_for(lambda: not self._paused or not self._alive)
+                if not self._alive:
+                    break
+                self._capturing = True
+            try:
+                img, info = self._grab()
+            except Exception as e:
+                print( e )
+                img = None
+            finally:
+                with self._cond:
+                    self._capturing = False
+                    self._cond.notify_all()
+
+            if img is None:
+                continue
+            if hasattr(img, "result"):
+                self._pending.append((img, info))
+            else:
+                self._flush(block=True)
+                self._publish(img, info)
+            self._flush(block=False)
+        self._flush(block=True)
+
+    def _grab(self):
+        camera = self.camera
+        if not camera.decode_off_thread:
+            img = camera.get_image()
+            return img, self._frame_info()
+
+        raw = camera.read_raw()
+        if raw is None:
+            return None, None
+        info = self._frame_info()
+        if self._decoder is None:
+            self._decoder = ThreadPoolExecutor(max_workers=self.decode_threads)
+        return self._decoder.submit(camera.decode_raw, raw), info
+
+    def _frame_info(self):
+        timestamp = time.monotonic()
+        exposure, gain, dropped = self.camera.frame_info()
+        info = FrameInfo(self.captured, timestamp, exposure, gain, dropped)
+        self.captured += 1
+        if dropped is not None:
+            self.dropped = dropped
+        return info
+
+    def _flush(self, block):
+        # decoded frames are published in capture order
+        while len(self._pending) > 0 and (block or self._pending[0][0].done() or len(self._pending) > self.decode_threads):
+            future, info = self._pending.popleft()
+            try:
+                img = self.camera.preprocess(future.result())
+            except Exception as e:
+                print( e )
+                continue
+            self._publish(img, info)
+
+    def _publish(self, img, info):
+        for sink in self._sinks:
+            try:
+                sink(img, info)
+            except Exception as e:
+                print( e )
+        self.buffer.put(img, info)
+        self.frames += 1
@@ -0,0 +1,191 @@
+import os
+import pickle
+import queue
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+# state of a worker process: the attached shared memory block and the current analysis
+_worker = {"name": None, "shm": None, "generation": None, "analysis": None}
+
+def _register(pids):
+    # executor initializer, announces the process id of a new worker
+    pids.put(os.getpid())
+
+def _attach(name):
+    if _worker["name"] != name:
+        if _worker["shm"] is not None:
+            _worker["shm"].close()
+        _worker["shm"] = SharedMemory(name=name)
+        _worker["name"] = name
+    return _worker["shm"]
+
+def _analyse(name, offset, shape, dtype, generation, payload):
+    # runs in the worker process, img is a view into the shared slot and must not outlive the call
+    shm = _attach(name)
+    if _worker["generation"] != generation:
+        # unpickled once per analysis, its cached buffers are reused for the following frames
+        _worker["analysis"] = pickle.loads(payload)
+        _worker["generation"] = generation
+    img = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+    try:
+        return _worker["analysis"](img)
+    finally:
+        del img
+
+class AnalysisPool(object):
+    # per frame analysis in worker processes: a frame is copied once into a shared memory slot,
+    # only the slot index goes to the worker and a small result record comes back, in frame order
+    def __init__(self, analysis, processes=None, slots=None, context="spawn"):
+        # analysis is a picklable callable img -> record, e.g. a SliceAnalysis;
+        # spawn keeps the workers independent of the threads of the parent process
+        self.processes = processes if processes is not None else max((os.cpu_count() or 2) - 1, 1)
+        # two slots per process keep every worker busy while the next frame is copied
+        self.slots = slots if slots is not None else 2 * self.processes
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        # time spent copying frames into the slots and waiting for a free one
+        self.submit_time = 0.0
+        self.error = None
+        ctx = get_context(context)
+        self._pid_queue = ctx.Queue()
+        self._pids = []
+        self._executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=ctx,
+                initializer=_register, initargs=(self._pid_queue,))
+        self._shm = None
+        self._slot_bytes = 0
+        self._slot_future = [None] * self.slots
+        # (tag, future) in submission order
+        self._pending = deque()
+        # (generation, pickled analysis), replaced as a whole so set_analysis may be called from another thread
+        self._analysis = (0, None)
+        self.set_analysis(analysis)
+
+    def set_analysis(self, analysis):
+        # frames submitted from now on are analysed by analysis
+        self.analysis = analysis
+        self._analysis = (self._analysis[0] + 1, pickle.dumps(analysis))
+
+    def _reserve(self, nbytes):
+        # a larger frame needs a new block, the old one goes once no worker reads it anymore
+        if self._shm is not None and nbytes <= self._slot_bytes:
+            return
+        wait([future for _, future in self._pending])
+        self._release_shm()
+        self._slot_bytes = nbytes
+        self._shm = SharedMemory(create=True, size=max(nbytes * self.slots, 1))
+
+    def _free_slot(self, block):
+        while True:
+            for i, future in enumerate(self._slot_future):
+                if future is None or future.done():
+                    return i
+            if not block:
+                return None
+            wait([f for f in self._slot_future if f is not None], return_when=FIRST_COMPLETED)
+
+    def submit(self, img, tag=None, block=True):
+        # copies img into a free slot and queues its analysis; without a free slot the call
+        # waits for the oldest busy worker, or drops the frame if block is False
+        t0 = time.perf_counter()
+        img = np.ascontiguousarray(img)
+        self._reserve(img.nbytes)
+        idx = self._free_slot(block)
+        if idx is None:
+            self.dropped += 1
+            self.submit_time += time.perf_counter() - t0
+            return False
+        offset = idx * self._slot_bytes
+        slot = np.ndarray(img.shape, dtype=img.dtype, buffer=self._shm.buf, offset=offset)
+        np.copyto(slot, img)
+        del slot
+        generation, payload = self._analysis
+        future = self._executor.submit(_analyse, self._shm.name, offset, img.shape, img.dtype.str, generation, payload)
+        self._slot_future[idx] = future
+        self._pending.append((tag, future))
+        self.submitted += 1
+        self.submit_time += time.perf_counter() - t0
+        return True
+
+    def __len__(self):
+        return len(self._pending)
+
+    @property
+    def pids(self):
+        # process ids of the workers started so far
+        while self._pid_queue is not None:
+            try:
+                self._pids.append(self._pid_queue.get_nowait())
+            except queue.Empty:
+                break
+        return list(self._pids)
+
+    def results(self, timeout=0):
+        # (tag, record) of the finished frames at the head of the queue, in frame order;
+        # waits up to timeout for the oldest one, None waits for all of them
+        out = []
+        while len(self._pending) > 0:
+            tag, future = self._pending[0]
+            if not future.done():
+                if timeout is not None and timeout <= 0:
+                    break
+                done, _ = wait([future], timeout)
+                timeout = 0 if timeout is not None else None
+                if len(done) == 0:
+                    break
+            self._pending.popleft()
+            try:
+                record = future.result()
+            except Exception as e:
+                print( e )
+                self.error = e
+                record = None
+            self.completed += 1
+            out.append((tag, record))
+        return out
+
+    def wait_all(self):
+        return self.results(timeout=None)
+
+    def map(self, frames):
+        # ordered records of an iterable of frames, keeps all workers busy
+        for img in frames:
+            self.submit(img)
+            for _, record in self.results():
+                yield record
+        for _, record in self.wait_all():
+            yield record
+
+    def _release_shm(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+            self._slot_future = [None] * self.slots
+
+    def close(self):
+        # pending results are discarded
+        for _, future in self._pending:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        # keeps the ids of the workers for a last report
+        self._pids = self.pids
+        self._pid_queue.close()
+        self._pid_queue = None
+        self._pending.clear()
+        self._release_shm()
+
+    def report(self):
+        return {
+            "processes": self.processes,
+            "slots": self.slots,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "dropped": self.dropped,
+            "submit_ms": 1000 * self.submit_time / self.submitted if self.submitted > 0 else 0.0,
+        }
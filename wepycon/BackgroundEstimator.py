@@ -0,0 +1,46 @@
+import numpy as np
+
+class BackgroundEstimator(object):
+    # running per-pixel mean and variance (Welford) with float32 accumulators
+    def __init__(self):
+        self.n = 0
+        self.mean = None
+        self._m2 = None
+        self._delta = None
+        self._delta2 = None
+        self._total = 0.0
+
+    def reset(self):
+        self.n = 0
+        self.mean = None
+        self._total = 0.0
+
+    def add(self, img):
+        if self.mean is None or self.mean.shape != img.shape:
+            self.mean = np.zeros(img.shape, dtype=np.float32)
+            self._m2 = np.zeros(img.shape, dtype=np.float32)
+            self._delta = np.empty(img.shape, dtype=np.float32)
+            self._delta2 = np.empty(img.shape, dtype=np.float32)
+            self.n = 0
+            self._total = 0.0
+        self.n += 1
+        self._total += float(np.sum(img, dtype=np.float64))
+        np.subtract(img, self.mean, out=self._delta, casting="unsafe")
+        np.multiply(self._delta, np.float32(1.0 / self.n), out=self._delta2)
+        self.mean += self._delta2
+        np.subtract(img, self.mean, out=self._delta2, casting="unsafe")
+        self._delta *= self._delta2
+        self._m2 += self._delta
+
+    @property
+    def residual_mean(self):
+        # mean deviation of all frames from the current background estimate
+        if self.n == 0:
+            return np.inf
+        return abs(self._total / (self.n * self.mean.size) - float(np.mean(self.mean, dtype=np.float64)))
+
+    @property
+    def residual_std(self):
+        if self.n == 0:
+            return np.inf
+        return float(np.sqrt(np.sum(self._m2, dtype=np.float64) / (self.n * self.mean.size)))
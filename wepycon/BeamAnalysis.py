@@ -0,0 +1,107 @@
+import numpy as np
+
+from .BeamParameters import BeamParameters
+
+class BeamAnalysis(object):
+    # ISO 11146 second moment analysis in float32 with cached coordinate grids and buffers
+    def __init__(self, max_iterations=10, integration_factor=3.0, baseline="corners"):
+        self.max_iterations = max_iterations
+        # "corners" subtracts the mean of the four corner patches (10% of the frame each way),
+        # a number subtracts that offset and None analyses the frame as it is
+        self.baseline = baseline
+        # ISO 11146-3: the integration area spans integration_factor times the beam diameters
+        self.integration_factor = integration_factor
+        self._x = np.zeros(0, dtype=np.float32)
+        self._y = np.zeros(0, dtype=np.float32)
+        self._buffer = None
+
+    def _coordinates(self, shape):
+        h, w = shape
+        if len(self._x) < w:
+            self._x = np.arange(w, dtype=np.float32)
+        if len(self._y) < h:
+            self._y = np.arange(h, dtype=np.float32)
+        return self._x, self._y
+
+    def _float(self, img):
+        if self._buffer is None or self._buffer.shape != img.shape:
+            self._buffer = np.empty(img.shape, dtype=np.float32)
+        np.copyto(self._buffer, img, casting="unsafe")
+        return self._buffer
+
+    def _baseline(self, img):
+        if self.baseline is None:
+            return 0.0
+        if self.baseline != "corners":
+            return float(self.baseline)
+        h, w = img.shape
+        ch, cw = max(h // 10, 1), max(w // 10, 1)
+        corners = [img[:ch, :cw], img[:ch, -cw:], img[-ch:, :cw], img[-ch:, -cw:]]
+        return sum(float(c.sum(dtype=np.float64)) for c in corners) / sum(c.size for c in corners)
+
+    def moments(self, img, x0=0, x1=None, y0=0, y1=None):
+        # first and centred second moments of img[y0:y1, x0:x1], None for an empty area
+        x1 = img.shape[1] if x1 is None else x1
+        y1 = img.shape[0] if y1 is None else y1
+        _x, _y = self._coordinates(img.shape)
+        area = img[y0:y1, x0:x1]
+        x = _x[x0:x1]
+        y = _y[y0:y1]
+        I_x = area.sum(axis=0)
+        I_y = area.sum(axis=1)
+        total = float(I_x.sum())
+        if total <= 0:
+            return None
+        cx = float(I_x @ x) / total
+        cy = float(I_y @ y) / total
+        dx = x - cx
+        dy = y - cy
+        sxx = float(I_x @ (dx * dx)) / total
+        syy = float(I_y @ (dy * dy)) / total
+        # sum over rows of (y - cy) * sum over columns of (x - cx) * I
+        sxy = float(dy @ (area @ dx)) / total
+        return cx, cy, max(sxx, 0.0), max(syy, 0.0), sxy, total
+
+    def analyse(self, img, offset=(0, 0)):
+        # offset (x, y) of img on the sensor is added to all positions
+        ind = np.argmax(img)
+        peak_y, peak_x = divmod(int(ind), img.shape[1])
+        peak = img.flat[ind]
+
+        data = self._float(img)
+        baseline = self._baseline(img)
+        if baseline != 0:
+            # ISO 11146-3 offset correction, the remaining noise averages out
+            data -= baseline
+        h, w = data.shape
+        area = (0, w, 0, h)
+        m = self.moments(data)
+        if m is None:
+            return None
+        total = m[5]
+        iterations = 0
+        while iterations < self.max_iterations:
+            cx, cy, sxx, syy = m[:4]
+            rx = self.integration_factor * 2 * np.sqrt(sxx)
+            ry = self.integration_factor * 2 * np.sqrt(syy)
+            new_area = (max(int(np.floor(cx - rx)), 0), min(int(np.ceil(cx + rx)) + 1, w),
+                    max(int(np.floor(cy - ry)), 0), min(int(np.ceil(cy + ry)) + 1, h))
+            if new_area == area:
+                break
+            _m = self.moments(data, *new_area)
+            if _m is None:
+                break
+            area = new_area
+            m = _m
+            iterations += 1
+
+        cx, cy, sxx, syy, sxy, _ = m
+        mean = (sxx + syy) / 2
+        delta = np.sqrt(((sxx - syy) / 2)**2 + sxy**2)
+        d_major = 4 * np.sqrt(mean + delta)
+        d_minor = 4 * np.sqrt(max(mean - delta, 0.0))
+        angle = 0.5 * np.arctan2(2 * sxy, sxx - syy)
+        ellipticity = d_minor / d_major if d_major > 0 else 1.0
+        _ox, _oy = offset
+        return BeamParameters(cx + _ox, cy + _oy, 4 * np.sqrt(sxx), 4 * np.sqrt(syy), d_major, d_minor,
+                ellipticity, angle, peak, peak_x + _ox, peak_y + _oy, total, iterations)
@@ -0,0 +1,7 @@
+from collections import namedtuple
+
+# ISO 11146 second moment beam parameters, lengths in pixels of the analysed frame (plus its offset);
+# d_* are D4sigma diameters, angle (rad) is the orientation of the major axis against x,
+# iterations counts the integration area refinements
+BeamParameters = namedtuple("BeamParameters", ["x", "y", "d_x", "d_y", "d_major", "d_minor", "ellipticity", "angle",
+    "peak", "peak_x", "peak_y", "total", "iterations"])
@@ -0,0 +1,31 @@
+import numpy as np
+
+class BlockAverage(object):
+    # block average of factor x factor pixels into reused buffers, the result keeps the dtype of img
+    def __init__(self):
+        self._rows = None
+        self._accumulator = None
+        self._out = None
+
+    def __call__(self, img, factor):
+        if factor == 1:
+            return img
+        h = img.shape[0] // factor
+        w = img.shape[1] // factor
+        img = img[:h*factor, :w*factor]
+        if self._out is None or self._out.shape != (h, w) or self._out.dtype != img.dtype:
+            self._rows = np.empty((h, w*factor), dtype=np.uint32)
+            self._accumulator = np.empty((h, w), dtype=np.uint32)
+            self._out = np.empty((h, w), dtype=img.dtype)
+        # rows first, then columns of the already reduced array: two passes over the
+        # data instead of factor**2 strided passes over the full frame
+        rows = self._rows
+        np.copyto(rows, img[0::factor])
+        for i in range(1, factor):
+            np.add(rows, img[i::factor], out=rows)
+        acc = self._accumulator
+        np.copyto(acc, rows[:, 0::factor])
+        for j in range(1, factor):
+            np.add(acc, rows[:, j::factor], out=acc)
+        np.floor_divide(acc, factor * factor, out=self._out, casting="unsafe")
+        return self._out
@@ -0,0 +1,95 @@
+import importlib
+import importlib.util
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+ENTRY_POINT_GROUP = "wepycon.cameras"
+
+class CameraRegistry(MutableMapping):
+    # name -> camera class, backend modules are only imported on first access
+    def __init__(self):
+        self._targets = {}
+        self._requires = {}
+        self._loaded = {}
+        self._entry_point_groups = []
+
+    def register(self, name, target, requires=()):
+        # target is a camera class, "module:attribute" or an entry point
+        self._targets[name] = target
+        self._requires[name] = tuple(requires)
+        self._loaded.pop(name, None)
+
+    def load_entry_points(self, group=ENTRY_POINT_GROUP):
+        # scanning the installed distributions is deferred until the registry is used
+        self._entry_point_groups.append(group)
+
+    def _scan_entry_points(self):
+        while len(self._entry_point_groups) > 0:
+            self._scan_entry_point_group(self._entry_point_groups.pop(0))
+
+    def _scan_entry_point_group(self, group):
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:
+            return
+        try:
+            eps = entry_points(group=group)
+        except TypeError:
+            eps = entry_points().get(group, [])
+        for ep in eps:
+            if not ep.name in self._targets:
+                self.register(ep.name, ep)
+
+    def is_available(self, name):
+        # checks the dependencies without importing them
+        for module in self._requires.get(name, ()):
+            try:
+                if importlib.util.find_spec(module) is None:
+                    return False
+            except (ImportError, ValueError):
+                return False
+        return True
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def __getitem__(self, name):
+        if name in self._loaded:
+            return self._loaded[name]
+        self._scan_entry_points()
+        target = self._targets[name]
+        try:
+            if isinstance(target, str):
+                module_name, attribute = target.split(":")
+                cls = getattr(importlib.import_module(module_name), attribute)
+            elif hasattr(target, "load"):
+                cls = target.load()
+            else:
+                cls = target
+        except ImportError as e:
+            print( e )
+            raise KeyError(name)
+        self._loaded[name] = cls
+        return cls
+
+    def __setitem__(self, name, target):
+        self.register(name, target)
+
+    def __delitem__(self, name):
+        del self._targets[name]
+        del self._requires[name]
+        self._loaded.pop(name, None)
+
+    def __iter__(self):
+        self._scan_entry_points()
+        return (name for name in self._targets if self.is_available(name))
+
+    def __len__(self):
+        return sum(1 for name in self)
+
+    def __contains__(self, name):
+        self._scan_entry_points()
+        return name in self._targets and self.is_available(name)
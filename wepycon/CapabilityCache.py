@@ -0,0 +1,61 @@
+import json
+import os
+import sys
+import threading
+
+def default_cache_path():
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "wepycon", "capabilities.json")
+
+class CapabilityCache(object):
+    # device identity -> capabilities probed from the driver, persisted as json
+    def __init__(self, path=None):
+        self.path = default_cache_path() if path is None else path
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, "r") as fh:
+                    self._entries = json.load(fh)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            return self._load().get(key)
+
+    def set(self, key, capabilities):
+        if key is None:
+            return
+        with self._lock:
+            self._load()[key] = capabilities
+            self._save()
+
+    def invalidate(self, key=None):
+        with self._lock:
+            entries = self._load()
+            if key is None:
+                entries.clear()
+            else:
+                entries.pop(key, None)
+            self._save()
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_filename = self.path + ".tmp"
+            with open(tmp_filename, "w") as fh:
+                json.dump(self._entries, fh, indent=1)
+            os.replace(tmp_filename, self.path)
+        except OSError as e:
+            print( e )
+
+capability_cache = CapabilityCache()
@@ -0,0 +1,73 @@
+from functools import lru_cache
+import numpy as np
+
+@lru_cache(maxsize=16)
+def palette(name):
+    # 256 RGBA colors of a matplotlib colormap, None is a gray ramp
+    if name is None:
+        ramp = np.arange(256, dtype=np.uint8)
+        return np.stack([ramp, ramp, ramp, np.full(256, 255, dtype=np.uint8)], axis=1)
+    try:
+        from matplotlib import colormaps
+        cmap = colormaps[name]
+    except ImportError:
+        from matplotlib import cm
+        cmap = cm.get_cmap(name)
+    return cmap(np.linspace(0, 1, 256), bytes=True)
+
+@lru_cache(maxsize=32)
+def lookup_table(name, dtype, adc_bits, low=None, high=None, gamma=1.0):
+    # uint8 RGBA for every value of dtype, values above the window saturate
+    n = np.iinfo(dtype).max + 1
+    low = 0 if low is None else low
+    high = 2**adc_bits - 1 if high is None else high
+    x = (np.arange(n, dtype=np.float32) - low) / max(high - low, 1)
+    np.clip(x, 0, 1, out=x)
+    if gamma != 1.0:
+        np.power(x, 1.0 / gamma, out=x)
+    index = np.rint(x * 255).astype(np.uint8)
+    lut = np.ascontiguousarray(palette(name)[index])
+    lut.flags.writeable = False
+    return lut
+
+class Colormap(object):
+    def __init__(self, name=None, adc_bits=8, window=None, level=None, gamma=1.0):
+        # name None maps to gray; window and level are in counts, None spans the full adc range
+        self.name = name
+        self.adc_bits = adc_bits
+        self.window = window
+        self.level = level
+        self.gamma = gamma
+        self._out = None
+
+    @property
+    def limits(self):
+        return self._limits(self.adc_bits)
+
+    def _limits(self, adc_bits):
+        max_value = 2**adc_bits - 1
+        window = max_value if self.window is None else self.window
+        level = max_value / 2 if self.level is None else self.level
+        return int(round(level - window / 2)), int(round(level + window / 2))
+
+    @property
+    def is_identity(self):
+        # gray frames that can be shown as they are
+        return self.name is None and self.window is None and self.level is None and self.gamma == 1.0
+
+    def lut(self, dtype, adc_bits=None):
+        # adc_bits overrides the bit depth of the colormap, the colormap itself is left unchanged
+        adc_bits = self.adc_bits if adc_bits is None else adc_bits
+        low, high = self._limits(adc_bits)
+        return lookup_table(self.name, np.dtype(dtype), adc_bits, low, high, self.gamma)
+
+    def apply(self, img, out=None, adc_bits=None):
+        # returns an (h, w, 4) uint8 RGBA view of out, which is reused between calls if not given
+        lut = self.lut(img.dtype, adc_bits).view(np.uint32).ravel()
+        if out is None:
+            out = self._out
+            if out is None or out.shape[:2] != img.shape:
+                out = np.empty(img.shape + (4,), dtype=np.uint8)
+                self._out = out
+        np.take(lut, img, out=out.view(np.uint32).reshape(img.shape), mode="clip")
+        return out
@@ -3,7 +3,10 @@ import time
 import numpy as np
 
 class DebugCamera(AbstractCamera):
-    def __init__(self, *args, **kwargs):
+    noise_models = ["uniform", "gaussian", "poisson"]
+
+    def __init__(self, *args, width=640, height=480, adc_bits=8, fps=60, spots=None,
+            drift=(0.0, 0.0), jitter=0.0, noise=0.1, noise_model="uniform", hot_pixels=0, seed=None, **kwargs):
         super(DebugCamera, self).__init__()
         self.id = 0
         print("[DebugCamera].__init__()")
@@ -15,6 +18,7 @@ class DebugCamera(AbstractCamera):
             "Contrast": [int, [0, 100, 40], 4],
             "AutoExposure": [bool, False, 5]
                 }
+        self._add_binning_control()
 
         self._settings = {}
         for name in self.controls_available.keys():
@@ -22,23 +26,127 @@ class DebugCamera(AbstractCamera):
                 self._settings[name] = self.controls_available[name][1][-1]
             elif self.controls_available[name][0] == bool:
                 self._settings[name] = self.controls_available[name][1]
-            
-        self.width = 640
-        self.height = 480
-        self.adc_bits = 8
+            elif self.controls_available[name][0] == list:
+                self._settings[name] = self.controls_available[name][1][1]
+
+        self.width = width
+        self.height = height
+        self.adc_bits = adc_bits
         self.px_size = 1.0
 
+        # frames per second, None generates frames as fast as possible
+        self.fps = fps
+        # spots are dicts with x, y (pixels, default centred), sigma_x, sigma_y, angle (rad) and amplitude (0..1)
+        self.spots = spots
+        # drift in pixels per frame, jitter is the standard deviation of the random offset in pixels
+        self.drift = drift
+        self.jitter = jitter
+        # noise amplitude relative to full scale
+        self.noise = noise
+        if not noise_model in self.noise_models:
+            raise ValueError("unknown noise model " + str(noise_model))
+        self.noise_model = noise_model
+        self.hot_pixels = hot_pixels
+        self.rng = np.random.default_rng(seed)
+
+        self._scene = None
+        self._frame_count = 0
+        self._next_frame = None
+
+    def _build_scene(self):
+        width = self.sensor_width
+        height = self.sensor_height
+        max_value = 2**self.adc_bits - 1
+        spots = self.spots
+        if spots is None:
+            spots = [{"sigma_x": width / 10, "sigma_y": width / 10, "amplitude": 1.0 - self.noise}]
+
+        # 8 bit scenes fit into uint16 even where spots and noise overlap
+        work_dtype = np.uint16 if self.adc_bits <= 8 else np.uint32
+
+        # one precomputed, pre-scaled template per spot, pasted at the current position every frame
+        self._templates = []
+        for spot in spots:
+            sx = spot.get("sigma_x", width / 10)
+            sy = spot.get("sigma_y", sx)
+            angle = spot.get("angle", 0.0)
+            r = int(np.ceil(4 * max(sx, sy)))
+            u = np.arange(-r, r + 1, dtype=np.float32)
+            c, s = np.cos(angle), np.sin(angle)
+            xr = c * u[np.newaxis,:] + s * u[:,np.newaxis]
+            yr = -s * u[np.newaxis,:] + c * u[:,np.newaxis]
+            template = np.exp(-xr**2 / (2 * sx**2) - yr**2 / (2 * sy**2)) * spot.get("amplitude", 1.0) * max_value
+            self._templates.append((spot.get("x", width / 2), spot.get("y", height / 2), r, np.rint(template).astype(work_dtype)))
+
+        # a bank of noise frames with extra rows, every frame uses a view at a random row offset
+        noise_amplitude = self.noise * max_value
+        self._noise_pad = 64
+        shape = (4, height + self._noise_pad, width)
+        if self.noise_model == "uniform":
+            self._noise_bank = self.rng.integers(0, int(noise_amplitude) + 1, shape).astype(work_dtype)
+        else:
+            offset = 3 * noise_amplitude
+            bank = self.rng.normal(offset, noise_amplitude, shape)
+            self._noise_bank = np.clip(np.rint(bank), 0, max_value).astype(work_dtype)
+
+        flat = self.rng.choice(width * height, size=min(self.hot_pixels, width * height), replace=False)
+        self._hot_pixels = np.unravel_index(flat, (height, width))
+
+        self._work = np.empty((height, width), dtype=work_dtype)
+        self._out = np.empty((height, width), dtype=self.native_dtype)
+        self._scene = (width, height, self.adc_bits, self.noise, self.noise_model)
+
+    def _paste(self, work, template, x, y, r):
+        height, width = work.shape
+        x0, y0 = int(round(x)) - r, int(round(y)) - r
+        x1, y1 = x0 + template.shape[1], y0 + template.shape[0]
+        cx0, cy0 = max(x0, 0), max(y0, 0)
+        cx1, cy1 = min(x1, width), min(y1, height)
+        if cx0 >= cx1 or cy0 >= cy1:
+            return
+        work[cy0:cy1, cx0:cx1] += template[cy0-y0:cy1-y0, cx0-x0:cx1-x0]
+
+    def _wait_for_frame(self):
+        if self.fps is None:
+            return
+        now = time.monotonic()
+        if self._next_frame is None or self._next_frame < now - 1.0 / self.fps:
+            self._next_frame = now
+        if self._next_frame > now:
+            time.sleep(self._next_frame - now)
+        self._next_frame += 1.0 / self.fps
+
     def get_image(self, substract_background=True, *args, **kwargs):
         #print("[DebugCamera].get_image()")
-        time.sleep(0.001)
-        x = np.arange(self.width)
-        y = np.arange(self.height)
-        noise = 0.1
-        img = np.exp( -(x[np.newaxis,:]-self.width/2)**2/2/(self.width/10)**2) * np.exp( -(y[:,np.newaxis]-self.height/2)**2/2/(self.width/10)**2) * int(255 * (1-noise))
-        img += np.random.random_integers(0, int(255*noise), (self.height, self.width))
-        if substract_background and self.background is not None:
-            return img.astype(int) - self.background
-        return img
+        if self._scene != (self.sensor_width, self.sensor_height, self.adc_bits, self.noise, self.noise_model):
+            self._build_scene()
+        self._wait_for_frame()
+
+        work = self._work
+        bank = self._noise_bank
+        offset = self.rng.integers(0, self._noise_pad + 1)
+        np.copyto(work, bank[self._frame_count % bank.shape[0], offset:offset + work.shape[0]])
+
+        n = self._frame_count
+        for x, y, r, template in self._templates:
+            if self.jitter > 0:
+                dx, dy = self.rng.normal(0, self.jitter, 2)
+            else:
+                dx, dy = 0.0, 0.0
+            # drifting spots wrap around the frame
+            _x = (x + n * self.drift[0] + dx) % self.sensor_width
+            _y = (y + n * self.drift[1] + dy) % self.sensor_height
+            self._paste(work, template, _x, _y, r)
+
+        max_value = 2**self.adc_bits - 1
+        if self.noise_model == "poisson":
+            work[...] = self.rng.poisson(work)
+        np.minimum(work, max_value, out=work)
+        if len(self._hot_pixels[0]) > 0:
+            work[self._hot_pixels] = max_value
+        np.copyto(self._out, work, casting="unsafe")
+        self._frame_count += 1
+        return self.preprocess(self._out, substract_background)
 
     @property
     def settings(self):
@@ -51,6 +159,8 @@ class DebugCamera(AbstractCamera):
         for key in settings.keys():
             assert key in self._settings.keys()
             self._settings[key] = settings[key]
+            if key == "Binning":
+                self.set_binning(self.supported_bins[int(settings[key])])
 
     @classmethod
     def from_device_dialog(cls):
@@ -0,0 +1,172 @@
+import threading
+import numpy as np
+
+class FrameBuffer(object):
+    def __init__(self, size=8):
+        self.size = size
+        self._slots = None
+        # sequence number stored in each slot, -1 while the slot is empty or being written
+        self._slot_sequence = np.full(size, -1, dtype=np.int64)
+        self._slot_info = [None] * size
+        self._written = 0
+        self._first_valid = 0
+        self._closed = False
+        # counts the resets, a reader that has not seen the latest one starts over at sequence 0
+        self._epoch = 0
+        self._cond = threading.Condition()
+        self._lossless_readers = []
+
+    @property
+    def frames_written(self):
+        return self._written
+
+    def reader(self, lossless=False):
+        reader = FrameReader(self, lossless)
+        with self._cond:
+            reader.epoch = self._epoch
+            if lossless:
+                reader.next_sequence = self._written
+                self._lossless_readers.append(reader)
+        return reader
+
+    def remove_reader(self, reader):
+        with self._cond:
+            if reader in self._lossless_readers:
+                self._lossless_readers.remove(reader)
+            self._cond.notify_all()
+
+    def put(self, img, info=None, timeout=None):
+        with self._cond:
+            if self._closed:
+                return False
+
+            # lossless readers hold back the producer instead of being overrun
+            while not self._closed and any(self._written - r.next_sequence >= self.size for r in self._lossless_readers):
+                if not self._cond.wait(timeout):
+                    return False
+            if self._closed:
+                return False
+
+            if self._slots is None or self._slots.shape[1:] != img.shape or self._slots.dtype != img.dtype:
+                # frames of the old geometry cannot be handed out anymore
+                self._slots = np.empty((self.size,) + img.shape, dtype=img.dtype)
+                self._slot_sequence[:] = -1
+                self._first_valid = self._written
+                for reader in self._lossless_readers:
+                    reader.dropped += self._written - reader.next_sequence
+                    reader.next_sequence = self._written
+
+            sequence = self._written
+            idx = sequence % self.size
+            self._slot_sequence[idx] = -1
+            slots = self._slots
+
+        slots[idx] = img
+
+        with self._cond:
+            if slots is self._slots:
+                self._slot_sequence[idx] = sequence
+                self._slot_info[idx] = info
+            self._written = sequence + 1
+            self._cond.notify_all()
+        return True
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reset(self):
+        with self._cond:
+            self._closed = False
+            self._slot_sequence[:] = -1
+            self._written = 0
+            self._first_valid = 0
+            self._epoch += 1
+            for reader in self._lossless_readers:
+                reader.next_sequence = 0
+                reader.epoch = self._epoch
+            self._cond.notify_all()
+
+    def _oldest(self):
+        return max(self._written - self.size, self._first_valid)
+
+    def _wait_for(self, reader, timeout):
+        # caller holds self._cond
+        def ready():
+            if reader.epoch != self._epoch:
+                reader.epoch = self._epoch
+                reader.next_sequence = 0
+            return self._closed or self._written > reader.next_sequence
+        return self._cond.wait_for(ready, timeout)
+
+    def _copy(self, sequence, out):
+        # seqlock: copy outside of the lock and retry if the producer touched the slot meanwhile
+        idx = sequence % self.size
+        with self._cond:
+            if self._slot_sequence[idx] != sequence:
+                return None, None
+            src = self._slots[idx]
+            info = self._slot_info[idx]
+        if out is None or out.shape != src.shape or out.dtype != src.dtype:
+            out = np.empty_like(src)
+        np.copyto(out, src)
+        with self._cond:
+            if self._slot_sequence[idx] != sequence:
+                return None, None
+        return out, info
+
+
+class FrameReader(object):
+    def __init__(self, buffer, lossless=False):
+        self.buffer = buffer
+        self.lossless = lossless
+        self.next_sequence = 0
+        self.epoch = 0
+        self.dropped = 0
+        # FrameInfo of the frame returned last
+        self.info = None
+        self._out = None
+
+    def read(self, timeout=None):
+        buf = self.buffer
+        while True:
+            with buf._cond:
+                if not buf._wait_for(self, timeout):
+                    return None, None
+                if buf._closed and buf._written <= self.next_sequence:
+                    return None, None
+                oldest = buf._oldest()
+                if self.next_sequence < oldest:
+                    self.dropped += oldest - self.next_sequence
+                    self.next_sequence = oldest
+                sequence = self.next_sequence
+            out, info = buf._copy(sequence, self._out)
+            if out is not None:
+                self._out = out
+                self.info = info
+                with buf._cond:
+                    self.next_sequence = sequence + 1
+                    buf._cond.notify_all()
+                return sequence, out
+
+    def latest(self, timeout=None):
+        buf = self.buffer
+        while True:
+            with buf._cond:
+                if not buf._wait_for(self, timeout):
+                    return None, None
+                if buf._closed and buf._written <= self.next_sequence:
+                    return None, None
+                sequence = buf._written - 1
+            out, info = buf._copy(sequence, self._out)
+            if out is not None:
+                self._out = out
+                self.info = info
+                with buf._cond:
+                    self.next_sequence = sequence + 1
+                    buf._cond.notify_all()
+                return sequence, out
+
+    def close(self):
+        self.buffer.remove_reader(self)
@@ -0,0 +1,4 @@
+from collections import namedtuple
+
+# timestamp is time.monotonic() at capture, dropped is the driver's count of lost frames (None if unknown)
+FrameInfo = namedtuple("FrameInfo", ["sequence", "timestamp", "exposure", "gain", "dropped"])
@@ -0,0 +1,97 @@
+import numpy as np
+
+from .GaussianProfile import GaussianProfile
+
+class GaussianFitter(object):
+    # batched Gaussian fits of 1d profiles: weighted log-parabola estimate, then Gauss-Newton steps
+    def __init__(self, iterations=2, threshold=0.2, max_samples=256):
+        self.iterations = iterations
+        # only samples above threshold * (peak - offset) enter the log-parabola estimate
+        self.threshold = threshold
+        # longer profiles are block averaged first, the fit cost does not grow with the sensor size
+        self.max_samples = max_samples
+        self._key = None
+        self._diag3 = np.arange(3)
+        self._diag4 = np.arange(4)
+
+    def _prepare(self, lengths):
+        # padded sample positions, block sizes and a mask of valid samples, cached for the profile lengths
+        if self._key != lengths:
+            factors = [-(-n // self.max_samples) for n in lengths]
+            counts = [n // f for n, f in zip(lengths, factors)]
+            m = max(counts)
+            self._factors = np.array(factors, dtype=np.float64)
+            self._counts = counts
+            k = np.arange(m, dtype=np.float64)
+            # positions of the block centres in samples of the original profile
+            self._u = self._factors[:, np.newaxis] * k + (self._factors[:, np.newaxis] - 1) / 2
+            self._mask = k < np.array(counts)[:, np.newaxis]
+            self._data = np.zeros((len(lengths), m))
+            self._jacobian = np.empty((len(lengths), 4, m))
+            self._key = lengths
+        return self._u, self._mask, self._data
+
+    def fit(self, profiles):
+        lengths = tuple(len(p) for p in profiles)
+        u, mask, data = self._prepare(lengths)
+        for i, p in enumerate(profiles):
+            f = int(self._factors[i])
+            n = self._counts[i]
+            if f == 1:
+                data[i, :n] = p
+            else:
+                data[i, :n] = np.reshape(p[:n*f], (n, f)).mean(axis=1)
+
+        # initial offset and amplitude from the extremes of each profile
+        offset = np.where(mask, data, np.inf).min(axis=1)
+        peak = np.where(mask, data, -np.inf).max(axis=1)
+        y = data - offset[:, np.newaxis]
+        amplitude = np.maximum(peak - offset, 1e-12)
+
+        # ln(y) = a + b t + c t^2, weighted with y^2 to counter the noise amplification of the log (Caruana);
+        # t is centred and scaled to keep the normal equations well conditioned
+        w2 = np.where(mask & (y > self.threshold * amplitude[:, np.newaxis]), y * y, 0.0)
+        logy = np.log(np.maximum(y, 1e-12))
+        scale = u[:, -1:] + 1
+        centre = (w2 * u).sum(axis=1, keepdims=True) / np.maximum(w2.sum(axis=1, keepdims=True), 1e-300)
+        t = (u - centre) / scale
+        V = np.stack([np.ones_like(t), t, t * t], 1)
+        WV = V * w2[:, np.newaxis]
+        A = WV @ V.transpose(0, 2, 1)
+        A[:, self._diag3, self._diag3] += 1e-12
+        a, b, c = np.linalg.solve(A, WV @ logy[..., np.newaxis])[..., 0].T
+        valid = c < 0
+        c = np.where(valid, c, -1.0)
+        center = np.where(valid, centre[:, 0] - b / (2 * c) * scale[:, 0], u[np.arange(len(u)), np.argmax(np.where(mask, data, -np.inf), axis=1)])
+        radius = np.where(valid, np.sqrt(-2 / c) * scale[:, 0], scale[:, 0] / 4)
+
+        # damped Gauss-Newton refinement of amplitude, center, radius and offset, masked samples do not contribute
+        J = self._jacobian
+        J[:, 3] = mask
+        for _ in range(self.iterations):
+            d = u - center[:, np.newaxis]
+            r2 = (radius * radius)[:, np.newaxis]
+            e = np.exp(-2 * d * d / r2)
+            e *= mask
+            residual = data - amplitude[:, np.newaxis] * e - offset[:, np.newaxis]
+            residual *= mask
+            J[:, 0] = e
+            np.multiply(e, (4 * amplitude)[:, np.newaxis] * d / r2, out=J[:, 1])
+            np.multiply(J[:, 1], d / radius[:, np.newaxis], out=J[:, 2])
+            JTJ = J @ J.transpose(0, 2, 1)
+            JTJ[:, self._diag4, self._diag4] *= 1 + 1e-9
+            JTJ[:, self._diag4, self._diag4] += 1e-12
+            step = np.linalg.solve(JTJ, J @ residual[..., np.newaxis])[..., 0]
+            amplitude = amplitude + step[:, 0]
+            center = center + step[:, 1]
+            radius = np.abs(radius + step[:, 2])
+            offset = offset + step[:, 3]
+
+        # block averaging widened the profile by the variance of a box of the block size
+        radius = np.sqrt(np.maximum(radius**2 - self._factors**2 / 3, 0))
+        return [GaussianProfile(*p) for p in zip(amplitude, center, radius, offset)]
+
+    @staticmethod
+    def evaluate(profile, n):
+        u = np.arange(n, dtype=np.float64)
+        return profile.amplitude * np.exp(-2 * (u - profile.center)**2 / profile.radius**2) + profile.offset
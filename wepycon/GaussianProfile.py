@@ -0,0 +1,4 @@
+from collections import namedtuple
+
+# amplitude * exp(-2 (x - center)**2 / radius**2) + offset, center and radius (1/e^2) in samples of the profile
+GaussianProfile = namedtuple("GaussianProfile", ["amplitude", "center", "radius", "offset"])
@@ -5,7 +5,11 @@ import sys
 from .OpenCVCamera import OpenCVCamera
 
 class LogitechC500Camera(OpenCVCamera):
+    # px_size in micrometres
+    px_size_unit = 1e-6
+
     def __init__(self, camera_id):
+        # seeds the capability cache when the driver cannot enumerate frame sizes
         res = [
                 (160, 120),
                 (176, 144),
@@ -28,6 +32,10 @@ class LogitechC500Camera(OpenCVCamera):
         devices = OpenCVCamera.list_devices()
         return devices
 
+    @classmethod
+    def scan_devices(cls, callback=None):
+        return OpenCVCamera.scan_devices(callback)
+
     @classmethod
     def from_device_dialog(cls):
         devices = cls.list_devices()
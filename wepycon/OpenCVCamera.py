@@ -3,9 +3,16 @@ import numpy as np
 import sys
 
 from .AbstractCamera import AbstractCamera
+from .CapabilityCache import capability_cache
+
+def fourcc_to_str(code):
+    return "".join(chr((int(code) >> 8 * i) & 0xFF) for i in range(4))
 
 class OpenCVCamera(AbstractCamera):
-    def __init__(self, camera_id, px_size=1, resolutions=None):
+    capture_modes = ["Gray", "Raw"]
+    pixel_format_candidates = ["MJPG", "YUYV", "GREY", "Y16 "]
+
+    def __init__(self, camera_id, px_size=1, resolutions=None, capture_mode="Gray"):
         super(OpenCVCamera, self).__init__()
         self.id = camera_id
         if sys.platform == "win32":
@@ -14,19 +21,22 @@ class OpenCVCamera(AbstractCamera):
             self.device = cv2.VideoCapture(camera_id, cv2.CAP_V4L2)
             
         print( self.device.getBackendName() )
-        self.device.set(cv2.CAP_PROP_FORMAT, -1)
 
         self.controls_available = {}
-        if resolutions is None:
-            print("find")
-            self.resolutions = self._find_supported_resolutions()
-        else:
-            self.resolutions = resolutions
-        
+        self._load_capabilities(seed_resolutions=resolutions)
+
         self.controls_available["Resolution"] = [list, (["{0:d}x{1:d}".format(res[0], res[1]) for res in self.resolutions], len(self.resolutions) - 1), None]
         self.device.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolutions[-1][0])
         self.device.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolutions[-1][1])
 
+        self._gray = None
+        self.capture_mode = capture_mode
+        self.controls_available["CaptureMode"] = [list, (self.capture_modes, self.capture_modes.index(capture_mode)), None]
+
+        if len(self.pixel_formats) > 0:
+            self.pixel_format_names = list(self.pixel_formats.keys())
+            idx = self.pixel_format_names.index(self._fourcc) if self._fourcc in self.pixel_format_names else 0
+            self.controls_available["PixelFormat"] = [list, (self._pixel_format_labels(self.resolutions[-1]), idx), None]
         
         brightness = self.device.get(cv2.CAP_PROP_BRIGHTNESS)
         available = self.device.set(cv2.CAP_PROP_BRIGHTNESS, brightness)
@@ -62,35 +72,197 @@ class OpenCVCamera(AbstractCamera):
         if available:
             self.controls_available["Auto Exposure"] = [bool, False, cv2.CAP_PROP_AUTO_EXPOSURE]
 
+        self._add_binning_control()
+
         self._settings = {}
         for name in self.controls_available.keys():
             if self.controls_available[name][0] == int:
                 self._settings[name] = self.controls_available[name][1][-1]
             elif self.controls_available[name][0] == bool:
                 self._settings[name] = self.controls_available[name][1]
+            elif self.controls_available[name][0] == list:
+                self._settings[name] = self.controls_available[name][1][1]
         
         available = self.device.set(cv2.CAP_PROP_AUTO_WB, 0)
         
-        self.height = int( self.device.get(cv2.CAP_PROP_FRAME_HEIGHT) )
-        self.width = int( self.device.get(cv2.CAP_PROP_FRAME_WIDTH) )
+        self.sensor_height = int( self.device.get(cv2.CAP_PROP_FRAME_HEIGHT) )
+        self.sensor_width = int( self.device.get(cv2.CAP_PROP_FRAME_WIDTH) )
         
         print(self.device.get(cv2.CAP_PROP_ISO_SPEED))
         self.video_mode = True
-        self.adc_bits = 8
         self.px_size=px_size
 
+    def _pixel_format_labels(self, resolution):
+        # the frame rate of a format depends on the frame size
+        labels = []
+        for fourcc in self.pixel_format_names:
+            fps = self.pixel_formats[fourcc].get(tuple(resolution))
+            if fps:
+                labels.append("{0:s} ({1:.0f} fps)".format(fourcc.strip(), fps))
+            else:
+                labels.append(fourcc.strip())
+        return labels
+
+    @property
+    def capture_mode(self):
+        return self._capture_mode
+
+    @capture_mode.setter
+    def capture_mode(self, mode):
+        if not mode in self.capture_modes:
+            raise ValueError("unknown capture mode " + str(mode))
+        if mode == "Raw":
+            # hand out the undecoded driver buffer, the luminance plane is picked in _decode_raw
+            self.device.set(cv2.CAP_PROP_FORMAT, -1)
+            self.device.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        else:
+            # back to OpenCV's decoded BGR frames
+            self.device.set(cv2.CAP_PROP_FORMAT, cv2.CV_8UC3)
+            self.device.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        self._capture_mode = mode
+        self._update_format()
+
+    def _update_format(self):
+        self._fourcc = self._get_fourcc()
+        self.adc_bits = 16 if (self._capture_mode == "Raw" and self._fourcc == "Y16 ") else 8
+
+    def _get_fourcc(self):
+        return fourcc_to_str(self.device.get(cv2.CAP_PROP_FOURCC))
+
+    @property
+    def pixel_format(self):
+        return self._fourcc
+
+    @pixel_format.setter
+    def pixel_format(self, fourcc):
+        # the device always delivers the unbinned frame
+        width, height = self.sensor_width, self.sensor_height
+        self.device.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        # the driver may fall back to another frame size when switching formats
+        self.device.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.device.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.sensor_width = int(self.device.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.sensor_height = int(self.device.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self._update_format()
+
+    @property
+    def decode_off_thread(self):
+        # compressed frames are decoded by the acquisition engine's decoder threads
+        return self._capture_mode == "Raw" and self._fourcc == "MJPG"
+
+    def read_raw(self):
+        success, img = self.device.read()
+        if success:
+            return img
+        return None
+
+    def decode_raw(self, img):
+        return self._to_gray(img)
+
+    def close(self):
+        self.device.release()
+
     def get_image(self, substract_background=True, timeout=600):
         try:
-            success, img = self.device.read()
-            if success:
-                if img.ndim > 2:
-                    img = np.sum(img, axis=2)/3
-                if substract_background and self.background is not None:
-                    return img.astype(np.int) - self.background
-                return img
+            img = self.read_raw()
+            if img is not None:
+                img = self._to_gray(img)
+                return self.preprocess(img, substract_background)
         except Exception as e:
             print( e )
-        return np.zeros((self.height, self.width))
+        return np.zeros((self.height, self.width), dtype=self.native_dtype)
+
+    def _to_gray(self, img):
+        if img.ndim == 2 and img.shape[0] == 1 and self.sensor_height > 1:
+            return self._decode_raw(img.ravel())
+        if img.ndim > 2:
+            if img.shape[2] < 3:
+                # GREY or packed YUYV, the luminance is the first channel
+                return img[:, :, 0]
+            if self._gray is None or self._gray.shape != img.shape[:2]:
+                self._gray = np.empty(img.shape[:2], dtype=np.uint8)
+            cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=self._gray)
+            return self._gray
+        return img
+
+    def _decode_raw(self, buf):
+        # the raw buffer holds the unbinned frame, binning is applied by preprocess
+        w, h = self.sensor_width, self.sensor_height
+        if self._fourcc in ("YUYV", "YUY2"):
+            return buf[:w*h*2].reshape(h, w, 2)[:, :, 0]
+        elif self._fourcc == "UYVY":
+            return buf[:w*h*2].reshape(h, w, 2)[:, :, 1]
+        elif self._fourcc == "GREY":
+            return buf[:w*h].reshape(h, w)
+        elif self._fourcc == "Y16 ":
+            return buf[:w*h*2].view(np.uint16).reshape(h, w)
+        elif self._fourcc == "MJPG":
+            return cv2.imdecode(buf, cv2.IMREAD_GRAYSCALE)
+        raise ValueError("unsupported raw format " + self._fourcc)
+
+    def _load_capabilities(self, seed_resolutions=None):
+        # sets self.resolutions and self.pixel_formats (fourcc -> {(width, height): max fps})
+        self.device_key, frame_types = self._query_v4l2()
+        if self.device_key is None:
+            # no identity available, the seed list of a subclass must not leak to other cameras
+            self.device_key = "{0:s}:{1:s}:{2}".format(type(self).__name__, self.device.getBackendName(), self.id)
+
+        cached = capability_cache.get(self.device_key)
+        if cached is not None:
+            self.resolutions = [tuple(res) for res in cached["resolutions"]]
+            self.pixel_formats = {}
+            for fourcc, sizes in cached["pixel_formats"].items():
+                self.pixel_formats[fourcc] = {(w, h): fps for w, h, fps in sizes}
+            return
+
+        if len(frame_types) > 0:
+            self.pixel_formats = {}
+            for fourcc, w, h, fps in frame_types:
+                sizes = self.pixel_formats.setdefault(fourcc, {})
+                sizes[(w, h)] = max(fps, sizes.get((w, h), 0))
+            self.resolutions = sorted(set(res for sizes in self.pixel_formats.values() for res in sizes), key=lambda res: (res[0] * res[1], res[0]))
+        else:
+            if seed_resolutions is None:
+                self.resolutions = self._find_supported_resolutions()
+            else:
+                self.resolutions = [tuple(res) for res in seed_resolutions]
+            self.pixel_formats = self._find_pixel_formats()
+
+        capability_cache.set(self.device_key, {
+            "resolutions": [list(res) for res in self.resolutions],
+            "pixel_formats": {fourcc: [[w, h, fps] for (w, h), fps in sizes.items()] for fourcc, sizes in self.pixel_formats.items()},
+            })
+
+    def _query_v4l2(self):
+        # device identity and frame size enumeration straight from the driver, no sensor reconfiguration
+        if sys.platform != "linux" or not isinstance(self.id, int):
+            return None, []
+        try:
+            import v4l2py
+            with v4l2py.Device.from_id(self.id) as device:
+                info = device.info
+                key = "v4l2:{0:s}:{1:s}".format(info.card, info.bus_info)
+                frame_types = []
+                for frame_type in info.frame_sizes:
+                    fourcc = fourcc_to_str(frame_type.pixel_format)
+                    if fourcc in self.pixel_format_candidates:
+                        frame_types.append((fourcc, frame_type.width, frame_type.height, float(frame_type.max_fps)))
+                return key, frame_types
+        except Exception as e:
+            print( e )
+        return None, []
+
+    def _find_pixel_formats(self):
+        # probe the formats OpenCV accepts at the current resolution
+        formats = {}
+        initial_fourcc = int(self.device.get(cv2.CAP_PROP_FOURCC))
+        size = (int(self.device.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.device.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        for fourcc in self.pixel_format_candidates:
+            self.device.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+            if self._get_fourcc() == fourcc:
+                formats[fourcc] = {size: self.device.get(cv2.CAP_PROP_FPS)}
+        self.device.set(cv2.CAP_PROP_FOURCC, initial_fourcc)
+        return formats
 
     def _find_supported_resolutions(self):
         candidates = [
@@ -151,10 +323,19 @@ class OpenCVCamera(AbstractCamera):
 
     @classmethod
     def list_devices(cls):
+        return cls.scan_devices()
+
+    @classmethod
+    def scan_devices(cls, callback=None):
         if sys.platform == "win32":
-            return scan_camera_windows_dshow()
+            devices = scan_camera_windows_dshow()
+            if callback is not None:
+                for device in devices:
+                    callback(device)
+            return devices
         elif sys.platform == "linux":
-            return scan_camera_linux_v4l2()
+            return scan_camera_linux_v4l2(callback)
+        return []
 
     @classmethod
     def from_device_dialog(cls):
@@ -173,8 +354,8 @@ class OpenCVCamera(AbstractCamera):
         print( devices[decision][0] )
         return cls( devices[decision][0] )
     @classmethod
-    def from_device_number(cls, num, px_size=1, resolutions=None):
-        return cls(num, px_size, resolutions)
+    def from_device_number(cls, num, px_size=1, resolutions=None, capture_mode="Gray"):
+        return cls(num, px_size, resolutions, capture_mode)
 
     @property
     def settings(self):
@@ -184,6 +365,7 @@ class OpenCVCamera(AbstractCamera):
     def settings(self, settings):
         for name, value in settings.items():
             assert name in self._settings.keys()
+            changed = self._settings[name] != value
             self._settings[name] = settings[name]
 
             _type, _, _id = self.controls_available[name]
@@ -192,25 +374,64 @@ class OpenCVCamera(AbstractCamera):
             elif name == "Resolution":
                 self.device.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolutions[value][0])
                 self.device.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolutions[value][1])
-                self.width = self.device.get(cv2.CAP_PROP_FRAME_WIDTH)
-                self.height = self.device.get(cv2.CAP_PROP_FRAME_HEIGHT)
+                self.sensor_width = int(self.device.get(cv2.CAP_PROP_FRAME_WIDTH))
+                self.sensor_height = int(self.device.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                self._update_format()
+                if "PixelFormat" in self.controls_available:
+                    self.controls_available["PixelFormat"][1] = (self._pixel_format_labels(self.resolutions[value]),
+                            self._settings["PixelFormat"])
+            elif name == "Binning":
+                self.set_binning(self.supported_bins[int(value)])
+            elif name == "PixelFormat" and changed:
+                self.pixel_format = self.pixel_format_names[int(value)]
+            elif name == "CaptureMode" and changed:
+                self.capture_mode = self.capture_modes[int(value)]
 
-def scan_camera_linux_v4l2():
+def _probe_v4l2_node(filename):
     import os
     import v4l2py
+    fd = os.open("/dev/" + filename, os.O_RDWR | os.O_NONBLOCK)
+    try:
+        info = v4l2py.device.read_info(fd)
+    finally:
+        os.close(fd)
+    if info.capabilities.value%2 == 1:
+        _id = int(filename[filename.rfind('o')+1:])
+        return [_id, info.card]
+    return None
+
+def scan_camera_linux_v4l2(callback=None, timeout=2.0):
+    # probes all nodes in parallel, a node that hangs for longer than timeout is skipped
+    import os
+    import queue
+    import threading
+    import time
+    filenames = [filename for filename in os.listdir("/dev/") if "video" in filename]
+    results = queue.Queue()
+
+    def probe(filename):
+        try:
+            results.put((filename, _probe_v4l2_node(filename)))
+        except Exception as e:
+            print(filename, e)
+            results.put((filename, None))
+
+    for filename in filenames:
+        threading.Thread(target=probe, args=(filename,), daemon=True).start()
+
     devices = []
-    for filename in os.listdir("/dev/"):
-        if "video" in filename:
-            try:
-                info = v4l2py.device.read_info(os.open("/dev/"+filename,os.O_RDWR, os.O_NONBLOCK))
-                if info.capabilities.value%2 == 1:
-                    _id = int(filename[filename.rfind('o')+1:])
-                    devices.append([_id, info.card])
-                    print(info)
-            except Exception as e:
-                print(e)
-                pass
-    return devices
+    deadline = time.monotonic() + timeout
+    for i in range(len(filenames)):
+        try:
+            filename, device = results.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+            print("timeout while probing video devices")
+            break
+        if device is not None:
+            devices.append(device)
+            if callback is not None:
+                callback(device)
+    return sorted(devices)
 
 
 def scan_camera_windows_dshow():
@@ -349,3 +570,4 @@ def scan_camera_windows_dshow():
         result.append(get_moniker_name(moniker))
         moniker, count = filter_enum.Next(1)
     print( result )
+    return list(enumerate(result))
@@ -0,0 +1,249 @@
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+class Recorder(object):
+    # drop policies when the writer falls behind and the slot pool is exhausted
+    drop_policies = ["newest", "oldest"]
+
+    timestamp_dtype = np.dtype([("sequence", np.int64), ("timestamp", np.float64),
+        ("exposure", np.float64), ("gain", np.float64)])
+
+    def __init__(self, basename, max_frames=1000, queue_size=32, drop_policy="newest"):
+        # frames go to <basename>.npy, frame infos to <basename>_timestamps.npy
+        # and camera settings plus the throughput report to <basename>.json
+        if not drop_policy in self.drop_policies:
+            raise ValueError("unknown drop policy " + str(drop_policy))
+        self.basename = os.path.splitext(basename)[0] if basename.endswith(".npy") else basename
+        self.max_frames = max_frames
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+
+        self.frames = 0
+        self.dropped = 0
+        self.max_queued = 0
+        # time the writer thread spent writing, its inverse is the sustainable frame rate
+        self.write_time = 0.0
+        self.camera = None
+        self.error = None
+
+        self._slots = None
+        self._slot_info = [None] * queue_size
+        self._free = deque(range(queue_size))
+        self._queue = deque()
+        self._accepted = 0
+        self._full = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._start_time = None
+        self._stop_time = None
+        self._metadata = {}
+        self._frames_file = None
+        self._timestamps_file = None
+
+    @property
+    def frames_path(self):
+        return self.basename + ".npy"
+
+    @property
+    def timestamps_path(self):
+        return self.basename + "_timestamps.npy"
+
+    @property
+    def metadata_path(self):
+        return self.basename + ".json"
+
+    @property
+    def is_recording(self):
+        return self._running
+
+    @property
+    def is_full(self):
+        # set once push turns frames away for good: the budget is used up, the geometry changed or writing failed
+        return self._full
+
+    def start(self, camera=None):
+        self.camera = camera
+        if camera is not None:
+            self._metadata = self._camera_metadata(camera)
+        self._running = True
+        self._start_time = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="Recorder-{}".format(self.basename), daemon=True)
+        self._thread.start()
+
+    def _camera_metadata(self, camera):
+        settings = dict(camera.settings)
+        return {
+            "camera": type(camera).__name__,
+            "settings": settings,
+            "width": camera.width,
+            "height": camera.height,
+            "px_size": camera.px_size,
+            "px_size_unit": camera.px_size_unit,
+            "adc_bits": camera.adc_bits,
+            "binning": camera.binning,
+            "roi": camera.roi,
+            "background_subtracted": camera.background is not None,
+        }
+
+    def push(self, img, info=None):
+        # called from the acquisition thread, only copies the frame into a free slot
+        if not self._running or self._full:
+            return False
+        with self._cond:
+            if self._slots is None:
+                self._slots = np.empty((self.queue_size,) + img.shape, dtype=img.dtype)
+            elif self._slots.shape[1:] != img.shape or self._slots.dtype != img.dtype:
+                print( "[Recorder] frame geometry changed, recording stopped" )
+                self._full = True
+                self._cond.notify_all()
+                return False
+            if self._accepted >= self.max_frames:
+                self._full = True
+                self._cond.notify_all()
+                return False
+
+            if len(self._free) > 0:
+                idx = self._free.popleft()
+            elif self.drop_policy == "oldest" and len(self._queue) > 0:
+                idx = self._queue.popleft()
+                self._accepted -= 1
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                return False
+            self._accepted += 1
+
+        self._slots[idx] = img
+        self._slot_info[idx] = info
+
+        with self._cond:
+            self._queue.append(idx)
+            self.max_queued = max(self.max_queued, len(self._queue))
+            self._cond.notify_all()
+        return True
+
+    def __call__(self, img, info=None):
+        return self.push(img, info)
+
+    def _open_files(self):
+        shape = (self.max_frames,) + self._slots.shape[1:]
+        self._frames_file = np.lib.format.open_memmap(self.frames_path, mode="w+", dtype=self._slots.dtype, shape=shape)
+        self._timestamps_file = np.lib.format.open_memmap(self.timestamps_path, mode="w+", dtype=self.timestamp_dtype, shape=(self.max_frames,))
+        if hasattr(os, "posix_fallocate"):
+            # reserve the blocks up front instead of growing a sparse file while recording
+            with open(self.frames_path, "r+b") as fh:
+                try:
+                    os.posix_fallocate(fh.fileno(), 0, self._frames_file.offset + self._frames_file.nbytes)
+                except OSError as e:
+                    print( e )
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: len(self._queue) > 0 or not self._running)
+                    if len(self._queue) == 0:
+                        break
+                    # taken off the queue, a "oldest" drop cannot recycle the slot while it is written
+                    idx = self._queue.popleft()
+                if self._frames_file is None:
+                    self._open_files()
+                t0 = time.perf_counter()
+                self._write(idx)
+                self.write_time += time.perf_counter() - t0
+                with self._cond:
+                    self._free.append(idx)
+        except Exception as e:
+            print( e )
+            self.error = e
+            with self._cond:
+                self._full = True
+                self._queue.clear()
+        finally:
+            self._stop_time = time.monotonic()
+            self._close_files()
+
+    def _write(self, idx):
+        info = self._slot_info[idx]
+        n = self.frames
+        self._frames_file[n] = self._slots[idx]
+        if info is not None:
+            self._timestamps_file[n] = (info.sequence, info.timestamp,
+                    np.nan if info.exposure is None else info.exposure,
+                    np.nan if info.gain is None else info.gain)
+        else:
+            self._timestamps_file[n] = (n, time.monotonic(), np.nan, np.nan)
+        self.frames = n + 1
+
+    def _close_files(self):
+        if self._frames_file is not None:
+            self._frames_file.flush()
+            self._timestamps_file.flush()
+            self._frames_file._mmap.close()
+            self._timestamps_file._mmap.close()
+            self._frames_file = None
+            self._timestamps_file = None
+            if self.frames < self.max_frames:
+                self._truncate(self.frames_path, self._slots.dtype, (self.frames,) + self._slots.shape[1:])
+                self._truncate(self.timestamps_path, self.timestamp_dtype, (self.frames,))
+        self._write_metadata()
+
+    def _truncate(self, path, dtype, shape):
+        # rewrites the .npy header for the frames actually recorded, if it still fits in place
+        with open(path, "r+b") as fh:
+            np.lib.format.read_magic(fh)
+            np.lib.format.read_array_header_1_0(fh)
+            offset = fh.tell()
+            header = io.BytesIO()
+            np.lib.format.write_array_header_1_0(header, {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                "fortran_order": False, "shape": shape})
+            if len(header.getvalue()) != offset:
+                return False
+            fh.seek(0)
+            fh.write(header.getvalue())
+            fh.truncate(offset + int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        return True
+
+    def _write_metadata(self):
+        metadata = dict(self._metadata)
+        metadata["frames_file"] = os.path.basename(self.frames_path)
+        metadata["timestamps_file"] = os.path.basename(self.timestamps_path)
+        metadata["report"] = self.report()
+        with open(self.metadata_path, "w") as fh:
+            json.dump(metadata, fh, indent=1, default=str)
+
+    def stop(self):
+        # returns once every queued frame has been written
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.report()
+
+    def report(self):
+        end = self._stop_time if self._stop_time is not None else time.monotonic()
+        elapsed = end - self._start_time if self._start_time is not None else 0.0
+        frame_bytes = 0 if self._slots is None else self._slots[0].nbytes
+        fps = self.frames / elapsed if elapsed > 0 else 0.0
+        sustainable_fps = self.frames / self.write_time if self.write_time > 0 else 0.0
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "elapsed_s": elapsed,
+            "fps": fps,
+            "throughput_mb_s": fps * frame_bytes / 2**20,
+            "sustainable_fps": sustainable_fps,
+            "sustainable_mb_s": sustainable_fps * frame_bytes / 2**20,
+            "max_queued": self.max_queued,
+            "queue_size": self.queue_size,
+            "drop_policy": self.drop_policy,
+        }
@@ -0,0 +1,308 @@
+import glob
+import json
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .AbstractCamera import AbstractCamera
+
+IMAGE_EXTENSIONS = [".png", ".tif", ".tiff", ".bmp", ".pgm", ".jpg"]
+
+# directories searched by list_devices, separated by os.pathsep
+REPLAY_PATH_VARIABLE = "WEPYCON_REPLAY_PATH"
+
+class NpyStack(object):
+    # frames of a .npy stack, served as views into a read only memory map
+    def __init__(self, path, prefetch=4):
+        self.path = path
+        self.frames = np.load(path, mmap_mode="r")
+        if self.frames.ndim == 2:
+            self.frames = self.frames[np.newaxis]
+        self.prefetch = prefetch
+        self._mmap = getattr(self.frames, "_mmap", None)
+        self._frame_bytes = self.frames[0].nbytes
+        self._map_offset = 0
+        if self._mmap is not None:
+            # the map starts at an allocation granularity boundary before the array data
+            offset = self.frames.offset
+            self._map_offset = offset - offset % mmap.ALLOCATIONGRANULARITY
+            self._data_offset = offset - self._map_offset
+            self._advise(getattr(mmap, "MADV_SEQUENTIAL", None), 0, len(self._mmap))
+        self._fd = None
+        if self._mmap is None or not hasattr(self._mmap, "madvise"):
+            if hasattr(os, "posix_fadvise"):
+                self._fd = os.open(path, os.O_RDONLY)
+
+    def __len__(self):
+        return self.frames.shape[0]
+
+    @property
+    def shape(self):
+        return self.frames.shape[1:]
+
+    @property
+    def dtype(self):
+        return self.frames.dtype
+
+    def _advise(self, option, start, length):
+        if option is None or not hasattr(self._mmap, "madvise"):
+            return
+        start, length = start - start % mmap.PAGESIZE, length + start % mmap.PAGESIZE
+        try:
+            self._mmap.madvise(option, start, min(length, len(self._mmap) - start))
+        except (OSError, ValueError):
+            pass
+
+    def read_ahead(self, index):
+        # asks the kernel to page in the next frames while the current one is processed
+        n = min(self.prefetch, len(self) - index)
+        if n <= 0:
+            return
+        if self._mmap is not None and hasattr(self._mmap, "madvise"):
+            self._advise(getattr(mmap, "MADV_WILLNEED", None), self._data_offset + index * self._frame_bytes, n * self._frame_bytes)
+        elif self._fd is not None:
+            os.posix_fadvise(self._fd, self.frames.offset + index * self._frame_bytes, n * self._frame_bytes, os.POSIX_FADV_WILLNEED)
+
+    def __getitem__(self, index):
+        return self.frames[index]
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+class ImageSequence(object):
+    # numbered image files, decoded ahead of time on a thread pool
+    def __init__(self, files, prefetch=4):
+        import cv2
+        self._cv2 = cv2
+        self.files = files
+        self.prefetch = prefetch
+        self._executor = ThreadPoolExecutor(max_workers=2)
+        self._pending = {}
+        first = self._load(0)
+        self.shape = first.shape
+        self.dtype = first.dtype
+
+    def __len__(self):
+        return len(self.files)
+
+    def _load(self, index):
+        img = self._cv2.imread(self.files[index], self._cv2.IMREAD_UNCHANGED)
+        if img is None:
+            raise IOError("cannot read " + self.files[index])
+        if img.ndim == 3:
+            img = self._cv2.cvtColor(img, self._cv2.COLOR_BGR2GRAY)
+        return img
+
+    def read_ahead(self, index):
+        for i in range(index, min(index + self.prefetch, len(self))):
+            if not i in self._pending:
+                self._pending[i] = self._executor.submit(self._load, i)
+
+    def __getitem__(self, index):
+        future = self._pending.pop(index, None)
+        # futures of frames that were skipped by seeking are dropped
+        for i in [i for i in self._pending if i < index]:
+            self._pending.pop(i).cancel()
+        if future is None:
+            return self._load(index)
+        return future.result()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+class ReplayCamera(AbstractCamera):
+    playback_modes = ["Original", "Fixed", "Fast"]
+
+    def __init__(self, path, playback="Original", fps=30, loop=True, prefetch=4):
+        super(ReplayCamera, self).__init__()
+        print("[ReplayCamera].__init__()")
+        self.id = path
+        self.path = path
+        self.source = self._open(path, prefetch)
+        metadata = self._load_metadata(path)
+
+        self.width = self.source.shape[1]
+        self.height = self.source.shape[0]
+        self.px_size = metadata.get("px_size", 1.0)
+        self.px_size_unit = metadata.get("px_size_unit")
+        self.adc_bits = metadata.get("adc_bits", self._guess_adc_bits())
+        self.timestamps = self._load_timestamps(path)
+
+        self.controls_available = {
+            "Playback": [list, (self.playback_modes, self.playback_modes.index(playback)), None],
+            "Rate": [int, [1, 10000, fps], None],
+            "Loop": [bool, loop, None],
+            }
+        self._add_binning_control()
+
+        self._settings = {}
+        for name in self.controls_available.keys():
+            if self.controls_available[name][0] == int:
+                self._settings[name] = self.controls_available[name][1][-1]
+            elif self.controls_available[name][0] == bool:
+                self._settings[name] = self.controls_available[name][1]
+            elif self.controls_available[name][0] == list:
+                self._settings[name] = self.controls_available[name][1][1]
+
+        self.index = 0
+        self._last_index = None
+        self._clock = None
+
+    def __str__(self):
+        return os.path.basename(self.path)
+
+    @staticmethod
+    def _open(path, prefetch):
+        if os.path.isdir(path):
+            files = []
+            for extension in IMAGE_EXTENSIONS:
+                files += glob.glob(os.path.join(path, "*" + extension))
+            if len(files) == 0:
+                raise IOError("no images in " + path)
+            return ImageSequence(sorted(files), prefetch)
+        if any(c in path for c in "*?["):
+            return ImageSequence(sorted(glob.glob(path)), prefetch)
+        return NpyStack(path, prefetch)
+
+    @staticmethod
+    def _companion(path, suffix):
+        base = os.path.splitext(path)[0] if not os.path.isdir(path) else path.rstrip(os.sep)
+        return base + suffix
+
+    def _load_metadata(self, path):
+        # sidecar written by the Recorder
+        try:
+            with open(self._companion(path, ".json"), "r") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _load_timestamps(self, path):
+        try:
+            timestamps = np.load(self._companion(path, "_timestamps.npy"))
+        except (OSError, ValueError):
+            return None
+        if len(timestamps) != len(self.source):
+            return None
+        return timestamps
+
+    def _guess_adc_bits(self):
+        if self.source.dtype == np.uint8:
+            return 8
+        peak = int(np.amax(self.source[0]))
+        for bits in [10, 12, 14, 16]:
+            if peak < 2**bits:
+                return bits
+        return 16
+
+    @property
+    def playback(self):
+        return self.playback_modes[self._settings["Playback"]]
+
+    def seek(self, index):
+        self.index = index % len(self.source)
+        self._clock = None
+
+    def _frame_time(self, index):
+        # playback time of frame index relative to the first frame
+        if self.playback == "Original" and self.timestamps is not None:
+            return self.timestamps["timestamp"][index] - self.timestamps["timestamp"][0]
+        return index / float(self._settings["Rate"])
+
+    def _wait_for_frame(self, index):
+        if self.playback == "Fast":
+            return
+        now = time.monotonic()
+        target = None
+        if self._clock is not None:
+            target = self._clock + self._frame_time(index)
+        if target is None or target < now - 1.0:
+            # (re)start the clock on the first frame, after seeking, looping or a long pause
+            self._clock = now - self._frame_time(index)
+            return
+        if target > now:
+            time.sleep(target - now)
+
+    def get_image(self, substract_background=True, *args, **kwargs):
+        if self.index >= len(self.source):
+            if not self._settings["Loop"]:
+                # end of the recording, keeps the acquisition thread from spinning
+                time.sleep(0.05)
+                return None
+            self.seek(0)
+        index = self.index
+        self._wait_for_frame(index)
+        img = self.source[index]
+        self.source.read_ahead(index + 1)
+        self._last_index = index
+        self.index = index + 1
+        return self.preprocess(img, substract_background)
+
+    def frame_info(self):
+        # exposure and gain as recorded, if known
+        if self.timestamps is not None and self._last_index is not None:
+            t = self.timestamps[self._last_index]
+            exposure = None if np.isnan(t["exposure"]) else float(t["exposure"])
+            gain = None if np.isnan(t["gain"]) else float(t["gain"])
+            return exposure, gain, None
+        return None, None, None
+
+    def close(self):
+        self.source.close()
+
+    @property
+    def settings(self):
+        print("[ReplayCamera].settings - getter")
+        return self._settings
+
+    @settings.setter
+    def settings(self, settings):
+        print("[ReplayCamera].settings - setter")
+        for key in settings.keys():
+            assert key in self._settings.keys()
+            changed = self._settings[key] != settings[key]
+            self._settings[key] = settings[key]
+            if key == "Binning":
+                self.set_binning(self.supported_bins[int(settings[key])])
+            elif changed and key in ["Playback", "Rate"]:
+                self._clock = None
+
+    @staticmethod
+    def _replay_sources():
+        sources = []
+        for directory in os.environ.get(REPLAY_PATH_VARIABLE, os.getcwd()).split(os.pathsep):
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                path = os.path.join(directory, name)
+                if name.endswith(".npy") and not name.endswith("_timestamps.npy"):
+                    sources.append(path)
+                elif os.path.isdir(path) and any(os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS for f in os.listdir(path)):
+                    sources.append(path)
+        return sources
+
+    @classmethod
+    def from_device_dialog(cls):
+        devices = cls.list_devices()
+        s = ""
+        for i, device in enumerate( devices ):
+            s += '\t'
+            s += str( i+1 ) + ')'
+            s += '\t'
+            s += device[1]
+            s += '\n'
+        decision = int( input( "Replay:\n" + s) ) - 1
+        return cls.from_device_number( devices[decision][0] )
+
+    @classmethod
+    def list_devices(cls):
+        return [(i, os.path.basename(path)) for i, path in enumerate(cls._replay_sources())]
+
+    @classmethod
+    def from_device_number(cls, num):
+        return cls(cls._replay_sources()[num])
@@ -0,0 +1,38 @@
+import numpy as np
+
+from .BeamAnalysis import BeamAnalysis
+from .GaussianFitter import GaussianFitter
+
+class SliceAnalysis(object):
+    # slice profiles of a frame, a picklable callable so it can run in an AnalysisPool as well as on a thread;
+    # returns None or
+    # (crosshair indices or None, profile x, profile y, BeamParameters or None, GaussianProfile fits or None)
+    methods = ["Peak", "COG", "integrate"]
+
+    def __init__(self, method="Peak", fit=False):
+        if not method in self.methods:
+            raise ValueError("unknown slice method " + str(method))
+        self.method = method
+        self.fit = fit
+        self.analysis = BeamAnalysis()
+        self.fitter = GaussianFitter()
+
+    def __call__(self, img):
+        result = self.profiles(img)
+        if result is None or not self.fit:
+            return result
+        return result[:4] + (self.fitter.fit([result[1], result[2]]),)
+
+    def profiles(self, img):
+        if self.method == "Peak":
+            ind_y, ind_x = np.unravel_index(np.argmax(img), img.shape)
+            return (ind_x, ind_y), img[ind_y,:], img[:,ind_x], None, None
+        if self.method == "COG":
+            # ISO 11146 centroid
+            beam = self.analysis.analyse(img)
+            if beam is None:
+                return None
+            ind_x = min(max(int(round(beam.x)), 0), img.shape[1] - 1)
+            ind_y = min(max(int(round(beam.y)), 0), img.shape[0] - 1)
+            return (ind_x, ind_y), img[ind_y,:], img[:,ind_x], beam, None
+        return None, np.sum(img, axis=0), np.sum(img, axis=1), None, None
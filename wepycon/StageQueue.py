@@ -0,0 +1,52 @@
+import threading
+from collections import deque
+
+class StageQueue(object):
+    # bounded hand over between pipeline stages; a full queue drops its oldest item, the newest always gets through
+    def __init__(self, maxsize=2):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def put(self, item):
+        # returns the dropped item, if any, so the producer can recycle its buffers
+        dropped = None
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                dropped = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify_all()
+        return dropped
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._items) > 0 or self._closed, timeout):
+                return None
+            if len(self._items) == 0:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def open(self):
+        with self._cond:
+            self._closed = False
+            self._cond.notify_all()
+
+    def wait_open(self, timeout=None):
+        # returns True once the queue is open again, False after timeout
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._closed, timeout)
@@ -18,11 +18,23 @@ elif "Windows" == platform.system():
     else:
         lib_filename = os.path.dirname(__file__) + "/lib/x86_windows/ASICamera2.dll"
 
-asi.init(lib_filename)
+_library_initialized = False
+
+def init_library():
+    # loading the SDK is deferred until a camera is listed or opened
+    global _library_initialized
+    if not _library_initialized:
+        asi.init(lib_filename)
+        _library_initialized = True
 
 class ZwoAsiCamera(AbstractCamera):
+    supports_hardware_roi = True
+    # px_size in metres
+    px_size_unit = 1.0
+
     def __init__(self, camera_id):
         super(ZwoAsiCamera, self).__init__()
+        init_library()
         self.id = camera_id
         self.device = asi.Camera(camera_id)
         
@@ -58,6 +70,10 @@ class ZwoAsiCamera(AbstractCamera):
         self.width = info["MaxWidth"]
         self.height = info["MaxHeight"]
         self.name = info["Name"]
+        self.hardware_bins = [b for b in info["SupportedBins"] if b > 0]
+        self._hardware_binning = 1
+        # full frame as programmed at the current hardware binning
+        self._hardware_frame = (self.sensor_width // 8 * 8, self.sensor_height // 2 * 2)
 
         if (not info["IsUSB3Host"]) and ("HighSpeedMode" in self.controls_available.keys()):
             del self.controls_available["HighSpeedMode"]
@@ -68,8 +84,9 @@ class ZwoAsiCamera(AbstractCamera):
         self.controls_available["VideoMode"] = [bool, True, None]
         self.video_mode = True
 
-        self.controls_available["ADCbits"] = [list, (["8", "16"], 1), None]
-        
+        self.controls_available["ADCbits"] = [list, (["8", "16"], 1 if self._adc_bits > 8 else 0), None]
+        self._add_binning_control()
+
         self._settings = {}
         for name in self.controls_available.keys():
             _type = self.controls_available[name][0]
@@ -78,8 +95,8 @@ class ZwoAsiCamera(AbstractCamera):
             elif _type == bool:
                 self._settings[name] = self.controls_available[name][1]
             elif _type == list:
-                idx = self.controls_available[name][1][1]
-                self.settings[name] = self.controls_available[name][1][0][idx]
+                # list settings hold the index of the selected entry, as the settings form and the setter do
+                self._settings[name] = self.controls_available[name][1][1]
 
     @property
     def video_mode(self):
@@ -113,26 +130,106 @@ class ZwoAsiCamera(AbstractCamera):
             self.video_mode = True
 
 
+    # the delivered geometry is what the SDK was programmed with, not the sensor size divided by the binning
+    @property
+    def width(self):
+        return self._hardware_frame[0] // self._software_binning
+
+    @width.setter
+    def width(self, value):
+        self.sensor_width = value
+
+    @property
+    def height(self):
+        return self._hardware_frame[1] // self._software_binning
+
+    @height.setter
+    def height(self, value):
+        self.sensor_height = value
+
+    def set_roi(self, roi):
+        # roi (x, y, width, height) in pixels of the delivered frames, the sensor is programmed
+        # in pixels of the hardware binning
+        was_video_mode_active = self.video_mode
+        self.video_mode = False
+
+        factor = self._software_binning
+        full_width, full_height = self._hardware_frame
+        if roi is None:
+            x, y, w, h = 0, 0, full_width, full_height
+        else:
+            x, y, w, h = [int(v) * factor for v in roi]
+            x = min(max(x, 0), full_width - 8)
+            y = min(max(y, 0), full_height - 2)
+            # the SDK requires the width to be a multiple of 8 and the height a multiple of 2
+            w = max(min(w, full_width - x) // 8 * 8, 8)
+            h = max(min(h, full_height - y) // 2 * 2, 2)
+        self.device.set_roi(start_x=x, start_y=y, width=w, height=h, bins=self._hardware_binning)
+        if (x, y, w, h) == (0, 0, full_width, full_height):
+            self.roi = None
+        else:
+            self.roi = (x // factor, y // factor, w // factor, h // factor)
+
+        if was_video_mode_active:
+            self.video_mode = True
+
+    def _set_hardware_binning(self, binning):
+        if not binning in self.hardware_bins:
+            return False
+        was_video_mode_active = self.video_mode
+        self.video_mode = False
+
+        width = (self.sensor_width // binning) // 8 * 8
+        height = (self.sensor_height // binning) // 2 * 2
+        self.device.set_roi(start_x=0, start_y=0, width=width, height=height, bins=binning)
+        self._hardware_binning = binning
+        self._hardware_frame = (width, height)
+        self.roi = None
+
+        if was_video_mode_active:
+            self.video_mode = True
+        return True
+
+    def frame_info(self):
+        try:
+            exposure = self.device.get_control_value(asi.ASI_EXPOSURE)[0]
+            gain = self.device.get_control_value(asi.ASI_GAIN)[0]
+            dropped = self.device.get_dropped_frames()
+        except Exception as e:
+            print( e )
+            return super(ZwoAsiCamera, self).frame_info()
+        return exposure, gain, dropped
+
+    def close(self):
+        try:
+            if self._video_mode:
+                self.video_mode = False
+            self.device.close()
+        except Exception as e:
+            print( e )
+
     def get_image(self, substract_background=True, timeout=600):
         try:
             if self._video_mode:
                 img = self.device.capture_video_frame(timeout=timeout)
             else:
                 img = self.device.capture()
-            if substract_background and self.background is not None:
-                return img - self.background
-            return img
+            return self.preprocess(img, substract_background)
         except Exception as e:
             print( e )
-            return np.zeros((self.height, self.width), dtype=int)
+            if self.roi is not None:
+                return np.zeros((self.roi[3], self.roi[2]), dtype=self.native_dtype)
+            return np.zeros((self.height, self.width), dtype=self.native_dtype)
 
     @classmethod
     def list_devices(cls):
+        init_library()
         devices = asi.list_cameras()
         return list(enumerate(devices))
 
     @classmethod
     def from_device_dialog(cls):
+        init_library()
         devices = asi.list_cameras()
         s = ""
         for i, device in enumerate( devices ):
@@ -164,5 +261,7 @@ class ZwoAsiCamera(AbstractCamera):
                 self.device.set_control_value(_id, _type(value))
             elif name == "VideoMode":
                 self.video_mode = _type(value)
+            elif name == "Binning":
+                self.set_binning(self.supported_bins[int(value)])
             elif name == "ADCbits":
                 self.adc_bits = int(self.controls_available[name][1][0][int(value)])
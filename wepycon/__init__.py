@@ -1,24 +1,10 @@
-camera_types = {}
-try:
-    from .LogitechC500Camera import LogitechC500Camera
-    camera_types[LogitechC500Camera.__name__] = LogitechC500Camera
-except ImportError as e:
-    print( e )
+from .CameraRegistry import CameraRegistry
 
-try:
-    from .OpenCVCamera import OpenCVCamera
-    camera_types[OpenCVCamera.__name__] = OpenCVCamera
-except ImportError as e:
-    print( e )
-
-try:
-    from .ZwoAsiCamera import ZwoAsiCamera
-    camera_types[ZwoAsiCamera.__name__] = ZwoAsiCamera
-except ImportError as e:
-    print( e )
-
-try:
-    from .DebugCamera import DebugCamera
-    camera_types[DebugCamera.__name__] = DebugCamera
-except ImportError as e:
-    print( e )
+# backends are imported (and their SDKs initialized) on first access of camera_types[name]
+camera_types = CameraRegistry()
+camera_types.register("LogitechC500Camera", "wepycon.LogitechC500Camera:LogitechC500Camera", requires=("cv2",))
+camera_types.register("OpenCVCamera", "wepycon.OpenCVCamera:OpenCVCamera", requires=("cv2",))
+camera_types.register("ZwoAsiCamera", "wepycon.ZwoAsiCamera:ZwoAsiCamera", requires=("zwoasi",))
+camera_types.register("DebugCamera", "wepycon.DebugCamera:DebugCamera", requires=("numpy",))
+camera_types.register("ReplayCamera", "wepycon.ReplayCamera:ReplayCamera", requires=("numpy",))
+camera_types.load_entry_points()
@@ -1,9 +1,14 @@
-from . import QLabel, QImage, QPixmap, Qt, Slot, Signal, QPainter, QColor, QPen, QSize
+from . import QLabel, QImage, QPixmap, Qt, Slot, Signal, QPainter, QColor, QPen, QSize, QRect
+from .DisplayView import DisplayView
+from wepycon.BlockAverage import BlockAverage
 import numpy as np
 
 class BeamWidget(QLabel):
     crosshair_signal = Signal()
     circle_signal = Signal()
+    roi_signal = Signal()
+    # composed frames from the display stage, shown on the GUI thread
+    image_ready = Signal(QImage)
     def __init__(self, camera):
         super(BeamWidget, self).__init__()
         self.camera = camera
@@ -23,61 +28,107 @@ class BeamWidget(QLabel):
 
         self.setAlignment(Qt.AlignLeft|Qt.AlignTop)
         self.pxmap = QPixmap()
+        # frames are averaged down to about the displayed size before they are colorized and drawn
+        self._downsample = BlockAverage()
+        self._canvas = None
+        self.image_ready.connect(self.show_image)
         self.painter = QPainter()
         self.pen = QPen()
         self.pen.setWidth(3)
         self.pen.setColor(QColor(255,255,255,255))
+        self.slice_pen = QPen(QColor(255,255,255,255))
+        self.slice_pen.setWidth(1)
         self.setMinimumSize(10,10)
+        self.view = None
+        self.update_view()
 
+    def display_size(self):
+        # size of the ROI scaled into the widget, keeping the aspect ratio
+        scale = min(self.width() / self.ROI_width, self.height() / self.ROI_height)
+        return max(int(self.ROI_width * scale), 1), max(int(self.ROI_height * scale), 1)
 
-    def update_image(self, img, depth):
+    def update_view(self):
+        # GUI thread only: the display stage reads nothing but this snapshot of the widget state
+        (_x0, _x1), (_y0, _y1) = self.ROI
+        cross = tuple(self.cross_location) if self.cross and self.cross_location is not None else None
+        circle = None
+        if self.circle and self.circle_location is not None and self.circle_radius is not None:
+            circle = (tuple(self.circle_location), self.circle_radius)
+        selection = (self.mouse_pressed_position, self.mouse_move_position) if self.mouse_pressed else None
+        self.view = DisplayView(self.display_size(), ((_x0, _x1), (_y0, _y1)), tuple(self.camera.roi_offset),
+                cross, circle, selection)
+
+    def resizeEvent(self, event):
+        super(BeamWidget, self).resizeEvent(event)
+        self.update_view()
+
+    def downsample(self, img, view):
+        # crops img to the ROI and averages it down to no less than the display size
+        _ox, _oy = view.offset
+        (_x0, _x1), (_y0, _y1) = view.roi
+        img = img[max(_y0 - _oy, 0):max(_y1 - _oy, 0), max(_x0 - _ox, 0):max(_x1 - _ox, 0)]
+        width, height = view.size
+        factor = max(min(img.shape[1] // width, img.shape[0] // height), 1)
+        return self._downsample(img, factor)
+
+    @staticmethod
+    def _to_display(view, x, y):
+        width, height = view.size
+        (_x0, _x1), (_y0, _y1) = view.roi
+        return (x - _x0) * width / (_x1 - _x0), (y - _y0) * height / (_y1 - _y0)
+
+    def update_image(self, img, depth, view, slices=None):
+        # img is the downsampled ROI of view, wrapped and scaled into a QImage canvas off the GUI thread
+        # slices is the (x, y) of the profile crosshair or None; an emitted canvas is detached by the next frame
         if img.ndim > 2:
-            img = img[self.ROI[1][0]:self.ROI[1][1], self.ROI[0][0]:self.ROI[0][1], ...]
-            qim = QImage(img.astype(np.uint8), img.shape[1], img.shape[0], QImage.Format_RGBA8888)
+            fmt = QImage.Format_RGBA8888
+        elif depth > 8:
+            fmt = QImage.Format_Grayscale16
         else:
-            img = img[self.ROI[1][0]:self.ROI[1][1], self.ROI[0][0]:self.ROI[0][1]]
-            if depth > 8:
-                qim = QImage(img.astype(np.uint16), img.shape[1], img.shape[0], QImage.Format_Grayscale16)
-            else:
-                qim = QImage(img.astype(np.uint8), img.shape[1], img.shape[0], QImage.Format_Grayscale8)
-
-        self.pxmap.convertFromImage(qim)
-        if self.cross_location is not None and self.cross:
-            _x, _y = self.cross_location
-            self.painter.begin(self.pxmap)
-            self.painter.setPen(self.pen)
-            if _x > self.ROI[0][0] and _x < self.ROI[0][1]:
-                _x -= self.ROI[0][0]
-                self.painter.drawLine(_x, 0, _x, self.pxmap.height())
-            if _y > self.ROI[1][0] and _y < self.ROI[1][1]:
-                _y -= self.ROI[1][0]
-                self.painter.drawLine(0, _y, self.pxmap.width(), _y)
-            self.painter.end()
-
-        if self.circle_location is not None and self.circle_radius is not None and self.circle:
-            if self.circle_radius > 2:
-                _x, _y = self.circle_location
-                _x -= self.ROI[0][0]
-                _y -= self.ROI[1][0]
-                _r = self.circle_radius
-                self.painter.begin(self.pxmap)
-                self.painter.setPen(self.pen)
-                self.painter.drawEllipse(_x - _r/2, _y - _r/2, _r, _r)
-                self.painter.end()
+            fmt = QImage.Format_Grayscale8
+        if not img.flags.c_contiguous:
+            # only a cropped frame that needs no downsampling is copied
+            img = np.ascontiguousarray(img)
+        qim = QImage(img, img.shape[1], img.shape[0], img.strides[0], fmt)
 
-        if self.mouse_pressed:
-            _x1, _y1 = self.mouse_pressed_position
-            _x2, _y2 = self.mouse_move_position
-            _x1 -= self.ROI[0][0]
-            _y1 -= self.ROI[1][0]
-            _x2 -= self.ROI[0][0]
-            _y2 -= self.ROI[1][0]
-            self.painter.begin(self.pxmap)
-            self.painter.setPen(self.pen)
-            self.painter.drawRect(_x1, _y1, _x2 - _x1, _y2 - _y1)
-            self.painter.end()
-
-        self.pxmap = self.pxmap.scaled(self.size(), Qt.KeepAspectRatio)
+        width, height = view.size
+        if self._canvas is None or self._canvas_size != (width, height):
+            self._canvas = QImage(width, height, QImage.Format_RGB32)
+            self._canvas_size = (width, height)
+
+        (_x0, _x1), (_y0, _y1) = view.roi
+        self.painter.begin(self._canvas)
+        self.painter.drawImage(QRect(0, 0, width, height), qim)
+        if slices is not None:
+            # drawn after downsampling, the lines keep their contrast on large sensors
+            _dx, _dy = self._to_display(view, slices[0] + 0.5, slices[1] + 0.5)
+            self.painter.setPen(self.slice_pen)
+            self.painter.drawLine(int(_dx), 0, int(_dx), height)
+            self.painter.drawLine(0, int(_dy), width, int(_dy))
+        self.painter.setPen(self.pen)
+        if view.cross is not None:
+            _x, _y = view.cross
+            _dx, _dy = self._to_display(view, _x, _y)
+            if _x > _x0 and _x < _x1:
+                self.painter.drawLine(int(_dx), 0, int(_dx), height)
+            if _y > _y0 and _y < _y1:
+                self.painter.drawLine(0, int(_dy), width, int(_dy))
+
+        if view.circle is not None and view.circle[1] > 2:
+            _x, _y = self._to_display(view, *view.circle[0])
+            _r = view.circle[1] * width / (_x1 - _x0)
+            self.painter.drawEllipse(int(_x - _r/2), int(_y - _r/2), int(_r), int(_r))
+
+        if view.selection is not None:
+            _sx1, _sy1 = self._to_display(view, *view.selection[0])
+            _sx2, _sy2 = self._to_display(view, *view.selection[1])
+            self.painter.drawRect(int(_sx1), int(_sy1), int(_sx2 - _sx1), int(_sy2 - _sy1))
+        self.painter.end()
+        self.image_ready.emit(self._canvas)
+
+    @Slot(QImage)
+    def show_image(self, image):
+        self.pxmap.convertFromImage(image)
         self.setPixmap(self.pxmap)
 
     @Slot()
@@ -94,10 +145,16 @@ class BeamWidget(QLabel):
             elif event.modifiers() == Qt.ShiftModifier:
                 self.circle_location = (_x, _y)
                 self.circle_signal.emit()
+            self.update_view()
         elif event.button() == Qt.RightButton:
-            self.ROI = [(0, self.camera.width), (0, self.camera.height)]
-            self.ROI_width = self.camera.width
-            self.ROI_height = self.camera.height
+            self.reset_roi()
+
+    def reset_roi(self):
+        self.ROI = [(0, self.camera.width), (0, self.camera.height)]
+        self.ROI_width = self.camera.width
+        self.ROI_height = self.camera.height
+        self.update_view()
+        self.roi_signal.emit()
 
     @Slot()
     def mouseReleaseEvent(self, event):
@@ -109,18 +166,24 @@ class BeamWidget(QLabel):
                 self.ROI = [sorted((_x1, _x2)), sorted((_y1, _y2))]
                 self.ROI_width = self.ROI[0][1] - self.ROI[0][0]
                 self.ROI_height = self.ROI[1][1] - self.ROI[1][0]
+                self.update_view()
+                self.roi_signal.emit()
+            else:
+                self.update_view()
 
 
     def mouseMoveEvent(self, event):
         if self.mouse_pressed:
             _x, _y = self._to_camera_coordinates((event.x(), event.y()))
             self.mouse_move_position = (_x, _y)
+            self.update_view()
 
     @Slot()
     def wheelEvent(self, event):
         if event.modifiers() == Qt.ShiftModifier:
             self.circle_radius += event.angleDelta().y() / 12
             self.circle_radius = min(max(self.circle_radius, 0), self.pxmap.width())
+            self.update_view()
             self.circle_signal.emit()
     
     def _to_camera_coordinates(self, point):
@@ -1,24 +1,130 @@
 from . import QThread
-from matplotlib import cm
+from wepycon.StageQueue import StageQueue
+from collections import deque
+import threading
 import numpy as np
+import time
 
 class BeamWorker(QThread):
-    def __init__(self, beam_widget, camera, cmap, 
-            update_fun=lambda img : None):
+    # analysis stage: analyses every frame it gets from the acquisition ring buffer and hands
+    # frames that are due for display, together with their result, to the display stage
+    def __init__(self, engine, update_fun=lambda img : None, display_fps=None, queue_size=2, pool=None):
         super(BeamWorker, self).__init__()
-        self.beam_widget = beam_widget
-        self.camera = camera
-        self.cmap = cmap
+        self.engine = engine
+        self.camera = engine.camera
+        # update_fun returns None or
+        # (crosshair indices or None, profile x, profile y, BeamParameters or None, GaussianProfile fits or None)
         self.update_fun = update_fun
+        # display refreshes per second, None hands over every analysed frame
+        self.display_fps = display_fps
+        # set while the widget is hidden or minimized, frames are analysed but not handed over
+        self.throttled = False
+        # optional AnalysisPool, then update_fun runs in its worker processes instead of on this thread
+        self.pool = pool
+        self.queue = StageQueue(queue_size)
+        self.result = None
+        self.analysed = 0
+        # frames the analysis skipped because a newer one was already available
+        self.skipped = 0
+        self.latency = None
+        self._last_sequence = None
+        self._next_display = 0.0
+        # frame buffers travelling to the display stage and back
+        self._free = deque()
+        # os thread id while running, for the cpu accounting of the scheduler
+        self.native_id = None
+        self._running = False
+        self.reader = self.engine.buffer.reader()
 
     def run(self):
-        img = self.camera.get_image()
-        idxs = self.update_fun(img)
-        if idxs is not None:
-            img[:,idxs[0]] = 2**self.camera.adc_bits - 1
-            img[idxs[1],:] = 2**self.camera.adc_bits - 1 
+        self.native_id = threading.get_native_id()
+        self._running = True
+        self.queue.open()
+        while self._running:
+            pool = self.pool
+            # latest frame wins, the analysis never lags behind the camera
+            sequence, img = self.reader.latest(timeout=0.1 if pool is None or len(pool) == 0 else 0.002)
+            if img is not None:
+                due = self._display_due()
+                if due:
+                    # the result refers to the frame (profiles are views), both travel together
+                    img = self.acquire(img)
+                info = self.reader.info
+                timestamp = info.timestamp if info is not None else None
+                if pool is None:
+                    self.analyse(img)
+                    self._finish(img if due else None, self.result, timestamp)
+                elif not pool.submit(img, (img if due else None, timestamp)) and due:
+                    self.release(img)
+                if self._last_sequence is not None and sequence > self._last_sequence:
+                    self.skipped += sequence - self._last_sequence - 1
+                self._last_sequence = sequence
+            if pool is not None:
+                # results come back in frame order
+                for (img, timestamp), result in pool.results():
+                    self.result = result
+                    self._finish(img, result, timestamp)
+        if self.pool is not None:
+            for (img, _), _ in self.pool.wait_all():
+                if img is not None:
+                    self.release(img)
+        self.queue.close()
 
-        if self.cmap is not None:
-            img = np.take(self.cmap, np.clip(img.astype(int), 0, 2**self.camera.adc_bits - 1), axis=0)
+    def _finish(self, img, result, timestamp):
+        # img is the display copy of the analysed frame or None if it is not due for display
+        self.analysed += 1
+        if img is not None:
+            dropped = self.queue.put((img, result))
+            if dropped is not None:
+                self.release(dropped[0])
+        if timestamp is not None:
+            self.latency = time.monotonic() - timestamp
 
-        self.beam_widget.update_image(img, self.camera.adc_bits)
+    def _display_due(self):
+        if self.throttled:
+            return False
+        if self.display_fps is None:
+            return True
+        now = time.monotonic()
+        if now < self._next_display:
+            return False
+        period = 1.0 / self.display_fps
+        # keeps the cadence, but a long gap does not cause a burst of refreshes
+        self._next_display = max(self._next_display + period, now)
+        return True
+
+    def acquire(self, img):
+        # copy of img in a recycled buffer
+        while len(self._free) > 0:
+            buf = self._free.popleft()
+            if buf.shape == img.shape and buf.dtype == img.dtype:
+                np.copyto(buf, img)
+                return buf
+        return img.copy()
+
+    def release(self, buf):
+        if len(self._free) < self.queue.maxsize + 2:
+            self._free.append(buf)
+
+    def analyse(self, img):
+        self.result = self.update_fun(img)
+
+    def set_pool(self, pool):
+        # the analysis loop is restarted around the swap, the display stage keeps running
+        running = self.isRunning()
+        if running:
+            self._running = False
+            self.wait()
+        old, self.pool = self.pool, pool
+        if old is not None and old is not pool:
+            old.close()
+        if running:
+            self.start()
+
+    def stop(self):
+        self._running = False
+        self.queue.close()
+        self.wait()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
@@ -0,0 +1,123 @@
+from . import QObject, QTimer, Slot
+import os
+import time
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+def cpu_time(path):
+    # user + system cpu seconds from a /proc stat file, None where there is none
+    try:
+        with open(path, "r") as fh:
+            fields = fh.read().rsplit(")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+def thread_cpu_time(native_id):
+    if native_id is None:
+        return None
+    return cpu_time("/proc/self/task/{0:d}/stat".format(native_id))
+
+def process_cpu_time(pid):
+    return cpu_time("/proc/{0:d}/stat".format(pid))
+
+class CameraScheduler(QObject):
+    # one place that knows every open CameraWidget: the current tab displays at its full rate, the others
+    # keep capturing and analysing but only refresh their display at background_fps, a minimized window
+    # displays nothing; every interval it accounts fps and cpu per camera
+    def __init__(self, window, background_fps=1, interval=1000):
+        super(CameraScheduler, self).__init__()
+        self.window = window
+        self.background_fps = background_fps
+        self.widgets = []
+        self.current = None
+        self.reports = {}
+        self._last = {}
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.on_timer)
+        self.timer.start(interval)
+
+    def add(self, widget):
+        # the scheduler takes over throttling and the stats refresh of the widget
+        widget.stats_timer.stop()
+        widget.scheduler = self
+        self.widgets.append(widget)
+        self.update()
+
+    def remove(self, widget):
+        if widget in self.widgets:
+            self.widgets.remove(widget)
+        widget.scheduler = None
+        self.reports.pop(widget, None)
+        self._last.pop(widget, None)
+        if self.current is widget:
+            self.current = None
+
+    def set_current(self, widget):
+        self.current = widget if widget in self.widgets else None
+        self.update()
+
+    @Slot()
+    def update(self):
+        minimized = self.window.isMinimized() or not self.window.isVisible()
+        for widget in self.widgets:
+            worker = widget.worker
+            if minimized:
+                worker.throttled = True
+            elif widget is self.current:
+                worker.throttled = False
+                worker.display_fps = widget.display_fps_spin.value()
+            else:
+                worker.throttled = False
+                worker.display_fps = min(self.background_fps, widget.display_fps_spin.value())
+
+    def _sample(self, widget):
+        worker = widget.worker
+        display = widget.display_worker
+        cpu = {
+            "capture": thread_cpu_time(widget.engine.native_id),
+            "analysis": thread_cpu_time(worker.native_id) if worker.isRunning() else None,
+            "display": thread_cpu_time(display.native_id) if display.isRunning() else None,
+            }
+        if worker.pool is not None:
+            times = [process_cpu_time(pid) for pid in worker.pool.pids]
+            cpu["pool"] = sum(t for t in times if t is not None)
+        counts = (widget.engine.frames, worker.analysed, display.frames)
+        return time.monotonic(), counts, cpu
+
+    @Slot()
+    def on_timer(self):
+        self.update()
+        for widget in self.widgets:
+            sample = self._sample(widget)
+            last = self._last.get(widget)
+            self._last[widget] = sample
+            if last is None:
+                continue
+            dt = sample[0] - last[0]
+            capture_fps, analysis_fps, display_fps = [(n - m) / dt for n, m in zip(sample[1], last[1])]
+            cpu = {}
+            for stage, t in sample[2].items():
+                _t = last[2].get(stage)
+                # a thread that (re)started in between has no comparable reading
+                cpu[stage] = 100 * (t - _t) / dt if t is not None and _t is not None and t >= _t else None
+            worker = widget.worker
+            self.reports[widget] = {
+                "camera": str(widget.camera),
+                "current": widget is self.current,
+                "display_budget_fps": 0 if worker.throttled else worker.display_fps,
+                "capture_fps": capture_fps,
+                "analysis_fps": analysis_fps,
+                "display_fps": display_fps,
+                "cpu_percent": cpu,
+                "cpu_total_percent": sum(c for c in cpu.values() if c is not None),
+                }
+        # only the widget on screen spends GUI time on its stats
+        if self.current is not None:
+            self.current.update_stats()
+
+    def report(self):
+        return [self.reports[widget] for widget in self.widgets if widget in self.reports]
+
+    def stop(self):
+        self.timer.stop()
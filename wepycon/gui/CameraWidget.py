@@ -1,17 +1,25 @@
-from . import QWidget, QLabel, QVBoxLayout, QPushButton, Slot, QHBoxLayout, QFormLayout, QComboBox, QSpinBox, QCheckBox, QGridLayout, QSizePolicy, QMessageBox
+from . import QWidget, QLabel, QVBoxLayout, QPushButton, Slot, QHBoxLayout, QFormLayout, QComboBox, QSpinBox, QDoubleSpinBox, QCheckBox, QGridLayout, QSizePolicy, QMessageBox, QTimer, QFileDialog, QApplication
 from .BeamWorker import BeamWorker
-from .MatplotlibWidget import MatplotlibWidget
+from .DisplayWorker import DisplayWorker
+from .ProfilePlotWidget import ProfilePlotWidget
 from .BeamWidget import BeamWidget
+from .UltracalWorker import UltracalWorker
+from wepycon.AcquisitionEngine import AcquisitionEngine
+from wepycon.Recorder import Recorder
+from wepycon.Colormap import Colormap
+from wepycon.GaussianFitter import GaussianFitter
+from wepycon.SliceAnalysis import SliceAnalysis
+from wepycon.AnalysisPool import AnalysisPool
 import numpy as np
+import os
+import shutil
 import time
-from matplotlib import cm
 
 class CameraWidget(QWidget):
     def __init__(self, camera):
         super(CameraWidget, self).__init__()
         self.camera = camera
-        self.is_running = False
-        
+        self.engine = AcquisitionEngine(self.camera)
 
         hbox = QHBoxLayout()
         vbox = QVBoxLayout()
@@ -22,15 +30,19 @@ class CameraWidget(QWidget):
         self.grid.addWidget(self.beam_widget,0,0)
         self.beam_widget.crosshair_signal.connect(self.set_cross_spin_value)
         self.beam_widget.circle_signal.connect(self.set_circle_spin_value)
+        self.beam_widget.roi_signal.connect(self.on_roi_changed)
+        self._profile_axes = {}
+        self.beam = None
+        self.fits = None
         
-        self.x_plot_widget = MatplotlibWidget(horizontal=True)
+        self.x_plot_widget = ProfilePlotWidget(horizontal=True)
         _x = np.arange(self.camera.width) * self.camera.px_size
         _x = _x - np.mean(_x)
         self.x_plot_widget.plot(_x, np.zeros_like(_x))
         self.x_plot_widget.hide()
         self.x_plot_widget.set_ylim([0, 1])
         self.grid.addWidget(self.x_plot_widget, 1, 0)
-        self.y_plot_widget = MatplotlibWidget(horizontal=False)
+        self.y_plot_widget = ProfilePlotWidget(horizontal=False)
         _y = np.arange(self.camera.height) * self.camera.px_size
         _y = _y - np.mean(_y)
         self.y_plot_widget.plot(_y, np.zeros_like(_y))
@@ -79,12 +91,44 @@ class CameraWidget(QWidget):
         self.gui_form.addRow("Slices", self.slices_checkbox)
         self.slice_method_box = None
 
+        self.fit_checkbox = QCheckBox()
+        self.fit_checkbox.stateChanged.connect(self.on_slices_changed)
+        self.gui_form.addRow("Gaussian fit", self.fit_checkbox)
+
         self.cross_checkbox = QCheckBox()
         self.cross_checkbox.stateChanged.connect(self.on_cross_changed)
         self.gui_form.addRow("Fixed Crosshair", self.cross_checkbox)
         self.cross_x_spin = None
         self.cross_y_spin = None
 
+        self.window_checkbox = QCheckBox()
+        self.window_checkbox.stateChanged.connect(self.on_window_changed)
+        self.gui_form.addRow("Window/Level", self.window_checkbox)
+        self.window_spin = None
+        self.level_spin = None
+        self.gamma_spin = None
+
+        # the display refreshes at most this often, analysis runs on every frame the camera delivers
+        self.display_fps_spin = QSpinBox()
+        self.display_fps_spin.setRange(1, 240)
+        screen = QApplication.primaryScreen()
+        self.display_fps_spin.setValue(int(round(screen.refreshRate())) if screen is not None else 60)
+        self.display_fps_spin.valueChanged.connect(self.on_display_fps_changed)
+        self.gui_form.addRow("Display fps", self.display_fps_spin)
+
+        # 0 analyses on a thread, more run the slice analysis in worker processes
+        self.processes_spin = QSpinBox()
+        self.processes_spin.setRange(0, os.cpu_count() or 1)
+        self.processes_spin.setValue(0)
+        self.processes_spin.valueChanged.connect(self.on_processes_changed)
+        self.gui_form.addRow("Analysis processes", self.processes_spin)
+
+        self.hardware_roi_checkbox = None
+        if self.camera.supports_hardware_roi:
+            self.hardware_roi_checkbox = QCheckBox()
+            self.hardware_roi_checkbox.stateChanged.connect(self.on_roi_changed)
+            self.gui_form.addRow("Hardware ROI", self.hardware_roi_checkbox)
+
         self.circle_checkbox = QCheckBox()
         self.circle_checkbox.stateChanged.connect(self.on_circle_changed)
         self.gui_form.addRow("Fixed Circle", self.circle_checkbox)
@@ -100,85 +144,268 @@ class CameraWidget(QWidget):
         self.ultracal_button.setCheckable(True)
         self.ultracal_button.clicked.connect(self.on_ultracal_button)
         vbox.addWidget(self.ultracal_button)
+        self.ultracal_worker = None
+
+        # frames per recording, the file is allocated for all of them when recording starts
+        self.record_frames_spin = QSpinBox()
+        self.record_frames_spin.setRange(1, 10**7)
+        self.record_frames_spin.setValue(1000)
+        self.gui_form.addRow("Record frames", self.record_frames_spin)
+
+        self.record_button = QPushButton("Record")
+        self.record_button.setCheckable(True)
+        self.record_button.clicked.connect(self.on_record_button)
+        vbox.addWidget(self.record_button)
+        self.recorder = None
+        # a full recorder turns every frame away, the recording is stopped instead
+        self.record_timer = QTimer()
+        self.record_timer.timeout.connect(self.check_recording)
 
         self.button = QPushButton("Start!")
         self.button.clicked.connect(self.on_button)
         vbox.addWidget(self.button)
 
-        self.cmap = None
+        self.stats_label = QLabel()
+        vbox.addWidget(self.stats_label)
+        self._stats = None
+        # set by a CameraScheduler that manages this widget together with others
+        self.scheduler = None
+        self.stats_timer = QTimer()
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(500)
+
+        self.colormap = Colormap(adc_bits=self.camera.adc_bits)
         
         hbox.addLayout(vbox)
         self.setLayout(hbox)
-        self.worker = BeamWorker(self.beam_widget, self.camera, self.cmap)
         self.update_fun = lambda img : None
+        # capture (engine) -> analysis (worker) -> display (display_worker), each on its own thread
+        self.worker = BeamWorker(self.engine, self.update_fun, self.display_fps_spin.value())
+        self.display_worker = DisplayWorker(self.worker, self.beam_widget, self.colormap, self.prepare_slices)
+        self.display_worker.slices_ready.connect(self.show_slices)
+        self.worker.start()
+        self.display_worker.start()
         self.resize(1200, 480)
         self.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
 
+    @property
+    def is_running(self):
+        return self.engine.is_running
+
+    @property
+    def is_calibrating(self):
+        return self.ultracal_worker is not None and self.ultracal_worker.isRunning()
+
+    def _set_camera_controls_enabled(self, enabled):
+        # the camera belongs to the ultracal worker while it runs: no start, no settings, no hardware ROI
+        self.button.setEnabled(enabled)
+        for i in range(1, self.cam_settings_form.rowCount()):
+            self.cam_settings_form.itemAt(i, QFormLayout.FieldRole).widget().setEnabled(enabled)
+        if self.hardware_roi_checkbox is not None:
+            self.hardware_roi_checkbox.setEnabled(enabled)
+
     @Slot()
     def on_button(self):
-        self.is_running = not self.is_running
-
-        if self.is_running:
+        if not self.engine.is_running:
             self.button.setText("Stop!")
-            self.frames = 0
-            self.start = time.time()
-            self.acquire_image()
+            self.engine.start()
         else:
+            self.engine.pause()
             self.button.setText("Start!")
 
     @Slot()
     def on_ultracal_button(self):
         if not self.ultracal_button.isChecked():
+            if self.ultracal_worker is not None and self.ultracal_worker.isRunning():
+                self.ultracal_worker.abort()
             self.camera.background = None
         else:
             QMessageBox.warning(self, "starting background substraction", "Please block the beam")
-            was_running = self.is_running
+            self.ultracal_worker = UltracalWorker(self.engine)
+            self.ultracal_worker.progress.connect(self.on_ultracal_progress)
+            self.ultracal_worker.finished.connect(self.on_ultracal_finished)
+            self._set_camera_controls_enabled(False)
+            self.ultracal_worker.start()
+
+    @Slot(int, int, float, float)
+    def on_ultracal_progress(self, iteration, max_iterations, mean, std):
+        self.ultracal_button.setText("Ultracal {0:d}/{1:d} (std {2:.2f})".format(iteration, max_iterations, std))
 
-            self.is_running = False
-            while self.worker.isRunning():
-                pass
-            
-            self.camera.ultracal()
-            if was_running:
-                self.is_running = True
-                self.acquire_image()
+    @Slot()
+    def on_ultracal_finished(self):
+        # finished is queued, the thread may still be returning from run
+        self.ultracal_worker.wait()
+        self.ultracal_button.setText("Ultracal!")
+        self._set_camera_controls_enabled(True)
+        if not self.ultracal_worker.success:
+            self.ultracal_button.setChecked(False)
+            self.camera.background = None
+        # a selection made during the calibration is programmed now
+        if self.hardware_roi_checkbox is not None and self.hardware_roi_checkbox.isChecked():
+            self.on_roi_changed()
+
+    @Slot()
+    def on_record_button(self):
+        if self.record_button.isChecked():
+            path, _ = QFileDialog.getSaveFileName(self, "Record to", "", "NumPy stack (*.npy)")
+            if path == "":
+                self.record_button.setChecked(False)
+                return
+            self.recorder = Recorder(path, self.record_frame_budget(path))
+            self.recorder.start(self.camera)
+            self.engine.add_sink(self.recorder)
+            self.record_button.setText("Stop recording")
+            self.record_frames_spin.setEnabled(False)
+            self.record_timer.start(200)
+        else:
+            self.stop_recording()
 
+    def record_frame_budget(self, path):
+        # the requested number of frames, as far as the free disk space allows
+        frames = self.record_frames_spin.value()
+        if self.camera.roi is not None:
+            width, height = self.camera.roi[2], self.camera.roi[3]
+        else:
+            width, height = self.camera.width, self.camera.height
+        frame_bytes = width * height * np.dtype(self.camera.native_dtype).itemsize
+        try:
+            free = shutil.disk_usage(os.path.dirname(os.path.abspath(path))).free
+        except OSError as e:
+            print( e )
+            return frames
+        if frame_bytes > 0 and free // frame_bytes < frames:
+            print( "[CameraWidget] only {0:d} of {1:d} frames fit on the disk".format(int(free // frame_bytes), frames) )
+            frames = max(int(free // frame_bytes), 1)
+        return frames
 
+    @Slot()
+    def check_recording(self):
+        if self.recorder is not None and self.recorder.is_full:
+            self.stop_recording()
 
-    def acquire_image(self):
-        if self.worker.isRunning():
+    def stop_recording(self):
+        self.record_timer.stop()
+        if self.recorder is None:
             return
+        self.engine.remove_sink(self.recorder)
+        report = self.recorder.stop()
+        print( "[CameraWidget] recorded {0:d} frames ({1:d} dropped) at {2:.1f} fps, {3:.1f} MB/s to {4:s}".format(
+            report["frames"], report["dropped"], report["fps"], report["throughput_mb_s"], self.recorder.frames_path) )
+        self.recorder = None
+        self.record_button.setChecked(False)
+        self.record_button.setText("Record")
+        self.record_frames_spin.setEnabled(True)
 
-        self.worker = BeamWorker(self.beam_widget, self.camera, self.cmap, self.update_fun)
-        self.worker.finished.connect(self.acquisition_finished)
-        self.worker.start()
+    @Slot()
+    def on_display_fps_changed(self):
+        if self.scheduler is not None:
+            self.scheduler.update()
+            return
+        self.worker.display_fps = self.display_fps_spin.value()
 
-    def acquisition_finished(self):
-        self.frames += 1
-        #print( self.frames / (time.time()-self.start) )
-        if self.is_running:
-            self.acquire_image()
+    def _update_throttle(self):
+        # a CameraScheduler decides for all its cameras at once
+        if self.scheduler is not None:
+            self.scheduler.update()
+            return
+        # hidden tabs and minimized windows only analyse
+        self.worker.throttled = not self.isVisible() or self.window().isMinimized()
+
+    def showEvent(self, event):
+        super(CameraWidget, self).showEvent(event)
+        self._update_throttle()
+
+    def hideEvent(self, event):
+        super(CameraWidget, self).hideEvent(event)
+        self._update_throttle()
+
+    @Slot()
+    def update_stats(self):
+        self._update_throttle()
+        # the camera drops a background that no longer fits its ROI or binning
+        if self.ultracal_button.isChecked() and not self.is_calibrating and self.camera.background is None:
+            self.ultracal_button.setChecked(False)
+        now = time.monotonic()
+        stats = (now, self.engine.frames, self.display_worker.frames, self.worker.analysed)
+        if self._stats is not None:
+            dt = now - self._stats[0]
+            capture_fps = (stats[1] - self._stats[1]) / dt
+            display_fps = (stats[2] - self._stats[2]) / dt
+            analysis_fps = (stats[3] - self._stats[3]) / dt
+            latency = self.worker.latency
+            text = "capture: {0:.1f} fps\nanalysis: {1:.1f} fps\ndisplay: {2:.1f} fps".format(capture_fps, analysis_fps, display_fps)
+            if latency is not None:
+                text += "\nlatency: {0:.1f} ms".format(latency * 1e3)
+            text += "\ndropped: {0:d}\nskipped: {1:d}".format(self.engine.dropped, self.worker.skipped)
+            if self.beam is not None and self.slices_checkbox.isChecked():
+                text += "\n" + self._beam_text(self.beam)
+            if self.fits is not None and self.slices_checkbox.isChecked() and self.fit_checkbox.isChecked():
+                text += "\n1/e\u00b2 radius x: {0:s}\n1/e\u00b2 radius y: {1:s}".format(
+                        self._length_text(self.fits[0].radius), self._length_text(self.fits[1].radius))
+            load = self.scheduler.reports.get(self) if self.scheduler is not None else None
+            if load is not None:
+                cpu = ", ".join("{0:s} {1:.0f}".format(stage, c) for stage, c in load["cpu_percent"].items() if c is not None)
+                text += "\ncpu: {0:.0f}% ({1:s})".format(load["cpu_total_percent"], cpu)
+            if self.recorder is not None:
+                text += "\nrecorded: {0:d}/{1:d} ({2:d} dropped)".format(self.recorder.frames, self.recorder.max_frames, self.recorder.dropped)
+            self.stats_label.setText(text)
+        self._stats = stats
+
+    def stop(self):
+        self.stats_timer.stop()
+        if self.ultracal_worker is not None:
+            self.ultracal_worker.abort()
+            self.ultracal_worker.wait()
+        self.engine.stop()
+        self.stop_recording()
+        self.worker.stop()
+        self.display_worker.stop()
 
     @Slot()
     def on_colormap_changed(self):
-        cmap = self.colormap_box.currentText()
-        if cmap == "None":
-            self.cmap = None
-            return
-        
-        cmap = cm.get_cmap(cmap)
-        self.cmap = cmap(np.arange(2**self.camera.adc_bits) / 2**self.camera.adc_bits, bytes=True)
+        name = self.colormap_box.currentText()
+        window, level, gamma = None, None, 1.0
+        if self.window_checkbox.isChecked() and self.window_spin is not None:
+            window = self.window_spin.value()
+            level = self.level_spin.value()
+            gamma = self.gamma_spin.value()
+        # a new object, the display stage may be colorizing with the old one right now
+        self.colormap = Colormap(None if name == "None" else name, self.camera.adc_bits, window, level, gamma)
+        self.display_worker.colormap = self.colormap
 
+    @Slot()
+    def on_window_changed(self):
+        if self.window_checkbox.isChecked():
+            if self.window_spin is None:
+                max_value = 2**self.camera.adc_bits - 1
+                self.window_spin = QSpinBox()
+                self.window_spin.setRange(1, 2**16 - 1)
+                self.window_spin.setValue(max_value)
+                self.window_spin.valueChanged.connect(self.on_colormap_changed)
+                self.level_spin = QSpinBox()
+                self.level_spin.setRange(0, 2**16 - 1)
+                self.level_spin.setValue(max_value // 2)
+                self.level_spin.valueChanged.connect(self.on_colormap_changed)
+                self.gamma_spin = QDoubleSpinBox()
+                self.gamma_spin.setRange(0.1, 10.0)
+                self.gamma_spin.setSingleStep(0.1)
+                self.gamma_spin.setValue(1.0)
+                self.gamma_spin.valueChanged.connect(self.on_colormap_changed)
+                idx, _ = self.gui_form.getWidgetPosition(self.window_checkbox)
+                self.gui_form.insertRow(idx+1, "Window", self.window_spin)
+                self.gui_form.insertRow(idx+2, "Level", self.level_spin)
+                self.gui_form.insertRow(idx+3, "Gamma", self.gamma_spin)
+        elif self.window_spin is not None:
+            self.gui_form.removeRow(self.window_spin)
+            self.gui_form.removeRow(self.level_spin)
+            self.gui_form.removeRow(self.gamma_spin)
+            self.window_spin = None
+            self.level_spin = None
+            self.gamma_spin = None
+        self.on_colormap_changed()
 
-    def on_settings_changed(self):
-        was_running = False
-        if self.is_running:
-            was_running = True
-            self.is_running = False
-        
-        while self.worker.isRunning():
-            pass
 
+    def on_settings_changed(self):
         settings = {}
         for i in range(1,self.cam_settings_form.rowCount()):
             _name = self.cam_settings_form.itemAt(i, QFormLayout.LabelRole).widget().text()
@@ -189,11 +416,71 @@ class CameraWidget(QWidget):
                 settings[_name] = widget.isChecked()
             elif isinstance(widget, QComboBox):
                 settings[_name] = widget.currentIndex()
-        self.camera.settings = settings
+        geometry = (self.camera.width, self.camera.height, self.camera.px_size)
+        with self.engine.paused():
+            self.camera.settings = settings
+        self._update_list_labels()
+        if geometry != (self.camera.width, self.camera.height, self.camera.px_size):
+            self.beam_widget.reset_roi()
+        else:
+            self.beam_widget.update_view()
 
-        if was_running:
-            self.is_running = True
-            self.acquire_image()
+    def _update_list_labels(self):
+        # a setting may change the labels of another, e.g. the frame rates of the pixel formats per resolution
+        for i in range(1, self.cam_settings_form.rowCount()):
+            _name = self.cam_settings_form.itemAt(i, QFormLayout.LabelRole).widget().text()
+            widget = self.cam_settings_form.itemAt(i, QFormLayout.FieldRole).widget()
+            if not isinstance(widget, QComboBox):
+                continue
+            labels = self.camera.controls_available[_name][1][0]
+            if labels != [widget.itemText(j) for j in range(widget.count())]:
+                idx = widget.currentIndex()
+                widget.blockSignals(True)
+                widget.clear()
+                widget.addItems(labels)
+                widget.setCurrentIndex(idx)
+                widget.blockSignals(False)
+
+    def _profile_axis(self, n, offset, full):
+        # physical coordinates of n pixels starting at offset, centred on the full frame
+        key = (n, offset, full, self.camera.px_size)
+        if not key in self._profile_axes:
+            self._profile_axes[key] = (np.arange(offset, offset + n) - (full - 1) / 2) * self.camera.px_size
+        return self._profile_axes[key]
+
+    def prepare_slices(self, result):
+        # display stage: plot data of both profiles, handed to show_slices as one tuple
+        if result is None:
+            return None
+        _, I_x, I_y, beam, fits = result
+        _ox, _oy = self.camera.roi_offset
+        fit_x, fit_y = None, None
+        max_x, max_y = np.amax(I_x), np.amax(I_y)
+        if fits is not None:
+            fit_x = GaussianFitter.evaluate(fits[0], len(I_x)) / max_x
+            fit_y = GaussianFitter.evaluate(fits[1], len(I_y)) / max_y
+        x_data = self.x_plot_widget.prepare(I_x/max_x, self._profile_axis(len(I_x), _ox, self.camera.width), fit_x)
+        y_data = self.y_plot_widget.prepare(I_y/max_y, self._profile_axis(len(I_y), _oy, self.camera.height), fit_y)
+        return beam, fits, x_data, y_data
+
+    @Slot(object)
+    def show_slices(self, slices):
+        self.beam, self.fits, x_data, y_data = slices
+        self.x_plot_widget.set_data(x_data)
+        self.y_plot_widget.set_data(y_data)
+
+    def _length_text(self, pixels):
+        # micrometres where the pixel size is known, pixels of the delivered frame otherwise
+        px_um = self.camera.px_size_um
+        if px_um is None:
+            return "{0:.1f} px".format(pixels)
+        return "{0:.1f} \u00b5m".format(pixels * px_um)
+
+    def _beam_text(self, beam):
+        _ox, _oy = self.camera.roi_offset
+        return ("centroid: {0:.1f}, {1:.1f} px\nD4\u03c3 x: {2:s}\nD4\u03c3 y: {3:s}\n"
+                "ellipticity: {4:.2f}\nangle: {5:.1f}\u00b0\npeak: {6:d}").format(beam.x + _ox, beam.y + _oy,
+                self._length_text(beam.d_x), self._length_text(beam.d_y), beam.ellipticity, np.degrees(beam.angle), int(beam.peak))
 
     def on_slices_changed(self):
         if self.slices_checkbox.isChecked():
@@ -203,39 +490,12 @@ class CameraWidget(QWidget):
             self.grid.setRowStretch(1, 1)
             if self.slice_method_box is None:
                 self.slice_method_box = QComboBox()
-                self.slice_method_box.addItems(["Peak", "COG", "integrate"])
+                self.slice_method_box.addItems(SliceAnalysis.methods)
                 self.slice_method_box.currentIndexChanged.connect(self.on_slices_changed)
                 self.gui_form.insertRow(1, "Method", self.slice_method_box)
 
-
-            if self.slice_method_box.currentText() == "Peak":
-                def update_fun(img):
-                    ind_y, ind_x = np.unravel_index(np.argmax(img), img.shape)
-                    I_x = img[ind_y,:]
-                    I_y = img[:,ind_y]
-                    self.x_plot_widget.refresh_data(I_x/np.amax(I_x))
-                    self.y_plot_widget.refresh_data(I_y/np.amax(I_y))
-                    return  ind_x, ind_y
-
-            elif self.slice_method_box.currentText() == "COG":
-                def update_fun(img):
-                    _x = np.arange( self.camera.width )
-                    _y = np.arange( self.camera.height )
-                    ind_x = round(np.sum(_x[np.newaxis,:] * img) / np.sum(img))
-                    ind_y = round(np.sum(_y[:,np.newaxis] * img) / np.sum(img))
-                    I_x = img[ind_y,:]
-                    I_y = img[:,ind_y]
-                    self.x_plot_widget.refresh_data(I_x/np.amax(I_x))
-                    self.y_plot_widget.refresh_data(I_y/np.amax(I_y))
-                    return  ind_x, ind_y
-            elif self.slice_method_box.currentText() == "integrate":
-                def update_fun(img):
-                    I_x = np.sum(img, axis=0)
-                    I_y = np.sum(img, axis=1)
-                    self.x_plot_widget.refresh_data(I_x/np.amax(I_x))
-                    self.y_plot_widget.refresh_data(I_y/np.amax(I_y))
-                    return None
-
+            # the beam parameters of COG are shown below the stats
+            update_fun = SliceAnalysis(self.slice_method_box.currentText(), self.fit_checkbox.isChecked())
         else:
             self.x_plot_widget.hide()
             self.y_plot_widget.hide()
@@ -247,6 +507,37 @@ class CameraWidget(QWidget):
             update_fun = lambda img : None
 
         self.update_fun = update_fun
+        self.worker.update_fun = update_fun
+        self._update_pool()
+
+    def on_processes_changed(self):
+        self._update_pool()
+
+    def _update_pool(self):
+        # worker processes only pay off for an actual analysis, without one the thread idles
+        processes = self.processes_spin.value()
+        pool = self.worker.pool
+        if processes == 0 or not isinstance(self.update_fun, SliceAnalysis):
+            if pool is not None:
+                self.worker.set_pool(None)
+        elif pool is not None and pool.processes == processes:
+            pool.set_analysis(self.update_fun)
+        else:
+            self.worker.set_pool(AnalysisPool(self.update_fun, processes))
+
+    @Slot()
+    def on_roi_changed(self):
+        if self.hardware_roi_checkbox is None:
+            return
+        roi = None
+        if self.hardware_roi_checkbox.isChecked():
+            (_x0, _x1), (_y0, _y1) = self.beam_widget.ROI
+            roi = (_x0, _y0, _x1 - _x0, _y1 - _y0)
+        if self.is_calibrating:
+            return
+        with self.engine.paused():
+            self.camera.set_roi(roi)
+        self.beam_widget.update_view()
 
     @Slot()
     def on_cross_changed(self):
@@ -263,18 +554,21 @@ class CameraWidget(QWidget):
                 self.gui_form.insertRow(idx+1, "Crosshair x", self.cross_x_spin)
                 self.gui_form.insertRow(idx+2, "Crosshair y", self.cross_y_spin)
             self.beam_widget.cross = True
+            self.beam_widget.update_view()
         else:
             self.gui_form.removeRow(self.cross_x_spin)
             self.gui_form.removeRow(self.cross_y_spin)
             self.cross_x_spin = None
             self.cross_y_spin = None
             self.beam_widget.cross = False
+            self.beam_widget.update_view()
 
     @Slot()
     def on_cross_spin(self):
         _x = self.cross_x_spin.value()
         _y = self.cross_y_spin.value()
         self.beam_widget.cross_location = (_x, _y)
+        self.beam_widget.update_view()
 
     @Slot()
     def set_cross_spin_value(self):
@@ -311,6 +605,7 @@ class CameraWidget(QWidget):
                 self.gui_form.insertRow(idx+2, "Circle y", self.circle_y_spin)
                 self.gui_form.insertRow(idx+3, "Circle r", self.circle_r_spin)
             self.beam_widget.circle = True
+            self.beam_widget.update_view()
         else:
             self.gui_form.removeRow(self.circle_x_spin)
             self.gui_form.removeRow(self.circle_y_spin)
@@ -319,6 +614,7 @@ class CameraWidget(QWidget):
             self.circle_y_spin = None
             self.circle_r_spin = None
             self.beam_widget.circle = False
+            self.beam_widget.update_view()
 
     @Slot()
     def on_circle_spin(self):
@@ -327,6 +623,7 @@ class CameraWidget(QWidget):
         _r = self.circle_r_spin.value()
         self.beam_widget.circle_location = (_x, _y)
         self.beam_widget.circle_radius = _r
+        self.beam_widget.update_view()
 
 
     @Slot()
@@ -0,0 +1,37 @@
+from . import QThread, Signal
+import time
+
+from wepycon import camera_types
+
+class DeviceScanner(QThread):
+    device_found = Signal(str, int, str)
+    scan_finished = Signal(str, int)
+
+    # camera type -> (time of scan, devices), shared by all scanners
+    cache = {}
+    cache_lifetime = 5.0
+
+    def __init__(self, camera_type):
+        super(DeviceScanner, self).__init__()
+        self.camera_type = camera_type
+
+    @classmethod
+    def cached_devices(cls, camera_type):
+        if camera_type in cls.cache:
+            timestamp, devices = cls.cache[camera_type]
+            if time.monotonic() - timestamp < cls.cache_lifetime:
+                return devices
+        return None
+
+    def run(self):
+        devices = []
+        try:
+            devices = camera_types[self.camera_type].scan_devices(self._on_device)
+        except Exception as e:
+            print( e )
+        DeviceScanner.cache[self.camera_type] = (time.monotonic(), devices)
+        self.scan_finished.emit(self.camera_type, len(devices))
+
+    def _on_device(self, device):
+        _id, name = device
+        self.device_found.emit(self.camera_type, int(_id), str(name))
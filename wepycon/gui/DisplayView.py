@@ -0,0 +1,7 @@
+from collections import namedtuple
+
+# state of a BeamWidget the display stage draws with, replaced as a whole on the GUI thread:
+# size of the drawn image in widget pixels, roi ((x0, x1), (y0, y1)) and offset (x, y) of the frame in
+# sensor pixels, cross (x, y), circle ((x, y), radius) and the selection rectangle ((x1, y1), (x2, y2)),
+# each None while not shown
+DisplayView = namedtuple("DisplayView", ["size", "roi", "offset", "cross", "circle", "selection"])
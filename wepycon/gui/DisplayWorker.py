@@ -0,0 +1,75 @@
+from . import QThread, Signal
+from wepycon.Colormap import Colormap
+import threading
+
+class DisplayWorker(QThread):
+    # display stage: turns analysed frames into profile plots and a composed image; the widgets
+    # receive them through queued signals and only paint on the GUI thread, the stage itself
+    # reads nothing of them but the BeamWidget.view snapshot
+    slices_ready = Signal(object)
+
+    def __init__(self, analysis, beam_widget, colormap=None, display_fun=lambda result : None):
+        super(DisplayWorker, self).__init__()
+        self.analysis = analysis
+        self.queue = analysis.queue
+        self.beam_widget = beam_widget
+        self.camera = analysis.camera
+        # replaced as a whole by the GUI thread and only read here, the bit depth comes from the camera
+        self.colormap = colormap if colormap is not None else Colormap()
+        # prepares the plots of a result on this thread, what it returns (unless None)
+        # is emitted as one object through slices_ready
+        self.display_fun = display_fun
+        self.frames = 0
+        # os thread id while running, for the cpu accounting of the scheduler
+        self.native_id = None
+        self._running = False
+
+    def run(self):
+        self.native_id = threading.get_native_id()
+        self._running = True
+        while self._running:
+            item = self.queue.get(timeout=0.1)
+            if item is None:
+                if self.queue.closed:
+                    # the analysis stage is stopped or restarting, a closed queue would return at once
+                    self.queue.wait_open(timeout=0.1)
+                continue
+            img, result = item
+            try:
+                self.display(img, result)
+                self.frames += 1
+            except Exception as e:
+                print( e )
+            self.analysis.release(img)
+
+    def display(self, img, result):
+        view = self.beam_widget.view
+        self.plot(result)
+        img = self.colorize(self.downsample(img, view))
+        self.render(img, view, result)
+
+    def plot(self, result):
+        slices = self.display_fun(result)
+        if slices is not None:
+            self.slices_ready.emit(slices)
+
+    def downsample(self, img, view):
+        return self.beam_widget.downsample(img, view)
+
+    def colorize(self, img):
+        colormap = self.colormap
+        if colormap.is_identity:
+            return img
+        return colormap.apply(img, adc_bits=self.camera.adc_bits)
+
+    def render(self, img, view, result=None):
+        # the slice crosshair of the result is drawn at display resolution, in sensor coordinates
+        slices = None
+        if result is not None and result[0] is not None:
+            _ox, _oy = view.offset
+            slices = (result[0][0] + _ox, result[0][1] + _oy)
+        self.beam_widget.update_image(img, self.camera.adc_bits, view, slices)
+
+    def stop(self):
+        self._running = False
+        self.wait()
@@ -39,7 +39,11 @@ class InitDialog(QDialog):
             self.group_box_vbox.removeItem( item )
         
         _type = self.camera_type_combo.currentText()
-        devices = camera_types[_type].list_devices()
+        try:
+            devices = camera_types[_type].list_devices()
+        except Exception as e:
+            print( e )
+            devices = []
         if len(devices) == 0:
             self.group_box_vbox.addWidget(QLabel("No device found"))
         else:
@@ -1,4 +1,5 @@
 from . import QWidget, QComboBox, QLabel, QHBoxLayout, QVBoxLayout, QPushButton, QGroupBox, Slot, QRadioButton, Signal
+from .DeviceScanner import DeviceScanner
 from wepycon import camera_types 
 from wepycon.AbstractCamera import AbstractCamera
 
@@ -20,6 +21,9 @@ class InitWidget(QWidget):
         self.group_box = QGroupBox()
         self.group_box_vbox = QVBoxLayout()
         self.group_box.setLayout(self.group_box_vbox)
+        self.device_ids = []
+        self.scanners = []
+        self.active_scanner = None
         self.on_type_changed()
         vbox.addWidget(self.group_box)
 
@@ -29,32 +33,72 @@ class InitWidget(QWidget):
 
         self.setLayout(vbox)
 
-    @Slot()
-    def on_type_changed(self):
+    def _clear_devices(self):
         for i in range( self.group_box_vbox.count() ):
             item = self.group_box_vbox.itemAt(0)
             item.widget().hide()
             self.group_box_vbox.removeItem( item )
-        
+        self.device_ids = []
+
+    def _set_message(self, message):
+        self._clear_devices()
+        self.group_box_vbox.addWidget(QLabel(message))
+
+    @Slot()
+    def on_type_changed(self):
         _type = self.camera_type_combo.currentText()
-        devices = camera_types[_type].list_devices()
-        if len(devices) == 0:
-            self.group_box_vbox.addWidget(QLabel("No device found"))
-        else:
+        devices = DeviceScanner.cached_devices(_type)
+        if devices is not None:
+            self.active_scanner = None
+            self._clear_devices()
             for _id, name in devices:
-                self.group_box_vbox.addWidget(QRadioButton(name))
+                self._add_device(_id, name)
+            if len(devices) == 0:
+                self._set_message("No device found")
+            return
 
+        self._set_message("Searching...")
+        scanner = DeviceScanner(_type)
+        scanner.device_found.connect(self.on_device_found)
+        scanner.scan_finished.connect(self.on_scan_finished)
+        scanner.finished.connect(lambda: self.scanners.remove(scanner))
+        self.scanners.append(scanner)
+        self.active_scanner = scanner
+        scanner.start()
+
+    def _is_stale(self, camera_type):
+        # results of a scan that was superseded by another type change
+        sender = self.sender()
+        if sender is not None and sender is not self.active_scanner:
+            return True
+        return camera_type != self.camera_type_combo.currentText()
+
+    @Slot(str, int, str)
+    def on_device_found(self, camera_type, _id, name):
+        if self._is_stale(camera_type):
+            return
+        self._add_device(_id, name)
+
+    def _add_device(self, _id, name):
+        if len(self.device_ids) == 0:
+            self._clear_devices()
+        self.group_box_vbox.addWidget(QRadioButton(name))
+        self.device_ids.append(_id)
+
+    @Slot(str, int)
+    def on_scan_finished(self, camera_type, count):
+        if self._is_stale(camera_type):
+            return
+        if len(self.device_ids) == 0:
+            self._set_message("No device found")
 
     @Slot()
     def on_open_button(self):
-        if self.group_box_vbox.count() > 0:
-            if isinstance(self.group_box_vbox.itemAt(0).widget(), QLabel):
-                return
-
+        if len(self.device_ids) > 0:
             _type = self.camera_type_combo.currentText()
             for i in range( self.group_box_vbox.count() ):
                 if self.group_box_vbox.itemAt(i).widget().isChecked():
                     try:
-                        self.camera_opened.emit(camera_types[_type].from_device_number(i))
+                        self.camera_opened.emit(camera_types[_type].from_device_number(self.device_ids[i]))
                     except Exception as e:
                         print(e)
@@ -2,6 +2,7 @@ from . import QTabWidget, QWidget, Slot, QVBoxLayout
 #from .InitDialog import InitDialog
 from .InitWidget import InitWidget
 from .CameraWidget import CameraWidget
+from .CameraScheduler import CameraScheduler
 
 class MainWidget(QWidget):
     def __init__(self):
@@ -12,10 +13,14 @@ class MainWidget(QWidget):
         self.init_widget = InitWidget()
         self.tab_widget.addTab(self.init_widget, "+")
         self.init_widget.camera_opened.connect(self.add_new_camera)
-        #self.tab_widget.currentChanged.connect(self.on_tab_changed)
+        self.scheduler = CameraScheduler(self)
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
         #self.tab_widget.tabBarClicked.connect(self.on_tab_changed)
         #self.tab_widget.setCornerWidget(QWidget())
         self.tab_widget.setTabsClosable(True)
+        self.tab_widget.tabCloseRequested.connect(self.on_tab_close)
+        # the "+" tab cannot be closed
+        self.tab_widget.tabBar().setTabButton(0, self.tab_widget.tabBar().RightSide, None)
         self.tab_widget.setMovable(True)
         vbox.addWidget(self.tab_widget)
 
@@ -24,6 +29,37 @@ class MainWidget(QWidget):
 
     def add_new_camera(self, camera):
         _camera_widget = CameraWidget(camera)
-        idx = self.tab_widget.count() - 1 
+        self.scheduler.add(_camera_widget)
+        idx = self.tab_widget.count() - 1
         self.tab_widget.insertTab(idx, _camera_widget, str(camera))
         self.tab_widget.setCurrentIndex(idx)
+
+    @Slot(int)
+    def on_tab_changed(self, idx):
+        widget = self.tab_widget.widget(idx)
+        self.scheduler.set_current(widget if isinstance(widget, CameraWidget) else None)
+
+    @Slot(int)
+    def on_tab_close(self, idx):
+        widget = self.tab_widget.widget(idx)
+        if not isinstance(widget, CameraWidget):
+            return
+        self.scheduler.remove(widget)
+        widget.stop()
+        self.tab_widget.removeTab(idx)
+        widget.camera.close()
+        widget.deleteLater()
+
+    def changeEvent(self, event):
+        super(MainWidget, self).changeEvent(event)
+        # minimizing stops the display of every camera
+        if event.type() == event.WindowStateChange:
+            self.scheduler.update()
+
+    def closeEvent(self, event):
+        self.scheduler.stop()
+        for i in range(self.tab_widget.count()):
+            widget = self.tab_widget.widget(i)
+            if isinstance(widget, CameraWidget):
+                widget.stop()
+        super(MainWidget, self).closeEvent(event)
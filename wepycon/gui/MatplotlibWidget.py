@@ -34,8 +34,15 @@ class MatplotlibWidget(FigureCanvas):
             self.line,  = self.ax.plot( y, x )
         self.draw()
 
-    def refresh_data( self, y ):
-        if self.orientation == "h":
+    def refresh_data( self, y, x=None ):
+        if x is not None:
+            if self.orientation == "h":
+                self.line.set_data( x, y )
+                self.ax.set_xlim( x[0], x[-1] )
+            else:
+                self.line.set_data( y, x )
+                self.ax.set_ylim( x[0], x[-1] )
+        elif self.orientation == "h":
             self.line.set_ydata( y )
         else:
             self.line.set_xdata( y )
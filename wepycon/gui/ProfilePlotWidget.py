@@ -0,0 +1,150 @@
+from . import QWidget, QPainter, QPen, QColor, Qt, QPolygonF, QPointF, QRect
+import numpy as np
+
+def nice_ticks(lo, hi, n=5):
+    lo, hi = min(lo, hi), max(lo, hi)
+    if hi - lo <= 0:
+        return np.array([])
+    raw = (hi - lo) / n
+    magnitude = 10**np.floor(np.log10(raw))
+    step = next(m * magnitude for m in [1, 2, 5, 10] if m * magnitude >= raw)
+    return np.arange(np.ceil(lo / step) * step, hi + step / 2, step)
+
+class ProfilePlotWidget(QWidget):
+    # line plot of a beam profile drawn with QPainter, a drop in for the slice MatplotlibWidget;
+    # prepare may run on any thread, its result is handed to set_data on the GUI thread
+
+    def __init__(self, horizontal=True):
+        super(ProfilePlotWidget, self).__init__()
+        self.orientation = "h" if horizontal else "v"
+        # limits of the position axis and of the profile values
+        self.position_lim = (0.0, 1.0)
+        self.value_lim = (0.0, 1.0)
+        self.xlabel = ""
+        self.ylabel = ""
+        self._data = None
+        self._fit = None
+        self._length = 1
+        self.pen = QPen(QColor(31, 119, 180))
+        self.pen.setWidth(1)
+        self.fit_pen = QPen(QColor(214, 39, 40))
+        self.fit_pen.setStyle(Qt.DashLine)
+        self.axis_pen = QPen(QColor(0, 0, 0))
+        self.setMinimumSize(10, 10)
+
+    def _plot_rect(self):
+        # space for tick labels below the horizontal and right of the vertical plot
+        height = self.fontMetrics().height() + 4
+        if self.orientation == "h":
+            return QRect(0, 0, self.width(), self.height() - height)
+        return QRect(0, 0, self.width() - 4 * height, self.height())
+
+    def resizeEvent(self, event):
+        super(ProfilePlotWidget, self).resizeEvent(event)
+        rect = self._plot_rect()
+        self._length = max(rect.width() if self.orientation == "h" else rect.height(), 1)
+
+    def plot(self, x, y):
+        self.refresh_data(y, x)
+
+    def refresh_data(self, y, x=None, fit=None):
+        self.set_data(self.prepare(y, x, fit))
+
+    def prepare(self, y, x=None, fit=None):
+        # fit is an optional model curve sampled like y, drawn on top of the profile;
+        # returns (position limits, (x, y), fit (x, y) or None) for set_data
+        if x is not None:
+            position_lim = (float(x[0]), float(x[-1]))
+        else:
+            position_lim = self.position_lim
+            x = np.linspace(position_lim[0], position_lim[1], len(y))
+        y = np.asarray(y, dtype=np.float64)
+        x = np.asarray(x, dtype=np.float64)
+
+        # profiles longer than the widget are reduced to a min/max envelope per pixel
+        n = self._length
+        if fit is not None:
+            # smooth, one sample per pixel is enough
+            step = max(len(fit) // n, 1)
+            fit = (x[::step], np.asarray(fit, dtype=np.float64)[::step])
+        if len(y) > 2 * n:
+            edges = np.linspace(0, len(y), n + 1).astype(int)[:-1]
+            x = np.repeat(x[edges], 2)
+            envelope = np.empty(2 * n)
+            envelope[0::2] = np.minimum.reduceat(y, edges)
+            envelope[1::2] = np.maximum.reduceat(y, edges)
+            y = envelope
+        return position_lim, (x, y), fit
+
+    def set_data(self, data):
+        # GUI thread only, profile and fit of one frame are replaced together
+        self.position_lim, self._data, self._fit = data
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(255, 255, 255))
+        rect = self._plot_rect()
+        p0, p1 = self.position_lim
+        v0, v1 = self.value_lim
+
+        painter.setPen(self.axis_pen)
+        if self.orientation == "h":
+            painter.drawLine(rect.left(), rect.bottom(), rect.right(), rect.bottom())
+            for tick in nice_ticks(p0, p1):
+                _x = rect.left() + (tick - p0) / (p1 - p0) * rect.width()
+                painter.drawLine(int(_x), rect.bottom(), int(_x), rect.bottom() - 3)
+                painter.drawText(int(_x) - 20, rect.bottom() + 2, 40, self.height() - rect.bottom(), Qt.AlignHCenter|Qt.AlignTop, "{0:g}".format(tick))
+        else:
+            painter.drawLine(rect.right(), rect.top(), rect.right(), rect.bottom())
+            for tick in nice_ticks(p0, p1):
+                _y = rect.top() + (tick - p0) / (p1 - p0) * rect.height()
+                painter.drawLine(rect.right(), int(_y), rect.right() - 3, int(_y))
+                painter.drawText(rect.right() + 4, int(_y) - 10, self.width() - rect.right() - 4, 20, Qt.AlignLeft|Qt.AlignVCenter, "{0:g}".format(tick))
+
+        painter.setClipRect(rect)
+        for data, pen in [(self._data, self.pen), (self._fit, self.fit_pen)]:
+            if data is not None and len(data[0]) > 1 and p1 != p0 and v1 != v0:
+                painter.setPen(pen)
+                painter.drawPolyline(self._polygon(rect, *data))
+        painter.end()
+
+    def _polygon(self, rect, x, y):
+        p0, p1 = self.position_lim
+        v0, v1 = self.value_lim
+        u = (x - p0) / (p1 - p0)
+        v = (y - v0) / (v1 - v0)
+        points = np.empty((len(u), 2))
+        if self.orientation == "h":
+            points[:, 0] = rect.left() + u * rect.width()
+            points[:, 1] = rect.bottom() - v * rect.height()
+        else:
+            points[:, 0] = rect.left() + v * rect.width()
+            points[:, 1] = rect.top() + u * rect.height()
+        # fills the QPolygonF in place instead of creating a QPointF per sample
+        polygon = QPolygonF([QPointF()] * len(points))
+        ptr = polygon.data()
+        ptr.setsize(points.nbytes)
+        np.frombuffer(ptr, dtype=np.float64).reshape(points.shape)[...] = points
+        return polygon
+
+    def set_xlabel(self, label):
+        self.xlabel = label
+
+    def set_ylabel(self, label):
+        self.ylabel = label
+
+    def set_xlim(self, lims):
+        # matplotlib semantics: x is the position axis of the horizontal plot and the value axis of the vertical one
+        if self.orientation == "h":
+            self.position_lim = tuple(lims)
+        else:
+            self.value_lim = tuple(lims)
+        self.update()
+
+    def set_ylim(self, lims):
+        if self.orientation == "h":
+            self.value_lim = tuple(lims)
+        else:
+            self.position_lim = tuple(lims)
+        self.update()
@@ -0,0 +1,27 @@
+from . import QThread, Signal
+
+class UltracalWorker(QThread):
+    progress = Signal(int, int, float, float)
+    def __init__(self, engine, max_iterations=20, initial_frames=10):
+        super(UltracalWorker, self).__init__()
+        self.engine = engine
+        self.camera = engine.camera
+        self.max_iterations = max_iterations
+        self.initial_frames = initial_frames
+        self.success = False
+        self._abort = False
+
+    def run(self):
+        self._abort = False
+        with self.engine.paused():
+            self.success = self.camera.ultracal(
+                    max_iterations=self.max_iterations,
+                    initial_frames=self.initial_frames,
+                    progress=self._on_progress)
+
+    def _on_progress(self, iteration, max_iterations, mean, std):
+        self.progress.emit(iteration, max_iterations, mean, std)
+        return not self._abort
+
+    def abort(self):
+        self._abort = True
@@ -0,0 +1,257 @@
+import argparse
+import contextlib
+import json
+import signal
+import subprocess
+import sys
+import time
+
+from wepycon import camera_types
+from wepycon.AcquisitionEngine import AcquisitionEngine
+from wepycon.AnalysisPool import AnalysisPool
+from wepycon.Recorder import Recorder
+from wepycon.SliceAnalysis import SliceAnalysis
+
+# acquisition and beam analysis without Qt or matplotlib, for unattended use:
+#   wepycon-headless DebugCamera --settings camera.json --ultracal --rate 2 --output beam.jsonl
+# every line of the output is one JSON object; a background calibration needs the beam blocked,
+# repeated calibrations block it with --block-command, e.g. a script that closes a shutter
+
+def load_settings(path):
+    # a plain {name: value} file or the .json sidecar written by the Recorder
+    with open(path, "r") as fh:
+        settings = json.load(fh)
+    if "settings" in settings and isinstance(settings["settings"], dict):
+        settings = settings["settings"]
+    return settings
+
+def open_camera(name, index=0, settings=None):
+    if not name in camera_types:
+        raise KeyError("unknown camera type " + str(name) + ", known are " + ", ".join(camera_types))
+    camera = camera_types[name].from_device_number(index)
+    if settings:
+        # unknown keys are reported, the remaining settings still apply
+        known = dict((key, value) for key, value in settings.items() if key in camera.settings)
+        for key in settings:
+            if not key in known:
+                print( "[headless] ignoring unknown setting", key )
+        camera.settings = known
+    return camera
+
+def ultracal(camera, max_iterations=20):
+    def progress(iteration, max_iterations, mean, std):
+        print( "[headless] ultracal {0:d}/{1:d} mean {2:.3f} std {3:.3f}".format(iteration, max_iterations, mean, std) )
+    return camera.ultracal(max_iterations=max_iterations, progress=progress)
+
+class Shutter(object):
+    # shell commands that block and unblock the beam around a background calibration
+    def __init__(self, block_command, unblock_command=None):
+        self.block_command = block_command
+        self.unblock_command = unblock_command
+
+    @contextlib.contextmanager
+    def blocked(self):
+        subprocess.run(self.block_command, shell=True, check=True)
+        try:
+            yield
+        finally:
+            if self.unblock_command is not None:
+                subprocess.run(self.unblock_command, shell=True, check=True)
+
+def json_value(value):
+    # numpy scalars as plain python numbers
+    return value.item() if hasattr(value, "item") else str(value)
+
+def beam_record(result, px_size_um):
+    # the profiles are left out; beam parameters and fits are in pixels of the delivered frame,
+    # diameters and radii are added in micrometres if the camera knows its pixel size
+    record = {"beam": None, "fit": None}
+    if result is None:
+        return record
+    beam, fits = result[3], result[4]
+    if beam is not None:
+        record["beam"] = beam._asdict()
+        if px_size_um is not None:
+            record["beam_um"] = {"d_x": beam.d_x * px_size_um, "d_y": beam.d_y * px_size_um,
+                    "d_major": beam.d_major * px_size_um, "d_minor": beam.d_minor * px_size_um}
+    if fits is not None:
+        record["fit"] = [fit._asdict() for fit in fits]
+        if px_size_um is not None:
+            record["radius_um"] = [fit.radius * px_size_um for fit in fits]
+    return record
+
+class Output(object):
+    # JSON lines to a file or to stdout
+    def __init__(self, path=None):
+        self._fh = open(path, "a") if path is not None and path != "-" else sys.stdout
+        self._close = self._fh is not sys.stdout
+
+    def write(self, record):
+        self._fh.write(json.dumps(record, default=json_value) + "\n")
+        self._fh.flush()
+
+    def close(self):
+        if self._close:
+            self._fh.close()
+
+def run(camera, output, analysis, rate=1.0, processes=0, duration=None, max_frames=None,
+        ultracal_interval=None, ultracal_iterations=20, recorder=None, source=None, shutter=None):
+    # source identifies the camera in every record, e.g. {"type": "ZwoAsiCamera", "index": 0};
+    # repeated calibrations run while the beam is on, the Shutter has to block it
+    if ultracal_interval and shutter is None:
+        raise ValueError("a repeated ultracal needs a shutter that blocks the beam")
+    engine = AcquisitionEngine(camera)
+    reader = engine.buffer.reader()
+    pool = AnalysisPool(analysis, processes) if processes > 0 else None
+    if recorder is not None:
+        engine.add_sink(recorder)
+        recorder.start(camera)
+
+    stopped = []
+    def on_signal(signum, frame):
+        stopped.append(signum)
+    previous = dict((s, signal.signal(s, on_signal)) for s in [signal.SIGINT, signal.SIGTERM])
+
+    period = 1.0 / rate if rate > 0 else 0.0
+    start = time.monotonic()
+    next_emit = start
+    next_ultracal = start + ultracal_interval if ultracal_interval else None
+    analysed = 0
+    window = (start, engine.frames, 0)
+    engine.start()
+    try:
+        while not stopped:
+            now = time.monotonic()
+            if duration is not None and now - start >= duration:
+                break
+            if max_frames is not None and analysed >= max_frames:
+                break
+            if next_ultracal is not None and now >= next_ultracal:
+                try:
+                    with engine.paused(), shutter.blocked():
+                        success = ultracal(camera, ultracal_iterations)
+                except subprocess.CalledProcessError as e:
+                    print( e )
+                    success = False
+                output.write({"event": "ultracal", "time": time.time(), "success": success})
+                next_ultracal = time.monotonic() + ultracal_interval
+
+            results = []
+            sequence, img = reader.latest(timeout=0.1 if pool is None or len(pool) == 0 else 0.002)
+            if img is not None:
+                info = reader.info
+                if pool is None:
+                    results.append(((sequence, info), analysis(img)))
+                else:
+                    pool.submit(img, (sequence, info))
+            if pool is not None:
+                results += pool.results()
+
+            for (sequence, info), result in results:
+                analysed += 1
+                now = time.monotonic()
+                if now < next_emit:
+                    continue
+                next_emit = max(next_emit + period, now)
+                dt = now - window[0]
+                record = {
+                    "time": time.time(),
+                    "camera": source,
+                    "sequence": sequence,
+                    "timestamp": info.timestamp if info is not None else None,
+                    "exposure": info.exposure if info is not None else None,
+                    "gain": info.gain if info is not None else None,
+                    "px_size_um": camera.px_size_um,
+                    "capture_fps": (engine.frames - window[1]) / dt if dt > 0 else None,
+                    "analysis_fps": (analysed - window[2]) / dt if dt > 0 else None,
+                    "analysed": analysed,
+                    "dropped": engine.dropped,
+                    }
+                record.update(beam_record(result, camera.px_size_um))
+                output.write(record)
+                window = (now, engine.frames, analysed)
+    finally:
+        engine.stop()
+        reader.close()
+        if pool is not None:
+            pool.close()
+        if recorder is not None:
+            engine.remove_sink(recorder)
+            output.write({"event": "recording", "time": time.time(), "report": recorder.stop()})
+        for s, handler in previous.items():
+            signal.signal(s, handler)
+    return analysed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="headless wepycon acquisition and beam analysis, results as JSON lines")
+    parser.add_argument("camera", nargs="?", default=None, help="camera type, see --list")
+    parser.add_argument("--index", type=int, default=0, help="device number of the camera type")
+    parser.add_argument("--list", action="store_true", help="list camera types and their devices")
+    parser.add_argument("--settings", default=None, help="camera settings as json, e.g. a recording's sidecar")
+    parser.add_argument("--dump-settings", action="store_true", help="print the camera settings as json and exit")
+    parser.add_argument("--ultracal", action="store_true",
+            help="background calibration before measuring, the beam must be blocked (by hand or with --block-command)")
+    parser.add_argument("--ultracal-interval", type=float, default=None,
+            help="repeat the calibration every n seconds, requires --block-command to block the beam meanwhile")
+    parser.add_argument("--block-command", default=None, help="shell command that blocks the beam, e.g. closes a shutter")
+    parser.add_argument("--unblock-command", default=None, help="shell command that lets the beam through again")
+    parser.add_argument("--ultracal-iterations", type=int, default=20)
+    parser.add_argument("--slices", default="COG", choices=SliceAnalysis.methods)
+    parser.add_argument("--fit", action="store_true", help="Gaussian fits of the profiles")
+    parser.add_argument("--processes", type=int, default=0, help="analysis worker processes, 0 analyses in this process")
+    parser.add_argument("--rate", type=float, default=1.0, help="results per second, 0 for every analysed frame")
+    parser.add_argument("--output", default="-", help="json lines file, appended to, '-' is stdout")
+    parser.add_argument("--duration", type=float, default=None, help="seconds")
+    parser.add_argument("--frames", type=int, default=None, help="stop after this many analysed frames")
+    parser.add_argument("--record", default=None, help="also record the frames to this basename")
+    parser.add_argument("--record-frames", type=int, default=1000)
+    args = parser.parse_args(argv)
+    if args.ultracal_interval and args.block_command is None:
+        parser.error("--ultracal-interval calibrates while measuring, --block-command has to block the beam")
+    shutter = Shutter(args.block_command, args.unblock_command) if args.block_command is not None else None
+
+    output = Output(args.output)
+    # camera backends print their progress, stdout is reserved for the results
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            if args.list or args.camera is None:
+                # only the types whose dependencies are installed
+                for name in camera_types:
+                    try:
+                        devices = camera_types[name].list_devices()
+                    except Exception as e:
+                        print( e )
+                        devices = []
+                    output.write({"camera": name, "devices": [{"index": index, "name": str(device)} for index, device in devices]})
+                return 0
+
+            settings = load_settings(args.settings) if args.settings is not None else None
+            camera = open_camera(args.camera, args.index, settings)
+            if args.dump_settings:
+                output.write(dict(camera.settings))
+                return 0
+            if args.ultracal:
+                try:
+                    with shutter.blocked() if shutter is not None else contextlib.nullcontext():
+                        success = ultracal(camera, args.ultracal_iterations)
+                except subprocess.CalledProcessError as e:
+                    print( e )
+                    success = False
+                output.write({"event": "ultracal", "time": time.time(), "success": success})
+
+            source = {"type": args.camera, "index": args.index}
+            output.write({"event": "start", "time": time.time(), "camera": source,
+                    "width": camera.width, "height": camera.height, "px_size": camera.px_size,
+                    "px_size_um": camera.px_size_um, "adc_bits": camera.adc_bits, "settings": dict(camera.settings),
+                    "background_subtracted": camera.background is not None})
+            recorder = Recorder(args.record, args.record_frames) if args.record is not None else None
+            analysed = run(camera, output, SliceAnalysis(args.slices, args.fit), args.rate, args.processes,
+                    args.duration, args.frames, args.ultracal_interval, args.ultracal_iterations, recorder, source, shutter)
+            output.write({"event": "stop", "time": time.time(), "analysed": analysed})
+            camera.close()
+        finally:
+            output.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())